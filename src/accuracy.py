@@ -0,0 +1,181 @@
+"""
+Accuracy of persisted predictions against actual energy production, computed in DuckDb.
+
+Results are column-oriented (numpy arrays keyed by column name), for plotting, reporting
+and alerting alike.
+"""
+import dataclasses
+import datetime
+import enum
+import textwrap
+import typing
+
+import duckdb
+import numpy as np
+
+from .persistence import (
+    ALL_PREDICTIONS_VIEW,
+    register_views,
+)
+from .sites import DEFAULT_SITE_ID
+
+
+class Dimension(enum.Enum):
+    """What accuracy can be grouped by; values are SQL expressions over the predictions table."""
+
+    SITE = "site_id"
+    FORECAST_DISTANCE = "prediction_for_date - date_of_prediction"  # days
+    MODEL_VERSION = "model_version"
+    MONTH = "month(prediction_for_date)"
+
+    @property
+    def column(self) -> str:
+        return self.name.lower()
+
+
+METRICS = ("n", "mae", "rmse", "bias", "mape")
+
+
+@dataclasses.dataclass
+class AccuracyReport:
+    """
+    One row per group: a column per grouping dimension, then
+    `n` (predictions), `mae`, `rmse`, `bias` (mean of predicted - actual; Wh) and `mape` (%).
+    `mape` excludes days whose actual energy production was 0.
+    """
+
+    by: tuple[Dimension, ...]
+    columns: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.columns["n"])
+
+    def rows(self) -> list[dict[str, typing.Any]]:
+        names = list(self.columns)
+        return [
+            dict(zip(names, row))
+            for row in zip(*(self.columns[name].tolist() for name in names))
+        ]
+
+
+@dataclasses.dataclass
+class PredictionsWithActuals:
+    """Every prediction whose day's actual energy production is known, ordered by date."""
+
+    prediction_for_date: np.ndarray  # datetime64[D]
+    forecast_distance: np.ndarray  # int, days
+    model_version: np.ndarray  # str
+    energy_production: np.ndarray  # float64, Wh
+    actual_energy_production: np.ndarray  # float64, Wh
+
+    def __len__(self) -> int:
+        return len(self.prediction_for_date)
+
+
+def accuracy_report(
+    db_con: duckdb.DuckDBPyConnection,
+    by: typing.Sequence[Dimension] = (
+        Dimension.MODEL_VERSION,
+        Dimension.FORECAST_DISTANCE,
+    ),
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    site_id: str | None = DEFAULT_SITE_ID,
+) -> AccuracyReport:
+    """
+    Accuracy of predictions for `start`..`end` (inclusive; default: all), grouped `by`,
+    for one site (or, with `site_id=None`, every site).
+    """
+    where, parameters = _filters(site_id, start, end)
+    dimensions = "".join(
+        f"\n        {dimension.value} AS {dimension.column}," for dimension in by
+    )
+    group_by = (
+        f"GROUP BY {', '.join(dimension.column for dimension in by)}\n"
+        f"ORDER BY {', '.join(dimension.column for dimension in by)}"
+        if by
+        else ""
+    )
+    query = textwrap.dedent(
+        f"""\
+        WITH errors AS (
+          SELECT{dimensions}
+            energy_production - actual_energy_production AS error,
+            actual_energy_production AS actual
+          FROM {ALL_PREDICTIONS_VIEW}
+          WHERE {where}
+        )
+        SELECT
+          {"".join(f"{dimension.column}, " for dimension in by)}count(*) AS n,
+          avg(abs(error)) AS mae,
+          sqrt(avg(error * error)) AS rmse,
+          avg(error) AS bias,
+          100 * avg(abs(error) / actual) FILTER (WHERE actual <> 0) AS mape
+        FROM errors
+        """
+    )
+    register_views(db_con)
+    result = db_con.execute(query + group_by, parameters).fetchnumpy()
+    columns = {
+        dimension.column: np.asarray(result[dimension.column]) for dimension in by
+    }
+    columns["n"] = np.asarray(result["n"]).astype(np.int64)
+    for metric in METRICS[1:]:
+        columns[metric] = np.ma.filled(
+            np.ma.asarray(result[metric]).astype(np.float64), np.nan
+        )
+    return AccuracyReport(tuple(by), columns)
+
+
+def predictions_with_actuals(
+    db_con: duckdb.DuckDBPyConnection,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    site_id: str = DEFAULT_SITE_ID,
+) -> PredictionsWithActuals:
+    where, parameters = _filters(site_id, start, end)
+    register_views(db_con)
+    result = db_con.execute(
+        textwrap.dedent(
+            f"""\
+            SELECT
+              prediction_for_date,
+              prediction_for_date - date_of_prediction AS forecast_distance,
+              model_version,
+              energy_production,
+              actual_energy_production
+            FROM {ALL_PREDICTIONS_VIEW}
+            WHERE {where}
+            ORDER BY prediction_for_date, forecast_distance, model_version;
+        """
+        ),
+        parameters,
+    ).fetchnumpy()
+    return PredictionsWithActuals(
+        prediction_for_date=np.asarray(result["prediction_for_date"]).astype(
+            "datetime64[D]"
+        ),
+        forecast_distance=np.asarray(result["forecast_distance"]).astype(np.int64),
+        model_version=np.asarray(result["model_version"]).astype(object),
+        energy_production=np.asarray(result["energy_production"]).astype(np.float64),
+        actual_energy_production=np.asarray(result["actual_energy_production"]).astype(
+            np.float64
+        ),
+    )
+
+
+def _filters(
+    site_id: str | None, start: datetime.date | None, end: datetime.date | None
+) -> tuple[str, list[str | datetime.date]]:
+    conditions = ["actual_energy_production IS NOT NULL"]
+    parameters: list[str | datetime.date] = []
+    if site_id is not None:
+        conditions.append("site_id = ?")
+        parameters.append(site_id)
+    if start is not None:
+        conditions.append("prediction_for_date >= ?")
+        parameters.append(start)
+    if end is not None:
+        conditions.append("prediction_for_date <= ?")
+        parameters.append(end)
+    return " AND ".join(conditions), parameters
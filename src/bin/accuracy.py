@@ -0,0 +1,83 @@
+"""
+Print the accuracy of persisted predictions (see `src.accuracy`).
+
+To run:
+`$ venv/bin/python -m src.bin.accuracy`
+
+Or, e.g., by month for this year:
+`$ venv/bin/python -m src.bin.accuracy --by month --start 2023-01-01`
+
+Or compare every site:
+`$ venv/bin/python -m src.bin.accuracy --by site --all-sites`
+"""
+import argparse
+import datetime
+
+import duckdb
+
+from src.accuracy import (
+    METRICS,
+    Dimension,
+    accuracy_report,
+)
+from src.persistence import PREDICTIONS_DB_PATH
+from src.sites import DEFAULT_SITE_ID
+
+
+def parse_dimensions(dimensions: str) -> list[Dimension]:
+    return [Dimension[dimension.strip().upper()] for dimension in dimensions.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--by",
+        dest="by",
+        required=False,
+        type=parse_dimensions,
+        default=[Dimension.MODEL_VERSION, Dimension.FORECAST_DISTANCE],
+        help=f"Comma-separated; any of {', '.join(d.column for d in Dimension)}",
+    )
+    parser.add_argument(
+        "--start",
+        dest="start",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=None,
+    )
+    parser.add_argument(
+        "--end",
+        dest="end",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=None,
+    )
+    parser.add_argument(
+        "--site",
+        dest="site_id",
+        required=False,
+        type=str,
+        default=DEFAULT_SITE_ID,
+    )
+    parser.add_argument(
+        "--all-sites",
+        dest="all_sites",
+        required=False,
+        action="store_true",
+    )
+    args = parser.parse_args()
+
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH, read_only=True)
+    report = accuracy_report(
+        db_con, args.by, args.start, args.end, None if args.all_sites else args.site_id
+    )
+
+    header = [dimension.column for dimension in report.by] + list(METRICS)
+    print("\t".join(header))
+    for row in report.rows():
+        print(
+            "\t".join(
+                f"{row[name]:.1f}" if isinstance(row[name], float) else str(row[name])
+                for name in header
+            )
+        )
@@ -1,31 +1,82 @@
 """
+Look up actual energy production (from the Enphase system configured in `.env`) for the days
+a site has predictions for.
+
 To run:
 `$ venv/bin/python -m src.bin.actual_energy_production`
 """
+import argparse
 import datetime
 
 import duckdb
 
-from src.external_data import Enphase
+from src.external_data import (
+    Enphase,
+    HttpClient,
+    ResponseCache,
+)
 from src.persistence import (
     PREDICTIONS_DB_PATH,
-    PREDICTIONS_TBL,
+    dates_missing_actual_energy_production,
+    migrate,
+    write_actual_energy_production,
 )
+from src.sites import DEFAULT_SITE_ID
 
-today = datetime.date.today()
-enphase_client = Enphase()
-db_con = duckdb.connect(PREDICTIONS_DB_PATH)
-query = db_con.execute(
-    f"SELECT DISTINCT prediction_for_date FROM {PREDICTIONS_TBL} WHERE actual_energy_production IS NULL AND prediction_for_date < ?",
-    [today],
-)
-dates: list[tuple[datetime.datetime]] = query.fetchall()
-for (date,) in dates:
-    print(f"Fetching actual energy production on {date}")
-    energy_produced = enphase_client.energy_produced_on_date(date)
-    print(f"\tProduced {energy_produced}Wh. Persisting...")
-    db_con.execute(
-        f"UPDATE {PREDICTIONS_TBL} SET actual_energy_production = ? WHERE prediction_for_date = ?",
-        [energy_produced, date],
+
+def contiguous_date_ranges(
+    dates: list[datetime.date],
+) -> list[tuple[datetime.date, datetime.date]]:
+    """Group sorted, distinct dates into (first, last) runs of consecutive days."""
+    ranges: list[tuple[datetime.date, datetime.date]] = []
+    for date in dates:
+        if ranges and date - ranges[-1][1] == datetime.timedelta(days=1):
+            ranges[-1] = (ranges[-1][0], date)
+        else:
+            ranges.append((date, date))
+    return ranges
+
+
+def persist_actual_energy_production(
+    db_con: duckdb.DuckDBPyConnection,
+    enphase_client: Enphase,
+    today: datetime.date,
+    site_id: str = DEFAULT_SITE_ID,
+) -> None:
+    """Fetch and persist actual energy production for the days before `today` missing it."""
+    dates = dates_missing_actual_energy_production(
+        db_con, before=today, site_id=site_id
+    )
+    actuals: list[tuple[datetime.date, int]] = []
+    for start_date, end_date in contiguous_date_ranges(dates):
+        print(f"Fetching actual energy production from {start_date} to {end_date}")
+        produced = enphase_client.energy_produced_between(start_date, end_date)
+        for date, energy_produced in produced:
+            print(f"\t{date}: produced {energy_produced}Wh")
+        actuals.extend(produced)
+
+    print("Persisting...")
+    updated = write_actual_energy_production(db_con, actuals, site_id)
+    print(f"\tPersisted actual energy production for {updated} predictions.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--site",
+        dest="site_id",
+        required=False,
+        type=str,
+        default=DEFAULT_SITE_ID,
+        help="Site the Enphase system is installed at",
+    )
+    args = parser.parse_args()
+
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH)
+    migrate(db_con)
+    persist_actual_energy_production(
+        db_con,
+        Enphase(HttpClient(cache=ResponseCache())),
+        datetime.date.today(),
+        args.site_id,
     )
-    print("\tPersisted.")
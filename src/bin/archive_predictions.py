@@ -0,0 +1,42 @@
+"""
+Move settled months of predictions (and persisted forecasts) out of the predictions database
+into Parquet partitions (see `src.persistence.archive`).
+
+To run:
+`$ venv/bin/python -m src.bin.archive_predictions`
+"""
+import argparse
+import datetime
+
+import duckdb
+
+from src.persistence import (
+    PREDICTIONS_DB_PATH,
+    archive_before,
+    archive_cutoff,
+    migrate,
+)
+
+
+def archive(db_con: duckdb.DuckDBPyConnection, before: datetime.date) -> None:
+    written = archive_before(db_con, before)
+    for partition in written:
+        print(f"Archived {partition}")
+    print(f"Archived {len(written)} months")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--before",
+        dest="before",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=archive_cutoff(datetime.date.today()),
+        help="Archive months that end before this date",
+    )
+    args = parser.parse_args()
+
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH)
+    migrate(db_con)
+    archive(db_con, args.before)
@@ -0,0 +1,165 @@
+"""
+Run the daily job (refresh Enphase tokens, predict, look up actual energy production, plot, and
+archive) in one process, as a DAG of steps (see `src.pipeline`). Fetching the forecast (NOAA) and
+fetching actual energy production (Enphase) don't depend on each other, so they run concurrently.
+Steps whose inputs haven't changed since they last succeeded (e.g., when re-run on the same day)
+are skipped; use `--force` to run every step.
+
+To run:
+`$ venv/bin/python -m src.bin.daily_pipeline`
+"""
+import argparse
+import datetime
+import pathlib
+import sys
+import time
+import typing
+
+import duckdb
+
+from src import metrics
+from src.bin.actual_energy_production import (
+    persist_actual_energy_production,
+)
+from src.bin.archive_predictions import archive
+from src.bin.plot import plot
+from src.bin.predict import make_predictions
+from src.bin.refresh_enphase_tokens import (
+    refresh_enphase_tokens,
+)
+from src.env import Env
+from src.external_data import (
+    Enphase,
+    HttpClient,
+    NoaaApi,
+    ResponseCache,
+)
+from src.model import Model, registry
+from src.persistence import (
+    FORECAST_FEATURES_TBL,
+    PREDICTIONS_DB_PATH,
+    PREDICTIONS_TBL,
+    archive_cutoff,
+    migrate,
+)
+from src.pipeline import (
+    FAILED,
+    Pipeline,
+    Step,
+    print_timings,
+)
+
+# Resources other than tables. Predictions and actual energy production are in the same table,
+# but in different rows (days from today on, and days before today), so they are tracked apart.
+DATE = "date"
+MODELS = "models"
+ARCHIVE_CUTOFF = "archive_cutoff"
+ENPHASE_TOKENS = "enphase_tokens"
+ACTUAL_ENERGY_PRODUCTION = "actual_energy_production"
+PLOT = "plot"
+ARCHIVE = "archive"
+
+
+def daily_pipeline(
+    env: Env, models: typing.Sequence[Model], today: datetime.date
+) -> Pipeline:
+    # One cache for the steps that fetch concurrently
+    cache = ResponseCache()
+    return Pipeline(
+        [
+            Step(
+                "refresh_enphase_tokens",
+                lambda _: refresh_enphase_tokens(env),
+                inputs=(DATE,),
+                outputs=(ENPHASE_TOKENS,),
+            ),
+            Step(
+                "predict",
+                lambda db_con: make_predictions(
+                    db_con, NoaaApi(HttpClient(cache=cache)), models, today
+                ),
+                inputs=(DATE, MODELS),
+                outputs=(PREDICTIONS_TBL, FORECAST_FEATURES_TBL),
+            ),
+            Step(
+                "actual_energy_production",
+                lambda db_con: persist_actual_energy_production(
+                    db_con, Enphase(HttpClient(cache=cache), env), today
+                ),
+                inputs=(DATE, ENPHASE_TOKENS),
+                outputs=(ACTUAL_ENERGY_PRODUCTION,),
+            ),
+            Step(
+                "plot",
+                lambda db_con: plot(db_con),
+                inputs=(PREDICTIONS_TBL, ACTUAL_ENERGY_PRODUCTION),
+                outputs=(PLOT,),
+            ),
+            Step(
+                "archive",
+                lambda db_con: archive(db_con, archive_cutoff(today)),
+                inputs=(
+                    ARCHIVE_CUTOFF,
+                    PREDICTIONS_TBL,
+                    FORECAST_FEATURES_TBL,
+                    ACTUAL_ENERGY_PRODUCTION,
+                ),
+                outputs=(ARCHIVE,),
+            ),
+        ],
+        {
+            DATE: lambda _: today.isoformat(),
+            MODELS: lambda _: ",".join(model.version for model in models),
+            ARCHIVE_CUTOFF: lambda _: archive_cutoff(today).isoformat(),
+        },
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--models",
+        dest="model_versions",
+        required=False,
+        type=lambda versions: versions.split(","),
+        default=None,
+        help="Comma-separated model versions; defaults to every registered version",
+    )
+    parser.add_argument(
+        "--force",
+        dest="force",
+        required=False,
+        action="store_true",
+        help="Run every step, even if its inputs are unchanged",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        required=False,
+        type=pathlib.Path,
+        default=None,
+        help="Write timings and counters (see `src.metrics`) here: JSON if it ends in .json, else a Prometheus textfile",
+    )
+    args = parser.parse_args()
+    if args.metrics_file is not None:
+        metrics.enable()
+
+    models = registry.load(args.model_versions)
+    if not models:
+        raise TypeError(
+            "model must be trained and registered in the `model` sub-package"
+        )
+
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH)
+    migrate(db_con)
+
+    start = time.perf_counter()
+    runs = daily_pipeline(Env(), models, datetime.date.today()).run(
+        db_con, force=args.force
+    )
+    print("Step timings:")
+    print_timings(runs, time.perf_counter() - start)
+    if args.metrics_file is not None:
+        metrics.export(args.metrics_file)
+    if any(run.status == FAILED for run in runs):
+        sys.exit(1)
@@ -1,115 +1,122 @@
 """
+Plot predictions against actual energy production (see `src.plotting`).
+
 To run:
 `$ venv/bin/python -m src.bin.plot`
+
+Or with a figure per model version as well:
+`$ venv/bin/python -m src.bin.plot --per-model`
+
+Or for a site other than the default (see `src.sites`):
+`$ venv/bin/python -m src.bin.plot --site home`
 """
+import argparse
 import dataclasses
 import datetime
 import pathlib
-import textwrap
 
 import duckdb
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MultipleLocator
+import numpy as np
 
-from src.persistence import (
-    PREDICTIONS_DB_PATH,
-    PREDICTIONS_TBL,
+from src.accuracy import (
+    PredictionsWithActuals,
+    predictions_with_actuals,
 )
-
-
-db_con = duckdb.connect(PREDICTIONS_DB_PATH)
-query = db_con.execute(
-    textwrap.dedent(f"""\
-        SELECT
-            prediction_for_date,
-            date_of_prediction,
-            model_version,
-            energy_production,
-            actual_energy_production
-        FROM
-            {PREDICTIONS_TBL}
-        WHERE
-            actual_energy_production IS NOT NULL
-            AND
-            today() - prediction_for_date < 32;
-    """),
+from src.persistence import PREDICTIONS_DB_PATH
+from src.plotting import (
+    FigureSpec,
+    RenderResult,
+    render_all,
 )
-rows: list[
-    tuple[datetime.datetime, datetime.datetime, str, float, float]
-] = query.fetchall()
-
-
-@dataclasses.dataclass
-class Forecast:
-    forecast_distance: int  # number of days away this forecast was made
-    model: str
-    predicted_production: float
-
-
-@dataclasses.dataclass
-class GroupedForecasts:
-    date: datetime.datetime
-    actual_production: float
-    predictions: list[Forecast] = dataclasses.field(default_factory=list)
+from src.sites import DEFAULT_SITE_ID
+
+RESULTS_DIR = pathlib.Path(__file__).parent.parent.parent / "results"
+DEFAULT_PLOT_DAYS = 32
+
+
+def figure_spec(
+    predictions: PredictionsWithActuals,
+    outfile: pathlib.Path,
+    title: str | None = None,
+    mask: np.ndarray | None = None,
+) -> FigureSpec:
+    data = {
+        field.name: getattr(predictions, field.name)
+        for field in dataclasses.fields(predictions)
+    }
+    if mask is not None:
+        data = {name: values[mask] for name, values in data.items()}
+    return FigureSpec(
+        "predictions_vs_actual",
+        outfile,
+        data,
+        {} if title is None else {"title": title},
+    )
 
 
-max_predictions_made_for_date = 0
-grouped: dict[datetime.datetime, GroupedForecasts] = {}
-for row in rows:
-    (
-        prediction_for_date,
-        date_of_prediction,
-        model_version,
-        predicted_production,
-        actual_production,
-    ) = row
-    if prediction_for_date not in grouped:
-        grouped[prediction_for_date] = GroupedForecasts(
-            prediction_for_date, actual_production
-        )
+def plot(
+    db_con: duckdb.DuckDBPyConnection,
+    days: int = DEFAULT_PLOT_DAYS,
+    site_id: str = DEFAULT_SITE_ID,
+    per_model: bool = False,
+    max_workers: int | None = None,
+) -> RenderResult:
+    """Render the site's figures for the last `days` days (see `render_all`)."""
+    predictions = predictions_with_actuals(
+        db_con,
+        start=datetime.date.today() - datetime.timedelta(days=days - 1),
+        site_id=site_id,
+    )
 
-    grouped[prediction_for_date].predictions.append(
-        Forecast(
-            (prediction_for_date - date_of_prediction).days,
-            model_version,
-            predicted_production,
-        )
+    # The default site's figures keep their original (site-less) names
+    prefix = "plot" if site_id == DEFAULT_SITE_ID else f"plot-{site_id}"
+    specs = [figure_spec(predictions, RESULTS_DIR / f"{prefix}.png")]
+    if per_model:
+        for model_version in sorted(set(predictions.model_version.tolist())):
+            specs.append(
+                figure_spec(
+                    predictions,
+                    RESULTS_DIR / f"{prefix}-{model_version}.png",
+                    title=f"Model v{model_version}",
+                    mask=predictions.model_version == model_version,
+                )
+            )
+
+    result = render_all(specs, max_workers)
+    print(f"Rendered {len(result.rendered)} figures; {len(result.skipped)} unchanged")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--days",
+        dest="days",
+        required=False,
+        type=int,
+        default=DEFAULT_PLOT_DAYS,
     )
-    max_predictions_made_for_date = max(
-        max_predictions_made_for_date, len(grouped[prediction_for_date].predictions)
+    parser.add_argument(
+        "--site",
+        dest="site_id",
+        required=False,
+        type=str,
+        default=DEFAULT_SITE_ID,
     )
-
-fig, ax = plt.subplots()
-
-for i in range(0, max_predictions_made_for_date):
-    X = []
-    Y = []
-    for group in grouped.values():
-        if i > len(group.predictions) - 1:
-            continue
-        forecast = group.predictions[i]
-        X.append(group.date)
-        Y.append(forecast.predicted_production)
-    ax.scatter(
-        X,
-        Y,
-        label=f"{forecast.forecast_distance} day prediction (model v{forecast.model})",
+    parser.add_argument(
+        "--per-model",
+        dest="per_model",
+        required=False,
+        action="store_true",
     )
+    parser.add_argument(
+        "--workers",
+        dest="max_workers",
+        required=False,
+        type=int,
+        default=None,
+    )
+    args = parser.parse_args()
 
-X = []
-Y = []
-for group in grouped.values():
-    X.append(group.date)
-    Y.append(group.actual_production)
-ax.scatter(X, Y, c="#000000", marker="*", label="Actual")
-
-
-fig.autofmt_xdate()
-ax.xaxis.set_major_locator(MultipleLocator(1))
-ax.set_xlabel("Date")
-ax.set_ylabel("Wh")
-fig.set(figwidth=20, figheight=10)  # inches
-plt.legend(loc="upper left")
-
-results_folder = pathlib.Path(__file__).parent.parent.parent / "results"
-plt.savefig(results_folder / "plot.png", format="png")
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH, read_only=True)
+    plot(db_con, args.days, args.site_id, args.per_model, args.max_workers)
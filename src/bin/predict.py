@@ -1,55 +1,150 @@
 """
+Make energy production predictions with every registered model version
+(see `src.model.registry`), or only the versions given with `--models`.
+The forecast is fetched once and scored by all models.
+
 To run:
 `$ venv/bin/python -m src.bin.predict`
+
+Or, e.g., to compare a candidate model against production:
+`$ venv/bin/python -m src.bin.predict --models 2022-12-30,2023-07-01`
 """
+import argparse
 import datetime
+import pathlib
+import typing
 
 import duckdb
+import numpy as np
 
-from src.external_data import NoaaApi
-from src.model import model
-from src.persistence import PREDICTIONS_DB_PATH
+from src import metrics
+from src.external_data import (
+    HttpClient,
+    NoaaApi,
+    ResponseCache,
+)
+from src.model import Model, registry
+from src.persistence import (
+    PREDICTIONS_DB_PATH,
+    ForecastFeatureBatch,
+    PredictionBatch,
+    migrate,
+    write_forecast_features,
+    write_predictions,
+)
 from src.predict import (
-    InsufficientHourlyForecastError,
-    predict,
+    BatchPrediction,
+    predict_models,
 )
+from src.sites import DEFAULT_SITE_ID
 
-if model is None:
-    raise TypeError("model must be trained and exported from the `model` sub-package")
 
-date_of_prediction = datetime.date.today()
+def to_prediction_batch(
+    batch: BatchPrediction,
+    model_version: str,
+    date_of_prediction: datetime.date,
+    site_id: str | typing.Sequence[str] = DEFAULT_SITE_ID,
+) -> PredictionBatch:
+    """
+    The sufficient predictions of `batch`. `site_id` is either one site for every day, or the
+    site of each day (for forecasts of many sites concatenated together).
+    """
+    sufficient = batch.sufficient
+    n_predictions = int(sufficient.sum())
+    return PredictionBatch(
+        site_id=np.broadcast_to(np.array(site_id, dtype=object), sufficient.shape)[
+            sufficient
+        ],
+        prediction_for_date=np.array(batch.dates, dtype="datetime64[D]")[sufficient],
+        date_of_prediction=np.full(
+            n_predictions, date_of_prediction, dtype="datetime64[D]"
+        ),
+        model_version=np.full(n_predictions, model_version, dtype=object),
+        energy_production=batch.energy_production_Wh[sufficient],
+    )
 
-# Get current weather forecast
-noaa_api = NoaaApi()
-daily_forecasts = noaa_api.get_forecast()
 
+def make_predictions(
+    db_con: duckdb.DuckDBPyConnection,
+    noaa_api: NoaaApi,
+    models: typing.Sequence[Model],
+    date_of_prediction: datetime.date,
+) -> None:
+    """Fetch the forecast, predict with each model, and persist the predictions and the forecast."""
+    # Get current weather forecast
+    daily_forecasts = noaa_api.get_forecast()
 
-db_con = duckdb.connect(PREDICTIONS_DB_PATH)
-for forecast in daily_forecasts:
-    try:
-        # predict
-        solar_production_prediction = predict(forecast, model)
-        days_in_future = solar_production_prediction.date - date_of_prediction
-        print(
-            f"{days_in_future.days} day prediction ({solar_production_prediction.date}): {solar_production_prediction.energy_production_Wh}"
-        )
+    # predict
+    predictions = predict_models(daily_forecasts, models)
+    for model_version, batch in predictions.items():
+        for forecast, sufficient in zip(daily_forecasts, batch.sufficient):
+            if not sufficient:
+                print(
+                    f"[{model_version}] Can't make prediction for {forecast.date} because of incomplete forecast"
+                )
 
-        # persist
-        db_con.execute(
-            "INSERT INTO predictions VALUES (?, ?, ?, ?, ?)",
+        for solar_production_prediction in batch.predictions():
+            days_in_future = solar_production_prediction.date - date_of_prediction
+            print(
+                f"[{model_version}] {days_in_future.days} day prediction ({solar_production_prediction.date}): {solar_production_prediction.energy_production_Wh}"
+            )
+
+    # persist
+    # The forecast itself, so predictions can be replayed (e.g., by new models) later
+    n_features = write_forecast_features(
+        db_con,
+        ForecastFeatureBatch.from_daily_forecasts(daily_forecasts, date_of_prediction),
+    )
+    result = write_predictions(
+        db_con,
+        PredictionBatch.concatenate(
             [
-                solar_production_prediction.date,
-                date_of_prediction,
-                model.version,
-                solar_production_prediction.energy_production_Wh,
-                None,
-            ],
-        )
-    except duckdb.ConstraintException as exc:
-        # TODO: Make use of UPSERT once supported by DuckDb (https://github.com/duckdb/duckdb/pull/5866)
-        print(
-            f"Prediction already made for {solar_production_prediction.date} on {date_of_prediction} using model {model.version}"
+                to_prediction_batch(batch, model_version, date_of_prediction)
+                for model_version, batch in predictions.items()
+            ]
+        ),
+    )
+    print(
+        f"Persisted {result.inserted} predictions; {result.skipped} already made on {date_of_prediction} using models {', '.join(predictions)}"
+    )
+    print(f"Persisted {n_features} forecast values")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--models",
+        dest="model_versions",
+        required=False,
+        type=lambda versions: versions.split(","),
+        default=None,
+        help="Comma-separated model versions; defaults to every registered version",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        required=False,
+        type=pathlib.Path,
+        default=None,
+        help="Write timings and counters (see `src.metrics`) here: JSON if it ends in .json, else a Prometheus textfile",
+    )
+    args = parser.parse_args()
+    if args.metrics_file is not None:
+        metrics.enable()
+
+    models = registry.load(args.model_versions)
+    if not models:
+        raise TypeError(
+            "model must be trained and registered in the `model` sub-package"
         )
 
-    except InsufficientHourlyForecastError as exc:
-        print(f"Can't make prediction for {forecast.date} because: {exc}")
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH)
+    migrate(db_con)
+    make_predictions(
+        db_con,
+        NoaaApi(HttpClient(cache=ResponseCache())),
+        models,
+        datetime.date.today(),
+    )
+    if args.metrics_file is not None:
+        metrics.export(args.metrics_file)
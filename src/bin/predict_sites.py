@@ -0,0 +1,152 @@
+"""
+Make energy production predictions for every site in a site list (see `src.sites`).
+Forecasts for all sites are fetched concurrently, scored in a single batch by every registered
+model version (see `src.model.registry`), or only the versions given with `--models`, and
+persisted (with the forecasts themselves) in a single write per table.
+
+To run:
+`$ venv/bin/python -m src.bin.predict_sites sites.csv`
+"""
+import argparse
+import asyncio
+import datetime
+import pathlib
+
+import duckdb
+
+from src import metrics
+from src.bin.predict import to_prediction_batch
+from src.external_data import (
+    AsyncHttpClient,
+    ColumnarForecast,
+    NoaaApi,
+)
+from src.model import registry
+from src.persistence import (
+    PREDICTIONS_DB_PATH,
+    ForecastFeatureBatch,
+    PredictionBatch,
+    migrate,
+    write_forecast_features,
+    write_predictions,
+)
+from src.predict import predict_models
+from src.sites import Site, load_sites
+
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+
+
+async def fetch_forecasts(
+    noaa_api: NoaaApi, sites: list[Site]
+) -> list[ColumnarForecast | BaseException]:
+    return await asyncio.gather(
+        *(noaa_api.get_forecast_columns_async(site.latlong) for site in sites),
+        return_exceptions=True,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sites", type=pathlib.Path)
+    parser.add_argument(
+        "--max-connections-per-host",
+        dest="max_connections_per_host",
+        required=False,
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+    )
+    parser.add_argument(
+        "--models",
+        dest="model_versions",
+        required=False,
+        type=lambda versions: versions.split(","),
+        default=None,
+        help="Comma-separated model versions; defaults to every registered version",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        required=False,
+        type=pathlib.Path,
+        default=None,
+        help="Write timings and counters (see `src.metrics`) here: JSON if it ends in .json, else a Prometheus textfile",
+    )
+    args = parser.parse_args()
+    if args.metrics_file is not None:
+        metrics.enable()
+
+    models = registry.load(args.model_versions)
+    if not models:
+        raise TypeError(
+            "model must be trained and registered in the `model` sub-package"
+        )
+
+    date_of_prediction = datetime.date.today()
+    sites = load_sites(args.sites)
+
+    # Get current weather forecasts
+    async_http_client = AsyncHttpClient(args.max_connections_per_host)
+    noaa_api = NoaaApi(async_http_client=async_http_client)
+    try:
+        forecasts = asyncio.run(fetch_forecasts(noaa_api, sites))
+    finally:
+        async_http_client.close()
+
+    site_days: list[Site] = []
+    daily_forecasts = []
+    forecast_features = []
+    for site, forecast in zip(sites, forecasts):
+        if isinstance(forecast, BaseException):
+            print(f"Can't fetch forecast for site {site.site_id} because: {forecast}")
+            continue
+        site_forecasts = forecast.daily()
+        site_days.extend([site] * len(site_forecasts))
+        daily_forecasts.extend(site_forecasts)
+        forecast_features.append(
+            ForecastFeatureBatch.from_daily_forecasts(
+                site_forecasts, date_of_prediction, site.site_id
+            )
+        )
+
+    if not daily_forecasts:
+        raise SystemExit("Can't fetch a forecast for any site; nothing to predict")
+
+    # predict
+    predictions = predict_models(daily_forecasts, models)
+    site_ids = [site.site_id for site in site_days]
+    for model_version, batch in predictions.items():
+        for site_id, date, sufficient, energy_production in zip(
+            site_ids, batch.dates, batch.sufficient, batch.energy_production_Wh
+        ):
+            if not sufficient:
+                print(
+                    f"[{model_version}] [{site_id}] Can't make prediction for {date} because of incomplete forecast"
+                )
+                continue
+
+            days_in_future = date - date_of_prediction
+            print(
+                f"[{model_version}] [{site_id}] {days_in_future.days} day prediction ({date}): {energy_production}"
+            )
+
+    # persist
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH)
+    migrate(db_con)
+    n_features = write_forecast_features(
+        db_con, ForecastFeatureBatch.concatenate(forecast_features)
+    )
+    result = write_predictions(
+        db_con,
+        PredictionBatch.concatenate(
+            [
+                to_prediction_batch(batch, model_version, date_of_prediction, site_ids)
+                for model_version, batch in predictions.items()
+            ]
+        ),
+    )
+    print(
+        f"Persisted {result.inserted} predictions for {len(forecast_features)} sites; {result.skipped} already made on {date_of_prediction} using models {', '.join(predictions)}"
+    )
+    print(f"Persisted {n_features} forecast values")
+    if args.metrics_file is not None:
+        metrics.export(args.metrics_file)
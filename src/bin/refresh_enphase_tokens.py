@@ -1,8 +1,12 @@
 from src.env import Env
 from src.external_data import Enphase
 
-if __name__ == "__main__":
-    env = Env()
+
+def refresh_enphase_tokens(env: Env) -> None:
     enphase_client = Enphase(env=env)
     tokens = enphase_client.generate_new_tokens()
     env.enphase_secret_tokens = tokens
+
+
+if __name__ == "__main__":
+    refresh_enphase_tokens(Env())
@@ -0,0 +1,124 @@
+"""
+Serve predictions over HTTP from a long-running process that keeps the models loaded and the
+forecasts fresh (see `src.service`), e.g.:
+```
+$ curl 'http://localhost:8000/predict?site=default&date=2023-01-18'
+```
+
+To run (for the site configured in `.env`):
+`$ venv/bin/python -m src.bin.serve`
+
+Or for every site in a site list (see `src.sites`):
+`$ venv/bin/python -m src.bin.serve --sites sites.csv --port 8000`
+"""
+import argparse
+import pathlib
+
+from src import metrics
+from src.env import Env
+from src.external_data import (
+    AsyncHttpClient,
+    NoaaApi,
+)
+from src.model import registry
+from src.service import (
+    DEFAULT_MAX_AGE,
+    DEFAULT_REFRESH_INTERVAL,
+    PredictionServer,
+    PredictionService,
+)
+from src.sites import (
+    DEFAULT_SITE_ID,
+    Site,
+    load_sites,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sites",
+        dest="sites",
+        required=False,
+        type=pathlib.Path,
+        default=None,
+        help="Site list (see `src.sites`); defaults to the site configured in `.env`",
+    )
+    parser.add_argument(
+        "--models",
+        dest="model_versions",
+        required=False,
+        type=lambda versions: versions.split(","),
+        default=None,
+        help="Comma-separated model versions; defaults to every registered version",
+    )
+    parser.add_argument(
+        "--host", dest="host", required=False, type=str, default=DEFAULT_HOST
+    )
+    parser.add_argument(
+        "--port", dest="port", required=False, type=int, default=DEFAULT_PORT
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        dest="refresh_interval",
+        required=False,
+        type=float,
+        default=DEFAULT_REFRESH_INTERVAL,
+        help="Seconds between forecast refreshes",
+    )
+    parser.add_argument(
+        "--max-age",
+        dest="max_age",
+        required=False,
+        type=float,
+        default=DEFAULT_MAX_AGE,
+        help="Seconds after which a forecast that can't be refreshed is no longer served",
+    )
+    parser.add_argument(
+        "--metrics",
+        dest="metrics",
+        required=False,
+        action="store_true",
+        help="Collect timings and counters (see `src.metrics`), and serve them at /metrics",
+    )
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable()
+
+    models = registry.load(args.model_versions)
+    if not models:
+        raise TypeError(
+            "model must be trained and registered in the `model` sub-package"
+        )
+
+    sites = (
+        load_sites(args.sites)
+        if args.sites is not None
+        else [Site(DEFAULT_SITE_ID, *Env().latlong())]
+    )
+
+    async_http_client = AsyncHttpClient()
+    service = PredictionService(
+        NoaaApi(async_http_client=async_http_client),
+        models,
+        sites,
+        refresh_interval=args.refresh_interval,
+        max_age=args.max_age,
+    )
+    service.start()
+
+    server = PredictionServer((args.host, args.port), service)
+    print(
+        f"Serving predictions of {', '.join(service.model_versions)} for {len(sites)} sites on http://{args.host}:{args.port}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        async_http_client.close()
@@ -25,6 +25,7 @@ class Env:
     ENV_VAR_ENPHASE_SYSTEM_ID = "ENPHASE_SYSTEM_ID"
     ENV_VAR_LAT = "LAT"
     ENV_VAR_LON = "LON"
+    ENV_VAR_VISUAL_CROSSING_API_KEY = "VISUAL_CROSSING_API_KEY"
 
     """
     Convenience wrapper for getting environment variables this application cares about.
@@ -86,6 +87,9 @@ class Env:
         encrypted = box.encrypt(json.dumps(tokens).encode("utf-8"))
         secrets_file.write_bytes(encrypted)
 
+    def visual_crossing_api_key(self) -> str:
+        return self._env[Env.ENV_VAR_VISUAL_CROSSING_API_KEY]
+
     def latlong(self) -> tuple[float, float]:
         lat = float(self._env[Env.ENV_VAR_LAT])
         lon = float(self._env[Env.ENV_VAR_LON])
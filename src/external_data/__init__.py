@@ -1,18 +1,32 @@
 from .air_now import AirNowApi, AQIDailyForecast
+from .async_http_client import AsyncHttpClient
 from .enphase import Enphase
+from .http_cache import ResponseCache
+from .http_client import HttpClient
 from .noaa import (
+    ColumnarForecast,
     DailyForecast,
     HourlyForecast,
     NoaaApi,
     WeatherPrediction,
 )
+from .visual_crossing import (
+    HistoricalWeather,
+    VisualCrossingApi,
+)
 
 __all__ = (
     "AirNowApi",
     "AQIDailyForecast",
+    "AsyncHttpClient",
+    "ColumnarForecast",
     "DailyForecast",
     "Enphase",
+    "HistoricalWeather",
     "HourlyForecast",
+    "HttpClient",
     "NoaaApi",
+    "ResponseCache",
+    "VisualCrossingApi",
     "WeatherPrediction",
 )
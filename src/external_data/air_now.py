@@ -6,8 +6,11 @@ import typing
 import urllib.error
 
 from ..env import Env
+from .http_cache import NEVER_EXPIRES
 from .http_client import HttpClient
 
+FORECAST_CACHE_TTL = 60 * 60  # seconds
+
 
 class AQIParameter(enum.Enum):
     Ozone = "OZONE"
@@ -45,11 +48,20 @@ class AirNowApi:
         self._env = env
         self._http_client = http_client
 
-    def get_historical_aqi(self, date: datetime.date) -> typing.Optional[float]:
-        lat, lon = self._env.latlong()
+    def get_historical_aqi(
+        self, date: datetime.date, latlong: tuple[float, float] | None = None
+    ) -> typing.Optional[float]:
+        """
+        Daily PM2.5 AQI observed on `date` near `latlong` (defaults to the location configured in `Env`).
+        """
+        lat, lon = latlong if latlong is not None else self._env.latlong()
         response: list[HistoricalAQIRecordResponse] = self._http_client.get_json(
             f"https://www.airnowapi.org/aq/observation/latLong/historical/?format=application/json&latitude={lat}&longitude={lon}&date={date.isoformat()}T00-0000&distance=10&API_KEY={self._env.airnow_api_key()}",
             retry_wait=self._retry_waiter,
+            # Observations for past days don't change
+            cache_ttl=(
+                NEVER_EXPIRES if date < datetime.date.today() else FORECAST_CACHE_TTL
+            ),
         )
 
         if not isinstance(response, list):
@@ -64,7 +76,8 @@ class AirNowApi:
     def get_forecast_aqi(self) -> list[AQIDailyForecast]:
         lat, lon = self._env.latlong()
         response: list[AQIForecastRecordResponse] = self._http_client.get_json(
-            f"https://www.airnowapi.org/aq/forecast/latLong/?format=application/json&latitude={lat}&longitude={lon}&distance=10&API_KEY={self._env.airnow_api_key()}"
+            f"https://www.airnowapi.org/aq/forecast/latLong/?format=application/json&latitude={lat}&longitude={lon}&distance=10&API_KEY={self._env.airnow_api_key()}",
+            cache_ttl=FORECAST_CACHE_TTL,
         )
 
         if not isinstance(response, list):
@@ -0,0 +1,327 @@
+import asyncio
+import concurrent.futures
+import dataclasses
+import email.message
+import http
+import http.client
+import io
+import json
+import threading
+import typing
+import urllib.error
+import urllib.parse
+
+import tenacity
+
+from .http_client import (
+    DEFAULT_HEADERS,
+    RetryWait,
+    count_attempt,
+    count_retry,
+    counting_bytes_read,
+    default_retry_wait,
+    is_expected_to_be_transient,
+    wait_strategy,
+)
+
+T = typing.TypeVar("T")
+
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+DEFAULT_TIMEOUT = 30.0  # seconds, to connect and for each socket read
+THREAD_POOL_SIZE = 32
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (
+    http.HTTPStatus.MOVED_PERMANENTLY,
+    http.HTTPStatus.FOUND,
+    http.HTTPStatus.SEE_OTHER,
+    http.HTTPStatus.TEMPORARY_REDIRECT,
+    http.HTTPStatus.PERMANENT_REDIRECT,
+)
+
+# Errors raised when reusing a kept-alive connection that the server has since closed
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class _Origin:
+    scheme: str
+    host: str
+    port: int | None
+
+
+class _ConnectionPool:
+    """Idle keep-alive connections to a single origin. Thread-safe."""
+
+    _origin: _Origin
+    _timeout: float
+    _idle: list[http.client.HTTPConnection]
+    _lock: threading.Lock
+
+    def __init__(self, origin: _Origin, timeout: float) -> None:
+        self._origin = origin
+        self._timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Return a connection, and whether it is being reused."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+
+        connection_cls = (
+            http.client.HTTPSConnection
+            if self._origin.scheme == "https"
+            else http.client.HTTPConnection
+        )
+        connection = connection_cls(
+            self._origin.host, self._origin.port, timeout=self._timeout
+        )
+        return connection, False
+
+    def release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.append(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+
+class AsyncHttpClient:
+    """
+    asyncio counterpart to `HttpClient` for fetching from many URLs concurrently.
+
+    Connections are kept alive and pooled per origin, and at most `max_connections_per_host`
+    requests to the same host are in flight at once. Requests are tried up to 3 times on the same
+    transient errors as `HttpClient` (see `is_expected_to_be_transient`), waiting `retry_wait`
+    between attempts. Connecting and each socket read time out after `timeout` seconds, so a
+    hung host can't hold a worker thread (and its host's slot) indefinitely.
+
+    The blocking socket work runs on a thread pool owned by the client; call `close` when done.
+    """
+
+    _max_connections_per_host: int
+    _timeout: float
+    _pools: dict[_Origin, _ConnectionPool]
+    _pools_lock: threading.Lock
+    _semaphores: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Semaphore]
+    _executor: concurrent.futures.ThreadPoolExecutor | None
+
+    def __init__(
+        self,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        self._max_connections_per_host = max_connections_per_host
+        self._timeout = timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        self._semaphores = {}
+        self._executor = None
+
+    async def get_json(
+        self,
+        url: str,
+        method="GET",
+        headers: object | dict = DEFAULT_HEADERS,
+        retry_wait: typing.Callable[[BaseException | None], float] = default_retry_wait,
+    ) -> typing.Any:
+        request_headers = headers if isinstance(headers, dict) else {}
+
+        def consume(response: typing.BinaryIO) -> typing.Any:
+            return json.loads(response.read().decode("utf-8"))
+
+        return await self._request(
+            url,
+            method,
+            request_headers,
+            consume,
+            tenacity.stop_after_attempt(3),
+            wait_strategy(retry_wait),
+        )
+
+    async def get_streaming(
+        self,
+        url: str,
+        consume: typing.Callable[[typing.BinaryIO], T],
+        retry_wait: RetryWait = default_retry_wait,
+    ) -> T:
+        """
+        Hand the (unread) response body to `consume`, which runs on a worker thread.
+        On a transient error the request is retried as a whole, including `consume`.
+        """
+        return await self._request(
+            url,
+            "GET",
+            {},
+            consume,
+            tenacity.stop_after_attempt(3),
+            wait_strategy(retry_wait),
+        )
+
+    def close(self) -> None:
+        with self._pools_lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _request(
+        self,
+        url: str,
+        method: str,
+        headers: dict,
+        consume: typing.Callable[[typing.BinaryIO], T],
+        stop: tenacity.stop.stop_base,
+        wait: tenacity.wait.wait_base,
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        host = urllib.parse.urlsplit(url).netloc
+        # The semaphore is held per attempt, so a request waiting out its backoff doesn't
+        # keep a connection slot from the other requests to the host
+        async for attempt in tenacity.AsyncRetrying(
+            retry=tenacity.retry_if_exception(is_expected_to_be_transient),
+            stop=stop,
+            wait=wait,
+            before=count_attempt,
+            before_sleep=count_retry,
+            reraise=True,
+        ):
+            with attempt:
+                async with self._semaphore(loop, host):
+                    return await loop.run_in_executor(
+                        self._get_executor(),
+                        self._request_blocking,
+                        url,
+                        method,
+                        headers,
+                        consume,
+                    )
+
+        raise AssertionError("unreachable")  # AsyncRetrying either returns or raises
+
+    def _request_blocking(
+        self,
+        url: str,
+        method: str,
+        headers: dict,
+        consume: typing.Callable[[typing.BinaryIO], T],
+    ) -> T:
+        status = 0
+        for _ in range(MAX_REDIRECTS + 1):
+            split = urllib.parse.urlsplit(url)
+            origin = _Origin(split.scheme, split.hostname or "", split.port)
+            path = urllib.parse.urlunsplit(("", "", split.path or "/", split.query, ""))
+            pool = self._pool(origin)
+            connection, response = self._send(pool, method, path, headers, url)
+
+            status = response.status
+            if status in REDIRECT_STATUSES and "Location" in response.headers:
+                response.read()
+                self._release(pool, connection, response)
+                url = urllib.parse.urljoin(url, response.headers["Location"])
+                continue
+
+            if status >= 400:
+                body = response.read()
+                self._release(pool, connection, response)
+                self._print_error(status, response.reason, body)
+                raise urllib.error.HTTPError(
+                    url,
+                    status,
+                    response.reason,
+                    typing.cast(email.message.Message, response.headers),
+                    io.BytesIO(body),
+                )
+
+            try:
+                result = consume(
+                    counting_bytes_read(typing.cast(typing.BinaryIO, response))
+                )
+            except BaseException:
+                connection.close()
+                raise
+            # Drain whatever `consume` left unread so the connection can be reused
+            response.read()
+            self._release(pool, connection, response)
+            return result
+
+        raise urllib.error.HTTPError(
+            url,
+            status,
+            f"More than {MAX_REDIRECTS} redirects",
+            email.message.Message(),
+            None,
+        )
+
+    def _send(
+        self,
+        pool: _ConnectionPool,
+        method: str,
+        path: str,
+        headers: dict,
+        url: str,
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        while True:
+            connection, reused = pool.acquire()
+            try:
+                connection.request(method, path, headers=headers)
+                return connection, connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused:
+                    raise
+                # Server closed an idle kept-alive connection; try another
+            except OSError as exc:
+                connection.close()
+                # Surface socket errors (e.g., DNS failures) the way urllib does,
+                # so that `is_expected_to_be_transient` applies unchanged
+                raise urllib.error.URLError(exc) from exc
+
+    def _release(
+        self,
+        pool: _ConnectionPool,
+        connection: http.client.HTTPConnection,
+        response: http.client.HTTPResponse,
+    ) -> None:
+        if response.will_close:
+            connection.close()
+        else:
+            pool.release(connection)
+
+    def _print_error(self, status: int, reason: str, body: bytes) -> None:
+        try:
+            error_parsed = json.loads(body.decode("utf-8"))
+            print(f"Failed ({status} {reason}): {error_parsed}")
+        except Exception:
+            print(f"Failed ({status} {reason})")
+
+    def _pool(self, origin: _Origin) -> _ConnectionPool:
+        with self._pools_lock:
+            if origin not in self._pools:
+                self._pools[origin] = _ConnectionPool(origin, self._timeout)
+            return self._pools[origin]
+
+    def _semaphore(
+        self, loop: asyncio.AbstractEventLoop, host: str
+    ) -> asyncio.Semaphore:
+        key = (loop, host)
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self._max_connections_per_host)
+        return self._semaphores[key]
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=THREAD_POOL_SIZE, thread_name_prefix="AsyncHttpClient"
+            )
+        return self._executor
@@ -7,12 +7,19 @@ import urllib.error
 import urllib.parse
 
 from ..env import EnphaseTokens, Env
+from .http_cache import NEVER_EXPIRES
 from .http_client import HttpClient
 
+# Enphase may revise production for recent days as late telemetry arrives
+PRODUCTION_SETTLED_AFTER = datetime.timedelta(days=7)
+RECENT_PRODUCTION_CACHE_TTL = 60 * 60  # seconds
+
 
 class EnphaseProductionSummary(typing.TypedDict):
     """Docs: https://developer-v4.enphase.com/docs.html"""
 
+    # First day of `production`; later than the requested start if the system wasn't active yet
+    start_date: str
     production: list[int]
 
 
@@ -43,19 +50,42 @@ class Enphase:
         self._http_client = http_client
 
     def energy_produced_on_date(self, date: datetime.date) -> int:
+        ((_, energy_produced),) = self.energy_produced_between(date, date)
+        return energy_produced
+
+    def energy_produced_between(
+        self, start_date: datetime.date, end_date: datetime.date
+    ) -> list[tuple[datetime.date, int]]:
+        """
+        Daily energy production (Wh) for each date from `start_date` through `end_date` (inclusive),
+        fetched in a single request. Dates Enphase doesn't have production for (yet, or from
+        before the system was active) are omitted.
+        """
         base_url = f"https://api.enphaseenergy.com/api/v4/systems/{self._env.enphase_system_id()}/energy_lifetime"
         query_parameters = {
             "key": self._env.enphase_api_key(),
-            "start_date": date.isoformat(),
-            "end_date": date.isoformat(),
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
         }
         url = f"{base_url}?{urllib.parse.urlencode(query_parameters, quote_via=urllib.parse.quote)}"
         headers = {"Authorization": f"Bearer {self._env.enphase_access_token()}"}
+        settled = end_date < datetime.date.today() - PRODUCTION_SETTLED_AFTER
         response: EnphaseProductionSummary = self._http_client.get_json(
-            url, headers=headers, retry_wait=self._retry_waiter
+            url,
+            headers=headers,
+            retry_wait=self._retry_waiter,
+            cache_ttl=NEVER_EXPIRES if settled else RECENT_PRODUCTION_CACHE_TTL,
         )
-        assert len(response["production"]) == 1
-        return response["production"][0]
+        production_start_date = datetime.date.fromisoformat(response["start_date"])
+        produced = [
+            (production_start_date + datetime.timedelta(days=i), energy_produced)
+            for i, energy_produced in enumerate(response["production"])
+        ]
+        return [
+            (date, energy_produced)
+            for date, energy_produced in produced
+            if start_date <= date <= end_date
+        ]
 
     def generate_new_tokens(self) -> EnphaseTokens:
         base_url = f"https://api.enphaseenergy.com/oauth/token"
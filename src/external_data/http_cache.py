@@ -0,0 +1,224 @@
+"""
+On-disk cache of HTTP response bodies, used by `HttpClient`.
+
+Layout of the cache directory:
+```
+index              dbm: sha256(method + url) -> JSON-encoded `CacheEntry`
+blobs/ab/ab12...   response bodies, named by the sha256 of their content
+```
+Response bodies are content-addressed, so identical responses to different requests are stored once.
+URLs are only stored hashed; they often carry API keys.
+"""
+import dataclasses
+import dbm
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+import typing
+
+DEFAULT_CACHE_DIR = pathlib.Path(__file__).parents[2] / ".cache" / "http"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256MiB
+
+# TTL for responses that will never change (e.g., historical observations)
+NEVER_EXPIRES = float("inf")
+
+# One lock per cache directory, shared by every `ResponseCache` on it in this process: dbm
+# doesn't support concurrent writers, so per-instance locks would lose (or refuse) writes
+_directory_locks: dict[pathlib.Path, threading.Lock] = {}
+_directory_locks_lock = threading.Lock()
+
+
+def _directory_lock(directory: pathlib.Path) -> threading.Lock:
+    with _directory_locks_lock:
+        return _directory_locks.setdefault(directory.resolve(), threading.Lock())
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    blob: str  # sha256 of the response body
+    size: int  # bytes
+    stored_at: float  # unix timestamp of the last time the response was fetched or revalidated
+    last_access: float  # unix timestamp
+    ttl: float  # seconds
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def is_fresh(self, now: float) -> bool:
+        return now - self.stored_at < self.ttl
+
+    def validators(self) -> dict[str, str]:
+        """Headers to make a conditional request revalidating this entry."""
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_json(self) -> str:
+        fields = dataclasses.asdict(self)
+        # JSON has no infinity
+        fields["ttl"] = None if self.ttl == NEVER_EXPIRES else self.ttl
+        return json.dumps(fields)
+
+    @classmethod
+    def from_json(cls, encoded: bytes | str) -> "CacheEntry":
+        fields = json.loads(encoded)
+        if fields["ttl"] is None:
+            fields["ttl"] = NEVER_EXPIRES
+        return cls(**fields)
+
+
+class BlobWriter:
+    """
+    Incrementally write a response body into the cache (see `ResponseCache.writer`).
+    Nothing is visible in the cache until `commit`.
+    """
+
+    _cache: "ResponseCache"
+    _file: typing.IO[bytes]
+    _hash: typing.Any
+    _size: int
+
+    def __init__(self, cache: "ResponseCache") -> None:
+        self._cache = cache
+        self._file = tempfile.NamedTemporaryFile(
+            dir=cache.directory, prefix=".blob-", delete=False
+        )
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def commit(
+        self,
+        key: str,
+        ttl: float,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        self._file.close()
+        blob = self._hash.hexdigest()
+        blob_path = self._cache.blob_path(blob)
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self._file.name, blob_path)
+
+        now = time.time()
+        entry = CacheEntry(blob, self._size, now, now, ttl, etag, last_modified)
+        self._cache.put(key, entry)
+
+    def discard(self) -> None:
+        self._file.close()
+        pathlib.Path(self._file.name).unlink(missing_ok=True)
+
+
+class ResponseCache:
+    """
+    Size-bounded (least recently used entries are evicted first), on-disk cache of response bodies.
+    Thread-safe within a process, including between instances on the same directory.
+    """
+
+    directory: pathlib.Path
+    max_bytes: int
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        directory: pathlib.Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = _directory_lock(self.directory)
+
+    @staticmethod
+    def key(method: str, url: str) -> str:
+        return hashlib.sha256(f"{method} {url}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[CacheEntry, bytes] | None:
+        """Return the entry and body for `key`, whether or not it is still fresh."""
+        with self._lock, self._index() as index:
+            if key not in index:
+                return None
+            entry = CacheEntry.from_json(index[key])
+            try:
+                body = self.blob_path(entry.blob).read_bytes()
+            except FileNotFoundError:
+                del index[key]
+                return None
+            entry.last_access = time.time()
+            index[key] = entry.to_json()
+            return entry, body
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            with self._index() as index:
+                index[key] = entry.to_json()
+            self._evict()
+
+    def revalidated(self, key: str, ttl: float) -> None:
+        """Mark the entry for `key` as fresh again, e.g. after a `304 Not Modified`."""
+        with self._lock, self._index() as index:
+            if key not in index:
+                return
+            entry = CacheEntry.from_json(index[key])
+            entry.stored_at = entry.last_access = time.time()
+            entry.ttl = ttl
+            index[key] = entry.to_json()
+
+    def store(
+        self,
+        key: str,
+        body: bytes,
+        ttl: float,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        writer = self.writer()
+        writer.write(body)
+        writer.commit(key, ttl, etag, last_modified)
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def blob_path(self, blob: str) -> pathlib.Path:
+        return self.directory / "blobs" / blob[:2] / blob
+
+    def _index(self) -> typing.Any:
+        return dbm.open(str(self.directory / "index"), "c")
+
+    def _evict(self) -> None:
+        with self._index() as index:
+            entries = {
+                key.decode("utf-8"): CacheEntry.from_json(index[key])
+                for key in index.keys()
+            }
+            # Blobs are shared between entries with identical bodies; count each once
+            blob_sizes = {entry.blob: entry.size for entry in entries.values()}
+            total = sum(blob_sizes.values())
+            if total <= self.max_bytes:
+                return
+
+            blob_refs: dict[str, int] = {}
+            for entry in entries.values():
+                blob_refs[entry.blob] = blob_refs.get(entry.blob, 0) + 1
+
+            by_last_access = sorted(
+                entries.items(), key=lambda item: item[1].last_access
+            )
+            for key, entry in by_last_access:
+                if total <= self.max_bytes:
+                    break
+                del index[key]
+                blob_refs[entry.blob] -= 1
+                if blob_refs[entry.blob] == 0:
+                    self.blob_path(entry.blob).unlink(missing_ok=True)
+                    total -= entry.size
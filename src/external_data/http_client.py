@@ -1,15 +1,31 @@
 import http
+import io
 import json
 import sys
+import time
 import traceback
 import typing
 import urllib.error
 import urllib.request
 
-from lxml import etree
 import tenacity
 import tenacity.wait
 
+from ..metrics import (
+    HTTP_ATTEMPTS,
+    HTTP_CACHE_HITS,
+    HTTP_DOWNLOADED_BYTES,
+    HTTP_RETRIES,
+    HTTP_RETRY_WAIT,
+    enabled,
+)
+from .http_cache import (
+    BlobWriter,
+    CacheEntry,
+    ResponseCache,
+)
+from .rate_limit import SlidingWindowLimiter
+
 
 def is_expected_to_be_transient(exc: typing.Any) -> bool:
     if isinstance(exc, urllib.error.HTTPError):
@@ -34,33 +50,142 @@ def default_retry_wait(_exc: BaseException | None) -> float:
     return 1.0
 
 
+RetryWait: typing.TypeAlias = (
+    typing.Callable[[BaseException | None], float] | tenacity.wait.wait_base
+)
+
+
+def wait_strategy(waiter: RetryWait) -> tenacity.wait.wait_base:
+    """
+    tenacity wait strategy calling `waiter` with the exception that failed the last attempt.
+    A tenacity wait strategy (e.g., `tenacity.wait_exponential` to back off) is used as is.
+    """
+    if isinstance(waiter, tenacity.wait.wait_base):
+        return waiter
+    wait_for = typing.cast(typing.Callable[[BaseException | None], float], waiter)
+
+    class Waiter(tenacity.wait.wait_base):
+        def __call__(self, retry_state: tenacity.RetryCallState) -> float:
+            outcome = retry_state.outcome
+            if outcome is None:
+                return wait_for(None)
+            return wait_for(outcome.exception())
+
+    return Waiter()
+
+
+def count_attempt(_retry_state: tenacity.RetryCallState) -> None:
+    """tenacity `before` hook: count every attempt at a request (see `metrics`)."""
+    HTTP_ATTEMPTS.inc()
+
+
+def count_retry(retry_state: tenacity.RetryCallState) -> None:
+    """tenacity `before_sleep` hook: count retries, and the time spent waiting for them."""
+    HTTP_RETRIES.inc()
+    if retry_state.next_action is not None:
+        HTTP_RETRY_WAIT.inc(retry_state.next_action.sleep)
+
+
 DEFAULT_HEADERS = object()
 
+T = typing.TypeVar("T")
+
+
+class _TeeReader:
+    """File-like wrapper that copies everything read from `source` into `sink`."""
+
+    def __init__(self, source: typing.BinaryIO, sink: BlobWriter) -> None:
+        self._source = source
+        self._sink = sink
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._source.read(size)
+        self._sink.write(chunk)
+        return chunk
+
+
+class _CountingReader:
+    """File-like wrapper that counts the bytes read from `source` (see `metrics`)."""
+
+    def __init__(self, source: typing.BinaryIO) -> None:
+        self._source = source
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self._source.read(size)
+        HTTP_DOWNLOADED_BYTES.inc(len(chunk))
+        return chunk
+
+
+def counting_bytes_read(source: typing.BinaryIO) -> typing.BinaryIO:
+    """`source`, wrapped to count the bytes read from it if metrics are enabled."""
+    if not enabled():
+        return source
+    return typing.cast(typing.BinaryIO, _CountingReader(source))
+
 
 class HttpClient:
+    """
+    Blocking HTTP client with retries for transient errors.
+
+    If constructed with a `ResponseCache`, GET requests made with a `cache_ttl` are served from the
+    cache while fresh, and revalidated with a conditional request (ETag/Last-Modified) once stale.
+
+    If constructed with a `SlidingWindowLimiter`, every request sent (including retries and
+    revalidations, but not responses served from the cache) waits for it.
+    """
+
+    _cache: ResponseCache | None
+    _rate_limiter: SlidingWindowLimiter | None
+
+    def __init__(
+        self,
+        cache: ResponseCache | None = None,
+        rate_limiter: SlidingWindowLimiter | None = None,
+    ) -> None:
+        self._cache = cache
+        self._rate_limiter = rate_limiter
+
     def get_json(
         self,
         url: str,
         method="GET",
         headers: object | dict = DEFAULT_HEADERS,
         retry_wait: typing.Callable[[BaseException | None], float] = default_retry_wait,
+        cache_ttl: float | None = None,
     ) -> typing.Any:
+        cache_key, cached = self._lookup(method, url, cache_ttl)
+        if cached is not None and cached[0].is_fresh(time.time()):
+            HTTP_CACHE_HITS.inc()
+            return json.loads(cached[1].decode("utf-8"))
+
         for attempt in tenacity.Retrying(
             retry=tenacity.retry_if_exception(is_expected_to_be_transient),
             stop=tenacity.stop_after_attempt(3),
             wait=self._wait(retry_wait),
+            before=count_attempt,
+            before_sleep=count_retry,
         ):
             with attempt:
                 request = urllib.request.Request(url, method=method)
                 if headers != DEFAULT_HEADERS and isinstance(headers, dict):
                     for key, value in headers.items():
                         request.add_header(key, value)
+                if cached is not None:
+                    for key, value in cached[0].validators().items():
+                        request.add_header(key, value)
+                self._wait_for_rate_limit()
                 try:
                     with urllib.request.urlopen(request) as response:
                         response_body = response.read()
+                        HTTP_DOWNLOADED_BYTES.inc(len(response_body))
                         response_parsed = json.loads(response_body.decode("utf-8"))
+                        if cache_key is not None:
+                            self._store(cache_key, response, response_body, cache_ttl)
                         return response_parsed
                 except urllib.error.HTTPError as exc:
+                    if self._is_not_modified(exc, cache_key, cached, cache_ttl):
+                        return json.loads(typing.cast(tuple, cached)[1].decode("utf-8"))
+
                     try:
                         error_response = exc.read()
                         error_parsed = json.loads(error_response.decode("utf-8"))
@@ -73,22 +198,105 @@ class HttpClient:
 
                     raise  # re-raise
 
-    @tenacity.retry(retry=tenacity.retry_if_exception(is_expected_to_be_transient))
-    def get_xml(self, url: str) -> etree.ElementBase:
+    def get_streaming(
+        self,
+        url: str,
+        consume: typing.Callable[[typing.BinaryIO], T],
+        cache_ttl: float | None = None,
+    ) -> T:
+        """
+        Hand the (unread) response body to `consume`, which is expected to read it incrementally.
+        On a transient error the request is retried as a whole, including `consume`, up to 3 times.
+
+        When caching, the body is copied to the cache as `consume` reads it.
+        """
+        cache_key, cached = self._lookup("GET", url, cache_ttl)
+        if cached is not None and cached[0].is_fresh(time.time()):
+            HTTP_CACHE_HITS.inc()
+            return consume(io.BytesIO(cached[1]))
+
+        return self._get_streaming(url, consume, cache_key, cached, cache_ttl)
+
+    @tenacity.retry(
+        retry=tenacity.retry_if_exception(is_expected_to_be_transient),
+        stop=tenacity.stop_after_attempt(3),
+        wait=wait_strategy(default_retry_wait),
+        before=count_attempt,
+        before_sleep=count_retry,
+    )
+    def _get_streaming(
+        self,
+        url: str,
+        consume: typing.Callable[[typing.BinaryIO], T],
+        cache_key: str | None,
+        cached: tuple[CacheEntry, bytes] | None,
+        cache_ttl: float | None,
+    ) -> T:
         request = urllib.request.Request(url, method="GET")
-        with urllib.request.urlopen(request) as response:
-            response_body = response.read()
-            root: etree.ElementBase = etree.fromstring(response_body)
-            return root
+        if cached is not None:
+            for key, value in cached[0].validators().items():
+                request.add_header(key, value)
+        self._wait_for_rate_limit()
+        try:
+            with urllib.request.urlopen(request) as response:
+                body = counting_bytes_read(response)
+                if self._cache is None or cache_key is None or cache_ttl is None:
+                    return consume(body)
+
+                writer = self._cache.writer()
+                try:
+                    tee = _TeeReader(body, writer)
+                    result = consume(typing.cast(typing.BinaryIO, tee))
+                    tee.read()  # copy whatever `consume` didn't read
+                except BaseException:
+                    writer.discard()
+                    raise
+                writer.commit(cache_key, cache_ttl, *self._validators(response))
+                return result
+        except urllib.error.HTTPError as exc:
+            if self._is_not_modified(exc, cache_key, cached, cache_ttl):
+                return consume(io.BytesIO(typing.cast(tuple, cached)[1]))
+            raise
+
+    def _wait_for_rate_limit(self) -> None:
+        if self._rate_limiter is not None:
+            self._rate_limiter.acquire()
+
+    def _lookup(
+        self, method: str, url: str, cache_ttl: float | None
+    ) -> tuple[str | None, tuple[CacheEntry, bytes] | None]:
+        if self._cache is None or cache_ttl is None or method != "GET":
+            return None, None
+        cache_key = ResponseCache.key(method, url)
+        return cache_key, self._cache.get(cache_key)
+
+    def _store(
+        self,
+        cache_key: str,
+        response: typing.Any,
+        body: bytes,
+        cache_ttl: float | None,
+    ) -> None:
+        if self._cache is not None and cache_ttl is not None:
+            self._cache.store(cache_key, body, cache_ttl, *self._validators(response))
+
+    def _is_not_modified(
+        self,
+        exc: urllib.error.HTTPError,
+        cache_key: str | None,
+        cached: tuple[CacheEntry, bytes] | None,
+        cache_ttl: float | None,
+    ) -> bool:
+        if exc.code != http.HTTPStatus.NOT_MODIFIED or cached is None:
+            return False
+        if self._cache is not None and cache_key is not None and cache_ttl is not None:
+            self._cache.revalidated(cache_key, cache_ttl)
+        return True
+
+    def _validators(self, response: typing.Any) -> tuple[str | None, str | None]:
+        return response.headers.get("ETag"), response.headers.get("Last-Modified")
 
     def _wait(
         self, waiter: typing.Callable[[BaseException | None], float]
     ) -> tenacity.wait.wait_base:
-        class Waiter(tenacity.wait.wait_base):
-            def __call__(self, retry_state: tenacity.RetryCallState) -> float:
-                outcome = retry_state.outcome
-                if outcome is None:
-                    return waiter(None)
-                return waiter(outcome.exception())
-
-        return Waiter()
+        return wait_strategy(waiter)
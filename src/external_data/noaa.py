@@ -1,17 +1,30 @@
 import dataclasses
 import datetime
+import typing
+
+from lxml import etree
+import numpy as np
 
 from ..env import Env
-from .http_client import HttpClient
+from ..metrics import FORECAST_PARSE_TIME
+from .async_http_client import AsyncHttpClient
+from .http_client import (
+    HttpClient,
+    RetryWait,
+    default_retry_wait,
+)
 
 # Dimensions of the weather forecast to use as part of solar production prediction. Tuple order:
 #   (Dimension name, XML tag, XML "type" attribute, formatter)
-DIMS = [
+DIMS: list[tuple[str, str, str | None, typing.Callable]] = [
     ("temp", "temperature", "hourly", float),
     ("cloudcover", "cloud-amount", None, float),
     ("humidity", "humidity", "relative", float),
 ]
 
+FORECAST_CACHE_TTL = 60 * 60  # seconds; NOAA updates point forecasts about hourly
+NO_UTC_OFFSET = np.iinfo(np.int16).min  # Forecast hour was a naive datetime
+
 
 @dataclasses.dataclass
 class WeatherPrediction:
@@ -25,10 +38,129 @@ class HourlyForecast:
     predictions: list[WeatherPrediction] = dataclasses.field(default_factory=list)
 
 
-@dataclasses.dataclass
+class ColumnarForecast:
+    """
+    Array-backed hourly forecast: one row per forecast hour (in chronological order), with
+    the local wall-clock start of each hour in `timestamps` and one float64 column per dimension.
+    Missing values are NaN.
+
+    Per-day views (`day`, `days`) slice the underlying arrays and do not copy them.
+    """
+
+    timestamps: np.ndarray  # datetime64[m], local wall-clock time
+    utc_offsets: np.ndarray  # minutes east of UTC for each timestamp, or NO_UTC_OFFSET
+    columns: dict[str, np.ndarray]
+
+    def __init__(
+        self,
+        timestamps: np.ndarray,
+        utc_offsets: np.ndarray,
+        columns: dict[str, np.ndarray],
+    ) -> None:
+        self.timestamps = timestamps
+        self.utc_offsets = utc_offsets
+        self.columns = columns
+
+    @classmethod
+    def from_datetimes(
+        cls, forecast_hours: typing.Sequence[datetime.datetime]
+    ) -> "ColumnarForecast":
+        """Allocate an all-NaN forecast with a column for each dimension in `DIMS`."""
+        timestamps = np.array(
+            [hour.replace(tzinfo=None) for hour in forecast_hours],
+            dtype="datetime64[m]",
+        )
+        utc_offsets = np.array(
+            [_utc_offset_minutes(hour) for hour in forecast_hours], dtype=np.int16
+        )
+        columns = {
+            name: np.full(len(forecast_hours), np.nan, dtype=np.float64)
+            for name, *_ in DIMS
+        }
+        return cls(timestamps, utc_offsets, columns)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def hours(self) -> np.ndarray:
+        """Hour of day (0..23) of each row."""
+        days = self.timestamps.astype("datetime64[D]")
+        return (self.timestamps - days).astype("timedelta64[h]").astype(np.int64)
+
+    def dates(self) -> list[datetime.date]:
+        days, _ = self._day_boundaries()
+        return [day.item() for day in days]
+
+    def days(self) -> list["ColumnarForecast"]:
+        days, starts = self._day_boundaries()
+        ends = [*starts[1:], len(self)]
+        return [self[start:end] for start, end in zip(starts, ends)]
+
+    def day(self, date: datetime.date) -> "ColumnarForecast":
+        days = self.timestamps.astype("datetime64[D]")
+        day = np.datetime64(date, "D")
+        start, end = np.searchsorted(days, [day, day + 1])
+        return self[start:end]
+
+    def daily(self) -> list["DailyForecast"]:
+        return [DailyForecast(day.dates()[0], columns=day) for day in self.days()]
+
+    def __getitem__(self, index: slice) -> "ColumnarForecast":
+        return ColumnarForecast(
+            self.timestamps[index],
+            self.utc_offsets[index],
+            {name: column[index] for name, column in self.columns.items()},
+        )
+
+    def _day_boundaries(self) -> tuple[np.ndarray, np.ndarray]:
+        days, starts = np.unique(
+            self.timestamps.astype("datetime64[D]"), return_index=True
+        )
+        return days, starts
+
+
 class DailyForecast:
+    """
+    Hourly forecast for one day.
+    When backed by a `ColumnarForecast` day view, `hourly` is only materialized on first access.
+    """
+
     date: datetime.date
-    hourly: list[HourlyForecast] = dataclasses.field(default_factory=list)
+    _hourly: list[HourlyForecast] | None
+    _columns: ColumnarForecast | None
+
+    def __init__(
+        self,
+        date: datetime.date,
+        hourly: list[HourlyForecast] | None = None,
+        columns: ColumnarForecast | None = None,
+    ) -> None:
+        self.date = date
+        self._columns = columns
+        self._hourly = hourly
+        if hourly is None and columns is None:
+            self._hourly = []
+
+    @property
+    def columns(self) -> ColumnarForecast | None:
+        return self._columns
+
+    @property
+    def hourly(self) -> list[HourlyForecast]:
+        if self._hourly is None:
+            self._hourly = _materialize_hourly(
+                typing.cast(ColumnarForecast, self._columns)
+            )
+        return self._hourly
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DailyForecast):
+            return NotImplemented
+        return self.date == other.date and self.hourly == other.hourly
+
+    def __repr__(self) -> str:
+        return f"DailyForecast(date={self.date!r}, hours={len(self.hourly)})"
 
 
 class XMLParseError(Exception):
@@ -38,34 +170,103 @@ class XMLParseError(Exception):
 class NoaaApi:
     _env: Env
     _http_client: HttpClient
+    _async_http_client: AsyncHttpClient
 
     def __init__(
-        self, http_client: HttpClient = HttpClient(), env: Env = Env()
+        self,
+        http_client: HttpClient = HttpClient(),
+        env: Env = Env(),
+        async_http_client: AsyncHttpClient = AsyncHttpClient(),
     ) -> None:
         self._env = env
         self._http_client = http_client
+        self._async_http_client = async_http_client
 
     def get_forecast(self) -> list[DailyForecast]:
         """
         Return 168hr point forecast, grouped by date
+        """
+        return self.get_forecast_columns().daily()
 
-        lxml ElementBase docs:
-        https://lxml.de/apidoc/lxml.etree.html#lxml.etree.ElementBase
+    def get_forecast_columns(
+        self, latlong: tuple[float, float] | None = None
+    ) -> ColumnarForecast:
+        """
+        Return 168hr point forecast as a `ColumnarForecast`.
+        Defaults to the forecast for the location configured in `Env`.
         """
-        hourly_forecasts: list[HourlyForecast] = []
+        return self._http_client.get_streaming(
+            self._forecast_url(latlong), parse_dwml, cache_ttl=FORECAST_CACHE_TTL
+        )
 
-        lat, lon = self._env.latlong()
-        root = self._http_client.get_xml(
-            f"https://forecast.weather.gov/MapClick.php?lat={lat}&lon={lon}&FcstType=digitalDWML"
+    async def get_forecast_columns_async(
+        self,
+        latlong: tuple[float, float] | None = None,
+        retry_wait: RetryWait = default_retry_wait,
+    ) -> ColumnarForecast:
+        """
+        Like `get_forecast_columns`, but fetched through the `AsyncHttpClient`
+        so that forecasts for many locations can be fetched concurrently.
+        """
+        return await self._async_http_client.get_streaming(
+            self._forecast_url(latlong), parse_dwml, retry_wait
         )
 
-        time_layout = root.find("./data/time-layout")
-        one_hour = datetime.timedelta(hours=1)
-        forecast_hour_start = None
-        for element in time_layout.iter(("start-valid-time", "end-valid-time")):
-            if element.tag == "start-valid-time":
+    def _forecast_url(self, latlong: tuple[float, float] | None) -> str:
+        lat, lon = latlong if latlong is not None else self._env.latlong()
+        return f"https://forecast.weather.gov/MapClick.php?lat={lat}&lon={lon}&FcstType=digitalDWML"
+
+
+@FORECAST_PARSE_TIME.timed
+def parse_dwml(source: typing.BinaryIO) -> ColumnarForecast:
+    """
+    Parse a digital DWML document into a `ColumnarForecast` in a single streaming pass.
+
+    Only the first `time-layout` and, for each dimension in `DIMS`, the first matching parameter
+    element are read. Elements are discarded as soon as they have been consumed, so memory use
+    does not grow with the size of the document.
+
+    lxml iterparse docs:
+    https://lxml.de/parsing.html#iterparse-and-iterwalk
+    """
+    forecast_hours: list[datetime.datetime] = []
+    forecast: ColumnarForecast | None = None
+    one_hour = datetime.timedelta(hours=1)
+    forecast_hour_start = None
+    in_time_layout = False
+
+    # Dimensions not yet read, by XML tag
+    dims_by_tag: dict[str, list[tuple[str, str | None, typing.Callable]]] = {}
+    for dim_name, dim_tag, dim_type, dim_formatter in DIMS:
+        dims_by_tag.setdefault(dim_tag, []).append((dim_name, dim_type, dim_formatter))
+    # (dimension name, formatter, column) of the parameter being read,
+    # and the index of the next value to be read into the column
+    current: tuple[str, typing.Callable, np.ndarray] | None = None
+    i = 0
+
+    for event, element in etree.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag == "time-layout" and forecast is None:
+                in_time_layout = True
+            elif tag in dims_by_tag and current is None:
+                for dim in dims_by_tag[tag]:
+                    dim_name, dim_type, dim_formatter = dim
+                    if dim_type is None or element.get("type") == dim_type:
+                        if forecast is None:
+                            raise XMLParseError(
+                                f"Visited a '{tag}' element before a 'time-layout' element."
+                            )
+                        current = (dim_name, dim_formatter, forecast.columns[dim_name])
+                        dims_by_tag[tag].remove(dim)
+                        i = 0
+                        break
+            continue
+
+        if in_time_layout:
+            if tag == "start-valid-time":
                 forecast_hour_start = datetime.datetime.fromisoformat(element.text)
-            if element.tag == "end-valid-time":
+            elif tag == "end-valid-time":
                 if forecast_hour_start is None:
                     raise XMLParseError(
                         "Visited an 'end-valid-time' element before a 'start-valid-time' element."
@@ -75,33 +276,59 @@ class NoaaApi:
                     raise XMLParseError(
                         f"Time step between 'start-valid-time' ({forecast_hour_start}) and 'end-valid-time' ({forecast_hour_end}) is not one hour"
                     )
-                hourly_forecasts.append(HourlyForecast(forecast_hour_start))
-
-        parameters = root.find("./data/parameters")
-        for name, el_tag, el_type, formatter in DIMS:
-            xpath_expression = f"//{el_tag}"
-            if el_type is not None:
-                xpath_expression = f'{xpath_expression}[@type="{el_type}"]'
-            parameter = parameters.xpath(xpath_expression)[0]
-            i = 0
-            for value in parameter.iter("value"):
-                hour_forecast = hourly_forecasts[i]
+                forecast_hours.append(forecast_hour_start)
+            elif tag == "time-layout":
+                in_time_layout = False
+                forecast = ColumnarForecast.from_datetimes(forecast_hours)
+        elif current is not None:
+            dim_name, dim_formatter, column = current
+            if tag == "value" and element.getparent().tag in dims_by_tag:
+                if i >= len(column):
+                    raise XMLParseError(
+                        f"More {dim_name} values than forecast hours ({len(column)})"
+                    )
                 try:
-                    formatted = formatter(value.text)
+                    column[i] = dim_formatter(element.text)
                 except TypeError:
-                    print(f"Failed to format {value.text} for {parameter}")
-                    continue
-                prediction = WeatherPrediction(name, formatted)
-                hour_forecast.predictions.append(prediction)
+                    print(f"Failed to format {element.text} for {dim_name}")
                 i += 1
+            elif tag in dims_by_tag:
+                current = None
+
+        # Discard what has been consumed
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+    if forecast is None:
+        raise XMLParseError("Document has no 'time-layout' element.")
+    missing = [dim_name for dims in dims_by_tag.values() for dim_name, *_ in dims]
+    if missing:
+        raise XMLParseError(f"Document has no parameters for {', '.join(missing)}")
+
+    return forecast
+
 
-        # group into daily forecasts
-        daily: dict[datetime.date, DailyForecast] = {}
-        for hour_forecast in hourly_forecasts:
-            date = hour_forecast.forecast_hour.date()
-            if date not in daily:
-                daily[date] = DailyForecast(date)
+def _utc_offset_minutes(dt: datetime.datetime) -> int:
+    offset = dt.utcoffset()
+    if offset is None:
+        return NO_UTC_OFFSET
+    return int(offset.total_seconds() // 60)
 
-            daily[date].hourly.append(hour_forecast)
 
-        return list(daily.values())
+def _materialize_hourly(forecast: ColumnarForecast) -> list[HourlyForecast]:
+    hourly: list[HourlyForecast] = []
+    for i, (timestamp, utc_offset) in enumerate(
+        zip(forecast.timestamps, forecast.utc_offsets)
+    ):
+        forecast_hour: datetime.datetime = timestamp.item()
+        if utc_offset != NO_UTC_OFFSET:
+            tz = datetime.timezone(datetime.timedelta(minutes=int(utc_offset)))
+            forecast_hour = forecast_hour.replace(tzinfo=tz)
+        hour_forecast = HourlyForecast(forecast_hour)
+        for name, column in forecast.columns.items():
+            value = column[i]
+            if not np.isnan(value):
+                hour_forecast.predictions.append(WeatherPrediction(name, float(value)))
+        hourly.append(hour_forecast)
+    return hourly
@@ -0,0 +1,46 @@
+import collections
+import threading
+import time
+
+
+class SlidingWindowLimiter:
+    """
+    Thread-safe rate limiter allowing at most `max_requests` requests in any `window` seconds.
+    Keeps the send times of the last `max_requests` requests; once it holds that many, a request
+    waits until the oldest of them is `window` seconds old. Nothing is allowed in advance, so
+    the limit holds from the first request on (within a process).
+    """
+
+    max_requests: int
+    window: float
+    _sent_at: collections.deque[float]
+    _lock: threading.Lock
+
+    def __init__(self, max_requests: int, window: float) -> None:
+        if max_requests < 1:
+            raise ValueError(f"max_requests must be at least 1, got {max_requests}")
+        self.max_requests = max_requests
+        self.window = window
+        self._sent_at = collections.deque(maxlen=max_requests)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_hour(cls, requests_per_hour: int) -> "SlidingWindowLimiter":
+        """A limiter allowing `requests_per_hour` requests in any one-hour window."""
+        return cls(requests_per_hour, 60 * 60)
+
+    def acquire(self) -> None:
+        """Block until a request may be sent without exceeding the limit, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = (
+                    self._sent_at[0] + self.window - now
+                    if len(self._sent_at) == self.max_requests
+                    else 0.0
+                )
+                if wait <= 0:
+                    # At capacity, appending drops the oldest send time
+                    self._sent_at.append(now)
+                    return
+            time.sleep(wait)
@@ -0,0 +1,122 @@
+import dataclasses
+import datetime
+import http
+import typing
+import urllib.error
+import urllib.parse
+
+import numpy as np
+
+from ..env import Env
+from .http_cache import NEVER_EXPIRES
+from .http_client import HttpClient
+
+# Hourly observations requested; Visual Crossing's names for them
+ELEMENTS = ("temp", "humidity", "cloudcover")
+
+# Visual Crossing may revise observations for recent days
+OBSERVATIONS_SETTLED_AFTER = datetime.timedelta(days=7)
+RECENT_OBSERVATIONS_CACHE_TTL = 60 * 60  # seconds
+
+
+class HourResponse(typing.TypedDict, total=False):
+    datetime: str  # e.g. "13:00:00"
+    temp: float | None
+    humidity: float | None
+    cloudcover: float | None
+
+
+class DayResponse(typing.TypedDict):
+    datetime: str  # e.g. "2017-12-13"
+    hours: list[HourResponse]
+
+
+class TimelineResponse(typing.TypedDict):
+    days: list[DayResponse]
+
+
+@dataclasses.dataclass
+class HistoricalWeather:
+    """
+    Hourly observations, one row per hour in chronological order. `timestamps` are local
+    wall-clock times (datetime64[s]); missing observations are NaN.
+    """
+
+    timestamps: np.ndarray
+    columns: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+
+class VisualCrossingApi:
+    """
+    Client for https://www.visualcrossing.com/resources/documentation/weather-api/timeline-weather-api/
+    """
+
+    _env: Env
+    _http_client: HttpClient
+
+    def __init__(
+        self, http_client: HttpClient = HttpClient(), env: Env = Env()
+    ) -> None:
+        self._env = env
+        self._http_client = http_client
+
+    def get_historical_weather(
+        self,
+        start_date: datetime.date,
+        end_date: datetime.date,
+        latlong: tuple[float, float] | None = None,
+    ) -> HistoricalWeather:
+        """
+        Hourly observations from `start_date` through `end_date` (inclusive), in a single request,
+        near `latlong` (defaults to the location configured in `Env`). Units are US (e.g., °F).
+        """
+        lat, lon = latlong if latlong is not None else self._env.latlong()
+        query_parameters = {
+            "unitGroup": "us",
+            "include": "hours",
+            "elements": ",".join(("datetime", *ELEMENTS)),
+            "contentType": "json",
+            "key": self._env.visual_crossing_api_key(),
+        }
+        url = (
+            "https://weather.visualcrossing.com/VisualCrossingWebServices/rest/services/timeline/"
+            f"{lat},{lon}/{start_date.isoformat()}/{end_date.isoformat()}"
+            f"?{urllib.parse.urlencode(query_parameters)}"
+        )
+        settled = end_date < datetime.date.today() - OBSERVATIONS_SETTLED_AFTER
+        response: TimelineResponse = self._http_client.get_json(
+            url,
+            retry_wait=self._retry_waiter,
+            cache_ttl=NEVER_EXPIRES if settled else RECENT_OBSERVATIONS_CACHE_TTL,
+        )
+        return self._to_columns(response)
+
+    def _to_columns(self, response: TimelineResponse) -> HistoricalWeather:
+        timestamps: list[str] = []
+        values: dict[str, list[float]] = {element: [] for element in ELEMENTS}
+        for day in response.get("days", []):
+            for hour in day.get("hours", []):
+                timestamps.append(f"{day['datetime']}T{hour['datetime']}")
+                for element in ELEMENTS:
+                    value = typing.cast(float | None, hour.get(element))
+                    values[element].append(np.nan if value is None else float(value))
+
+        return HistoricalWeather(
+            np.array(timestamps, dtype="datetime64[s]"),
+            {
+                element: np.array(column, dtype=np.float64)
+                for element, column in values.items()
+            },
+        )
+
+    def _retry_waiter(self, exc: BaseException | None) -> float:
+        if (
+            isinstance(exc, urllib.error.HTTPError)
+            and http.HTTPStatus(int(exc.code)) == http.HTTPStatus.TOO_MANY_REQUESTS
+        ):
+            return 60.0  # Visual Crossing limits concurrent requests; back off briefly
+
+        return 2.0  # Any other transient error, just wait a couple seconds
@@ -0,0 +1,526 @@
+"""
+Features shared by training and inference.
+
+Weather features are stored long-format, one row per (day, hour, variable), and materialized
+into the wide `<variable>|<hour>` matrix a model expects (see `FeatureLayout`) with array
+operations. Observations (for training) and forecasts (for inference) use the same variable
+names and go through the same materialization, so the two can't drift apart.
+
+The store holds observations, as a tree of Parquet files partitioned by source, site and
+calendar month:
+```
+feature_store/v<SCHEMA_VERSION>/<source>/<site_id>/<YYYY>-<MM>.parquet
+    date_of_prediction DATE, date DATE, hour UTINYINT, variable VARCHAR, value DOUBLE
+```
+For observations, `date_of_prediction` is the observed date. Reads only open the partitions
+spanning the requested dates, filter within them in DuckDb, and are cached until a partition
+changes. Forecasts persisted for replay stay in predictions-db (see
+`persistence.forecast_features`), converted to long format by the same `forecast_values` and
+materialized again by the same `feature_matrix` when replayed.
+"""
+import dataclasses
+import datetime
+import enum
+import functools
+import os
+import pathlib
+import textwrap
+import typing
+
+import duckdb
+import numpy as np
+
+from .external_data import DailyForecast
+from .external_data.visual_crossing import (
+    OBSERVATIONS_SETTLED_AFTER,
+)
+from .model import (
+    OBSERVATION_NAME_AND_HOUR_SEPARATOR,
+)
+from .model.data.constants import (
+    FEATURE_STORE_DIR,
+    WEATHER_DIMS,
+)
+
+# Bump when the partition schema changes; each version is stored in its own directory
+SCHEMA_VERSION = 1
+RESPONSE_VARIABLE = "energy_production_Wh"
+HOURS_PER_DAY = 24
+
+STAGED_FEATURES_TBL = "staged_features"
+
+
+class Source(enum.Enum):
+    OBSERVED = "observed"
+
+
+@dataclasses.dataclass(frozen=True)
+class FeatureLayout:
+    """
+    Compiled mapping of a model's fieldnames to feature matrix columns.
+    Build with `compile_feature_layout`; it is cached per distinct set of fieldnames.
+    """
+
+    features: tuple[str, ...]
+    month_columns: tuple[int, ...]
+    # (column, weather prediction variable, hour)
+    weather_columns: tuple[tuple[int, str, int], ...]
+    # (weather prediction variable, columns, hours); used to fill columnar forecasts
+    weather_columns_by_variable: tuple[tuple[str, np.ndarray, np.ndarray], ...]
+
+    @property
+    def n_features(self) -> int:
+        return len(self.features)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_feature_layout(fieldnames: tuple[str, ...]) -> FeatureLayout:
+    features: list[str] = []
+    month_columns: list[int] = []
+    weather_columns: list[tuple[int, str, int]] = []
+    for field in fieldnames:
+        if field == RESPONSE_VARIABLE:
+            continue
+        match field.split(OBSERVATION_NAME_AND_HOUR_SEPARATOR):
+            case ["date"]:
+                month_columns.append(len(features))
+            case ["pm25_daily_avg"]:
+                # TODO
+                continue
+            case [weather_prediction_variable, hour]:
+                weather_columns.append(
+                    (len(features), weather_prediction_variable, int(hour))
+                )
+            case _:
+                raise ValueError(f"Unrecognized model fieldname: {field}")
+        features.append(field)
+
+    weather_columns_by_variable = []
+    for variable in dict.fromkeys(variable for _, variable, _ in weather_columns):
+        columns, hours = zip(*((c, h) for c, v, h in weather_columns if v == variable))
+        weather_columns_by_variable.append(
+            (variable, np.array(columns), np.array(hours))
+        )
+
+    return FeatureLayout(
+        tuple(features),
+        tuple(month_columns),
+        tuple(weather_columns),
+        tuple(weather_columns_by_variable),
+    )
+
+
+def materialize(
+    rows: np.ndarray,
+    months: np.ndarray,
+    hour: np.ndarray,
+    variable: np.ndarray,
+    value: np.ndarray,
+    layout: FeatureLayout,
+) -> np.ndarray:
+    """
+    Wide (len(months), layout.n_features) matrix from long-format values: value `i` is
+    `variable[i]` at `hour[i]` for matrix row `rows[i]`, whose month (1..12) is `months[row]`.
+    Features without a value are NaN. If a (row, variable, hour) is repeated, the first value wins.
+    """
+    X = np.full((len(months), layout.n_features), np.nan, dtype=np.float64)
+    for column in layout.month_columns:
+        X[:, column] = months
+
+    column_of_value = np.full(len(value), -1, dtype=np.intp)
+    for name, columns, hours in layout.weather_columns_by_variable:
+        column_of_hour = np.full(HOURS_PER_DAY, -1, dtype=np.intp)
+        column_of_hour[hours] = columns
+        is_variable = variable == name
+        column_of_value[is_variable] = column_of_hour[hour[is_variable]]
+
+    used = np.flatnonzero(column_of_value >= 0)[::-1]
+    # Assigned in reverse, so that the first of any repeated value is assigned last
+    X[rows[used], column_of_value[used]] = value[used]
+    return X
+
+
+def forecast_values(
+    daily_forecasts: typing.Sequence[DailyForecast],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Long-format values of many forecast days: (rows, hour, variable, value), where `rows` indexes
+    `daily_forecasts`. Columnar forecasts are converted without a per-hour loop; values missing
+    from a columnar forecast are included as NaN.
+    """
+    rows: list[np.ndarray] = []
+    hours: list[np.ndarray] = []
+    variables: list[np.ndarray] = []
+    values: list[np.ndarray] = []
+    for row, daily_forecast in enumerate(daily_forecasts):
+        columnar = daily_forecast.columns
+        if columnar is not None:
+            forecast_hours = columnar.hours
+            for name, column in columnar.columns.items():
+                rows.append(np.full(len(column), row, dtype=np.intp))
+                hours.append(forecast_hours)
+                variables.append(np.full(len(column), name, dtype=object))
+                values.append(column)
+            continue
+
+        predictions = [
+            (hourly.forecast_hour.hour, prediction.type, float(prediction.value))
+            for hourly in daily_forecast.hourly
+            for prediction in hourly.predictions
+        ]
+        rows.append(np.full(len(predictions), row, dtype=np.intp))
+        hours.append(np.array([hour for hour, _, _ in predictions], dtype=np.int64))
+        variables.append(np.array([name for _, name, _ in predictions], dtype=object))
+        values.append(
+            np.array([value for _, _, value in predictions], dtype=np.float64)
+        )
+
+    if not values:
+        return (
+            np.empty(0, dtype=np.intp),
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=object),
+            np.empty(0, dtype=np.float64),
+        )
+    return (
+        np.concatenate(rows),
+        np.concatenate(hours),
+        np.concatenate(variables),
+        np.concatenate(values),
+    )
+
+
+@dataclasses.dataclass
+class HourlyFeatures:
+    """Long-format feature values; one entry per (date_of_prediction, date, hour, variable)."""
+
+    date_of_prediction: np.ndarray  # datetime64[D]
+    date: np.ndarray  # datetime64[D]
+    hour: np.ndarray  # uint8
+    variable: np.ndarray  # str
+    value: np.ndarray  # float64
+
+    @classmethod
+    def from_daily_forecasts(
+        cls,
+        daily_forecasts: typing.Sequence[DailyForecast],
+        date_of_prediction: datetime.date,
+    ) -> "HourlyFeatures":
+        """Forecast values; missing values are dropped, and the first forecast for an hour wins."""
+        rows, hour, variable, value = forecast_values(daily_forecasts)
+        dates = np.array(
+            [daily_forecast.date for daily_forecast in daily_forecasts],
+            dtype="datetime64[D]",
+        )
+        features = cls(
+            np.full(len(value), date_of_prediction, dtype="datetime64[D]"),
+            dates[rows] if len(rows) else np.empty(0, dtype="datetime64[D]"),
+            hour.astype(np.uint8),
+            variable,
+            value,
+        )
+        return features.valid()
+
+    @classmethod
+    def from_observations(
+        cls, timestamps: np.ndarray, columns: dict[str, np.ndarray]
+    ) -> "HourlyFeatures":
+        """Hourly observations (`timestamps` as local datetime64), one column per variable."""
+        days = timestamps.astype("datetime64[D]")
+        hours = (timestamps - days).astype("timedelta64[h]").astype(np.uint8)
+        names = list(columns)
+        n = len(timestamps)
+        return cls(
+            np.tile(days, len(names)),
+            np.tile(days, len(names)),
+            np.tile(hours, len(names)),
+            np.repeat(np.array(names, dtype=object), n),
+            np.concatenate([columns[name] for name in names]).astype(np.float64),
+        ).valid()
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def valid(self) -> "HourlyFeatures":
+        """Without missing (NaN) values, and with only the first of any repeated entry."""
+        present = np.flatnonzero(~np.isnan(self.value))
+        keys = np.rec.fromarrays(
+            [
+                self.date_of_prediction[present].astype(np.int64),
+                self.date[present].astype(np.int64),
+                self.hour[present],
+                self.variable[present].astype(str),
+            ]
+        )
+        _, first = np.unique(keys, return_index=True)
+        keep = present[np.sort(first)]
+        return self[keep]
+
+    def __getitem__(self, index: np.ndarray) -> "HourlyFeatures":
+        return HourlyFeatures(
+            self.date_of_prediction[index],
+            self.date[index],
+            self.hour[index],
+            self.variable[index],
+            self.value[index],
+        )
+
+    def columns(self) -> list[list]:
+        """Each column as a list of Python values, e.g., to bind as DuckDb list parameters."""
+        return [
+            self.date_of_prediction.astype("datetime64[D]").tolist(),
+            self.date.astype("datetime64[D]").tolist(),
+            self.hour.tolist(),
+            self.variable.tolist(),
+            self.value.tolist(),
+        ]
+
+
+@dataclasses.dataclass
+class FeatureMatrix:
+    """Row `i` of `X` holds the features of `date[i]`, as known on `date_of_prediction[i]`."""
+
+    date_of_prediction: np.ndarray  # datetime64[D]
+    date: np.ndarray  # datetime64[D]
+    X: np.ndarray
+    sufficient: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+
+def feature_matrix(features: HourlyFeatures, layout: FeatureLayout) -> FeatureMatrix:
+    """One row per distinct (date_of_prediction, date), ordered by date then date_of_prediction."""
+    keys = np.rec.fromarrays(
+        [features.date.astype(np.int64), features.date_of_prediction.astype(np.int64)]
+    )
+    unique_keys, rows = np.unique(keys, return_inverse=True)
+    dates = unique_keys.f0.astype("datetime64[D]")
+    X = materialize(
+        rows,
+        dates.astype("datetime64[M]").astype(np.int64) % 12 + 1,
+        features.hour,
+        features.variable,
+        features.value,
+        layout,
+    )
+    return FeatureMatrix(
+        unique_keys.f1.astype("datetime64[D]"),
+        dates,
+        X,
+        ~np.isnan(X).any(axis=1),
+    )
+
+
+def month_start(date: datetime.date) -> datetime.date:
+    return date.replace(day=1)
+
+
+def month_end(date: datetime.date) -> datetime.date:
+    next_month = (date.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return next_month - datetime.timedelta(days=1)
+
+
+def months_between(
+    date_start: datetime.date, date_end: datetime.date
+) -> list[datetime.date]:
+    """First day of each calendar month overlapping `date_start`..`date_end`."""
+    months = []
+    month = month_start(date_start)
+    while month <= date_end:
+        months.append(month)
+        month = month_end(month) + datetime.timedelta(days=1)
+    return months
+
+
+class FeatureStore:
+    _root: pathlib.Path
+
+    def __init__(self, root: pathlib.Path = FEATURE_STORE_DIR) -> None:
+        self._root = root / f"v{SCHEMA_VERSION}"
+
+    def partition_path(
+        self, source: Source, site_id: str, month: datetime.date
+    ) -> pathlib.Path:
+        return (
+            self._root / source.value / site_id / f"{month.strftime('%Y-%m')}.parquet"
+        )
+
+    def partitions(
+        self,
+        source: Source,
+        site_id: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+    ) -> list[pathlib.Path]:
+        """The existing partitions spanning `date_start`..`date_end`."""
+        return [
+            partition
+            for partition in (
+                self.partition_path(source, site_id, month)
+                for month in months_between(date_start, date_end)
+            )
+            if partition.exists()
+        ]
+
+    def is_complete(self, source: Source, site_id: str, month: datetime.date) -> bool:
+        """
+        Whether the month's partition exists and was written once the month's observations had
+        settled (`OBSERVATIONS_SETTLED_AFTER` after the month was over); until then they may
+        still be revised, so the month is downloaded again.
+        """
+        partition = self.partition_path(source, site_id, month)
+        if not partition.exists():
+            return False
+        written = datetime.date.fromtimestamp(partition.stat().st_mtime)
+        return written > month_end(month) + OBSERVATIONS_SETTLED_AFTER
+
+    def write(self, source: Source, site_id: str, features: HourlyFeatures) -> int:
+        """
+        Merge values into their months' partitions; a value replaces any already stored for the
+        same (date_of_prediction, date, hour, variable). Each partition is replaced atomically.
+        Returns the number of values written.
+        """
+        unknown = set(features.variable.tolist()) - set(WEATHER_DIMS)
+        if unknown:
+            raise ValueError(f"Unrecognized feature variables: {', '.join(unknown)}")
+
+        months = features.date.astype("datetime64[M]")
+        for month in np.unique(months):
+            self._write_partition(
+                self.partition_path(source, site_id, month.astype(datetime.date)),
+                features[np.flatnonzero(months == month)],
+            )
+        return len(features)
+
+    def read(
+        self,
+        source: Source,
+        site_id: str,
+        date_start: datetime.date,
+        date_end: datetime.date,
+    ) -> HourlyFeatures:
+        """
+        Values for `date_start`..`date_end` (inclusive).
+        The result is shared between callers; don't modify it.
+        """
+        partitions = tuple(
+            (str(partition), partition.stat().st_mtime_ns)
+            for partition in self.partitions(source, site_id, date_start, date_end)
+        )
+        return _read_partitions(partitions, date_start, date_end)
+
+    def feature_matrix(
+        self,
+        source: Source,
+        site_id: str,
+        fieldnames: typing.Sequence[str],
+        date_start: datetime.date,
+        date_end: datetime.date,
+    ) -> FeatureMatrix:
+        """The feature matrix (for a model with `fieldnames`) of `read`."""
+        return feature_matrix(
+            self.read(source, site_id, date_start, date_end),
+            compile_feature_layout(tuple(fieldnames)),
+        )
+
+    def _write_partition(
+        self, partition: pathlib.Path, features: HourlyFeatures
+    ) -> None:
+        partition.parent.mkdir(parents=True, exist_ok=True)
+        partial = partition.with_name(f".{partition.name}.partial")
+
+        db_con = duckdb.connect()
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                CREATE TEMP TABLE {STAGED_FEATURES_TBL} (
+                    date_of_prediction  DATE NOT NULL,
+                    date                DATE NOT NULL,
+                    hour                UTINYINT NOT NULL,
+                    variable            VARCHAR NOT NULL,
+                    value               DOUBLE NOT NULL
+                );
+            """
+            )
+        )
+        # One statement for the whole partition: each column is bound as a list and unnested
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                INSERT INTO {STAGED_FEATURES_TBL}
+                SELECT
+                    unnest(?::DATE[]),
+                    unnest(?::DATE[]),
+                    unnest(?::UTINYINT[]),
+                    unnest(?::VARCHAR[]),
+                    unnest(?::DOUBLE[]);
+            """
+            ),
+            features.columns(),
+        )
+        merged = f"SELECT * FROM {STAGED_FEATURES_TBL}"
+        if partition.exists():
+            merged += textwrap.dedent(
+                f"""
+                UNION ALL
+                SELECT existing.*
+                FROM read_parquet({_sql_string(partition)}) AS existing
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM {STAGED_FEATURES_TBL} AS staged
+                    WHERE
+                        staged.date_of_prediction = existing.date_of_prediction
+                        AND staged.date = existing.date
+                        AND staged.hour = existing.hour
+                        AND staged.variable = existing.variable
+                )"""
+            )
+        db_con.execute(
+            f"COPY ({merged}\nORDER BY date, date_of_prediction, hour, variable) TO {_sql_string(partial)} (FORMAT PARQUET);"
+        )
+        db_con.close()
+        os.replace(partial, partition)
+
+
+@functools.lru_cache(maxsize=32)
+def _read_partitions(
+    partitions: tuple[tuple[str, int], ...],  # (path, modification time)
+    date_start: datetime.date,
+    date_end: datetime.date,
+) -> HourlyFeatures:
+    if not partitions:
+        return HourlyFeatures(
+            np.empty(0, dtype="datetime64[D]"),
+            np.empty(0, dtype="datetime64[D]"),
+            np.empty(0, dtype=np.uint8),
+            np.empty(0, dtype=object),
+            np.empty(0, dtype=np.float64),
+        )
+
+    files = ", ".join(_sql_string(pathlib.Path(path)) for path, _ in partitions)
+    result = (
+        duckdb.connect()
+        .execute(
+            f"""\
+SELECT *
+FROM read_parquet([{files}])
+WHERE date BETWEEN ? AND ?
+ORDER BY date, date_of_prediction, hour, variable;
+""",
+            [date_start, date_end],
+        )
+        .fetchnumpy()
+    )
+    return HourlyFeatures(
+        np.asarray(result["date_of_prediction"]).astype("datetime64[D]"),
+        np.asarray(result["date"]).astype("datetime64[D]"),
+        np.asarray(result["hour"]).astype(np.uint8),
+        np.asarray(result["variable"]).astype(object),
+        np.asarray(result["value"]).astype(np.float64),
+    )
+
+
+def _sql_string(path: pathlib.Path) -> str:
+    escaped = str(path).replace("'", "''")
+    return f"'{escaped}'"
@@ -0,0 +1,207 @@
+"""
+Lightweight instrumentation of the hot paths: fetching (HTTP attempts, retries, bytes), parsing
+forecasts, building features, running the estimator, and writing to predictions-db.
+
+Metrics are off unless a job calls `enable`; while off, counting or timing something costs a
+check of a module-level flag. A job writes what was collected with `export`, either as a
+Prometheus textfile (e.g., for node_exporter's textfile collector) or, for a `.json` path, as JSON.
+
+Timers are used as context managers or decorators:
+```
+with ESTIMATOR_TIME.time():
+    ...
+
+@DB_WRITE_TIME.timed
+def write_predictions(...):
+    ...
+```
+"""
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import threading
+import time
+import typing
+
+PREFIX = "solar_"
+
+F = typing.TypeVar("F", bound=typing.Callable[..., typing.Any])
+
+_enabled = False
+_NOT_TIMING = contextlib.nullcontext()
+
+
+def enable() -> None:
+    global _enabled
+    _enabled = True
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+class Counter:
+    name: str
+    description: str
+    _value: float
+    _lock: threading.Lock
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not _enabled:
+            return
+        with self._lock:
+            self._value += amount
+
+
+class Timer:
+    """Count, total and longest duration (seconds) of whatever it times."""
+
+    name: str
+    description: str
+    _count: int
+    _sum: float
+    _max: float
+    _lock: threading.Lock
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    @property
+    def max(self) -> float:
+        return self._max
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._count += 1
+            self._sum += seconds
+            self._max = max(self._max, seconds)
+
+    def time(self) -> typing.ContextManager[typing.Any]:
+        if not _enabled:
+            return _NOT_TIMING
+        return self._timing()
+
+    def timed(self, function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start)
+
+        return typing.cast(F, wrapper)
+
+    @contextlib.contextmanager
+    def _timing(self) -> typing.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+_METRICS: list[Counter | Timer] = []
+
+
+def counter(name: str, description: str) -> Counter:
+    metric = Counter(f"{PREFIX}{name}", description)
+    _METRICS.append(metric)
+    return metric
+
+
+def timer(name: str, description: str) -> Timer:
+    metric = Timer(f"{PREFIX}{name}", description)
+    _METRICS.append(metric)
+    return metric
+
+
+HTTP_ATTEMPTS = counter("http_attempts_total", "HTTP requests sent, including retries")
+HTTP_RETRIES = counter(
+    "http_retries_total", "HTTP requests retried after a transient error"
+)
+HTTP_RETRY_WAIT = counter(
+    "http_retry_wait_seconds_total", "Time spent waiting before retrying HTTP requests"
+)
+HTTP_CACHE_HITS = counter(
+    "http_cache_hits_total", "HTTP responses served from the response cache while fresh"
+)
+HTTP_DOWNLOADED_BYTES = counter(
+    "http_downloaded_bytes_total", "Bytes of HTTP response bodies read"
+)
+FORECAST_PARSE_TIME = timer(
+    "forecast_parse_seconds",
+    "Parsing NOAA forecasts (DWML), including streaming in the response body",
+)
+FEATURE_BUILD_TIME = timer(
+    "feature_build_seconds", "Building feature matrices from forecasts"
+)
+ESTIMATOR_TIME = timer("estimator_predict_seconds", "Running the model's estimator")
+DB_WRITE_TIME = timer("db_write_seconds", "Writing to predictions-db")
+
+
+def prometheus_text() -> str:
+    """Metrics in the Prometheus text exposition format; timers are summaries."""
+    lines: list[str] = []
+    for metric in _METRICS:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        if isinstance(metric, Counter):
+            lines.append(f"# TYPE {metric.name} counter")
+            lines.append(f"{metric.name} {metric.value}")
+        else:
+            lines.append(f"# TYPE {metric.name} summary")
+            lines.append(f"{metric.name}_sum {metric.sum}")
+            lines.append(f"{metric.name}_count {metric.count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_json() -> dict[str, typing.Any]:
+    return {
+        metric.name: (
+            metric.value
+            if isinstance(metric, Counter)
+            else {"count": metric.count, "sum": metric.sum, "max": metric.max}
+        )
+        for metric in _METRICS
+    }
+
+
+def export(path: pathlib.Path) -> None:
+    """
+    Write metrics to `path`, as JSON if it ends in `.json` and as a Prometheus textfile otherwise.
+    The file is replaced atomically, so a collector never reads a partial file.
+    """
+    content = (
+        json.dumps(to_json(), indent=2) if path.suffix == ".json" else prometheus_text()
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f".{path.name}.partial")
+    partial.write_text(content)
+    os.replace(partial, path)
@@ -1,15 +1,37 @@
+import typing
+
 from .data import (
     MAX_HOUR,
     MIN_HOUR,
     OBSERVATION_NAME_AND_HOUR_SEPARATOR,
 )
 from .model_base import Model
-from .v2022_12_30 import model
+from .registry import (
+    ModelNotTrainedError,
+    ModelRegistry,
+    RegisteredModel,
+    registry,
+)
 
 __all__ = (
     "OBSERVATION_NAME_AND_HOUR_SEPARATOR",
     "MAX_HOUR",
     "MIN_HOUR",
     "Model",
+    "ModelNotTrainedError",
+    "ModelRegistry",
+    "RegisteredModel",
     "model",
+    "registry",
 )
+
+
+def __getattr__(name: str) -> typing.Any:
+    # `model` (the latest registered version) is loaded on first access, not on import
+    if name == "model":
+        try:
+            return registry.latest().load()
+        except ModelNotTrainedError as exc:
+            print(exc)
+            return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,15 +1,15 @@
-from .create_training_set import (
+from .constants import (
     MAX_HOUR,
     MIN_HOUR,
     OBSERVATION_NAME_AND_HOUR_SEPARATOR,
 )
-from .create_training_set import (
-    OUTFILE as TRAINING_DATA,
-)
+from .constants import OUTFILE as TRAINING_DATA
 from .load import load_data
+from .training_artifact import load_training_data
 
 __all__ = (
     "load_data",
+    "load_training_data",
     "MAX_HOUR",
     "MIN_HOUR",
     "TRAINING_DATA",
@@ -0,0 +1,24 @@
+"""
+Training data locations and feature naming conventions.
+Kept free of imports beyond the standard library so that any entry point can import it cheaply.
+"""
+import pathlib
+
+DATA_DIR = pathlib.Path(__file__).parent
+
+### Inputs
+SOLAR_PRODUCTION = DATA_DIR / "solar_production-20171213_to_20221226.csv"
+WEATHER = DATA_DIR / "visualcrossing-20171201_to_20221229.csv"
+# Observed weather features, by site and month (see `src.feature_store`);
+# training reads observations from here when `WEATHER` isn't present
+FEATURE_STORE_DIR = DATA_DIR / "feature_store"
+AQI = DATA_DIR / "historical_aqi-2017-12-13_to_2022-12-26.csv"
+
+### Joined dataset
+OUTFILE = DATA_DIR / "preprocessed_training_data.csv"
+
+MIN_HOUR = 7  # 7am
+MAX_HOUR = 19  # 7pm
+OBSERVATION_NAME_AND_HOUR_SEPARATOR = "|"
+# Hourly weather observations used as features, in column order
+WEATHER_DIMS = ["temp", "humidity", "cloudcover"]
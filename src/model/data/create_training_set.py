@@ -2,143 +2,237 @@
 Combine solar production data (energy produced per day) with historical weather data
 (hourly) to produce joined dataset ready for training.
 Output CSV has the date and energy production as first two columns,
-a daily average of AQI for that day, then a repeating set of columns for observed weather at specific hours.
+then a repeating set of columns for observed weather at specific hours.
 
 Example output:
-`date | energy_production_Wh | pm25_daily_avg | temp_7 | humidity_7 | cloudcover_7 | ... | temp_14 | humidity_14 | cloudcover_14 | ...`
+`date | energy_production_Wh | temp|7 | humidity|7 | cloudcover|7 | ... | temp|14 | humidity|14 | cloudcover|14 | ...`
+
+The sources are loaded into DuckDb, hourly weather is pivoted into one column per
+(observation, hour) in a single aggregation, and the result is joined to solar production on date.
+The joined dataset is also written as a binary artifact next to the CSV (see `training_artifact`).
+
+Hourly weather comes from the Visual Crossing CSV export if it's present, otherwise from the
+observations in the feature store (see `src.feature_store`) filled by `download_historical_weather`,
+which are materialized into the same columns (only the months spanned by the solar production
+data are read).
 
 To run:
-`/venv/bin/python src/model/data/create_training_set.py`
+`/venv/bin/python -m src.model.data.create_training_set`
 """
-import csv
-import dataclasses
 import datetime
-import locale
 import pathlib
-import typing
-
-locale.setlocale(locale.LC_ALL, "en_US.UTF-8")
-
-
-### Solar production records
-SOLAR_PRODUCTION = (
-    pathlib.Path(__file__).parent / "solar_production-20171213_to_20221226.csv"
+import textwrap
+
+import duckdb
+import numpy as np
+
+from ...feature_store import FeatureStore, Source
+from ...sites import DEFAULT_SITE_ID
+from .constants import (
+    AQI,
+    MAX_HOUR,
+    MIN_HOUR,
+    OBSERVATION_NAME_AND_HOUR_SEPARATOR,
+    OUTFILE,
+    SOLAR_PRODUCTION,
+    WEATHER,
+    WEATHER_DIMS,
+)
+from .training_artifact import (
+    write_training_artifact,
 )
 
-
-class SolarProductionRecord(typing.TypedDict):
-    date: datetime.date
-    energy_production_Wh: int
-
-
-solar_production_records: list[SolarProductionRecord] = []
-
-with open(SOLAR_PRODUCTION, mode="r", newline="") as fd:
-    csv_reader = csv.DictReader(fd)
-    for row in csv_reader:
-
-        def get_field_and_format(field, formatter):
-            return formatter(row[field])
-
-        record: SolarProductionRecord = {
-            "date": get_field_and_format(
-                "date", lambda ds: datetime.datetime.strptime(ds, "%m/%d/%Y").date()
-            ),
-            "energy_production_Wh": get_field_and_format(
-                "energy_produced_Wh", locale.atoi
-            ),
-        }
-
-        solar_production_records.append(record)
-
-
-### Historical weather records
-WEATHER = pathlib.Path(__file__).parent / "visualcrossing-20171201_to_20221229.csv"
-DIMS: list[tuple[str, typing.Callable]] = [
-    ("temp", float),
-    ("humidity", float),
-    ("cloudcover", float),
-]
-
-
-@dataclasses.dataclass
-class WeatherRecordHourly:
-    datetime: datetime.datetime
-    observations: list[tuple[str, float]] = dataclasses.field(default_factory=list)
-
-
-@dataclasses.dataclass
-class WeatherRecordDaily:
-    date: datetime.date
-    hours: list[WeatherRecordHourly] = dataclasses.field(default_factory=list)
-
-
-weather_records: dict[datetime.date, WeatherRecordDaily] = {}
-with open(WEATHER, mode="r", newline="") as fd:
-    csv_reader = csv.DictReader(fd)
-
-    for row in csv_reader:
-
-        hour_datetime = datetime.datetime.fromisoformat(row["datetime"])
-        weather_record_for_hour = WeatherRecordHourly(hour_datetime)
-
-        for field, formatter in DIMS:
-            weather_record_for_hour.observations.append((field, formatter(row[field])))
-
-        if hour_datetime.date() not in weather_records:
-            weather_record_for_date = WeatherRecordDaily(hour_datetime.date())
-            weather_records[hour_datetime.date()] = weather_record_for_date
-
-        weather_record_for_date = weather_records[hour_datetime.date()]
-        weather_record_for_date.hours.append(weather_record_for_hour)
-
-
-### Historical AQI
-AQI = pathlib.Path(__file__).parent / "historical_aqi-2017-12-13_to_2022-12-26.csv"
-aqi_records: dict[datetime.date, float] = {}
-with open(AQI, mode="r", newline="") as fd:
-    csv_reader = csv.DictReader(fd)
-
-    for row in csv_reader:
-        date = datetime.date.fromisoformat(row["date"])
-        aqi = float(row["pm25_daily_avg"])
-        aqi_records[date] = aqi
-
-
-### Joined dataset
-OUTFILE = pathlib.Path(__file__).parent / "preprocessed_training_data.csv"
-
-MIN_HOUR = 7  # 7am
-MAX_HOUR = 19  # 7pm
-OBSERVATION_NAME_AND_HOUR_SEPARATOR = "|"
-joined_records = []
-for solar_production_record in solar_production_records:
-    joined = {
-        **solar_production_record,
-    }
-
-    aqi_record_for_date = aqi_records[solar_production_record["date"]]
-    # joined["pm25_daily_avg"] = aqi_record_for_date
-
-    weather_record_for_date = weather_records[solar_production_record["date"]]
-    for weather_record_for_hour in weather_record_for_date.hours:
-        hour = weather_record_for_hour.datetime.hour
-        if MIN_HOUR <= hour <= MAX_HOUR:
-            joined = {
-                **joined,
-            }
-            for obs_name, obs_value in weather_record_for_hour.observations:
-                if obs_name != "datetime":
-                    formatted_key = (
-                        f"{obs_name}{OBSERVATION_NAME_AND_HOUR_SEPARATOR}{hour}"
-                    )
-                    joined[formatted_key] = obs_value
-
-    joined_records.append(joined)
-
-
-with open(OUTFILE, mode="w", newline="") as fd:
-    field_names = joined_records[0].keys()
-    writer = csv.DictWriter(fd, fieldnames=field_names)
-    writer.writeheader()
-    writer.writerows(joined_records)
+SOLAR_PRODUCTION_TBL = "solar_production"
+WEATHER_HOURLY_TBL = "weather_hourly"
+WEATHER_DAILY_TBL = "weather_daily"
+AQI_TBL = "aqi"
+
+
+def weather_feature_columns() -> list[str]:
+    return [
+        f"{obs_name}{OBSERVATION_NAME_AND_HOUR_SEPARATOR}{hour}"
+        for hour in range(MIN_HOUR, MAX_HOUR + 1)
+        for obs_name in WEATHER_DIMS
+    ]
+
+
+def load_solar_production(
+    db_con: duckdb.DuckDBPyConnection, solar_production: pathlib.Path
+) -> None:
+    """Dates are formatted like `12/31/2017`; energy production like `9,983` (Wh)."""
+    db_con.execute(
+        textwrap.dedent(
+            f"""\
+            CREATE OR REPLACE TEMP TABLE {SOLAR_PRODUCTION_TBL} AS
+            SELECT
+                CAST(strptime(date, '%m/%d/%Y') AS DATE) AS date,
+                CAST(replace(energy_produced_Wh, ',', '') AS BIGINT) AS energy_production_Wh
+            FROM read_csv_auto({_sql_string(solar_production)}, header=true, all_varchar=true);
+        """
+        )
+    )
+
+
+def load_weather(db_con: duckdb.DuckDBPyConnection, weather: pathlib.Path) -> None:
+    """Visual Crossing hourly export: one row per hour, timestamped by a `datetime` column."""
+    dims = ",\n".join(
+        f"CAST({obs_name} AS DOUBLE) AS {obs_name}" for obs_name in WEATHER_DIMS
+    )
+    db_con.execute(
+        textwrap.dedent(
+            f"""\
+            CREATE OR REPLACE TEMP TABLE {WEATHER_HOURLY_TBL} AS
+            SELECT
+                CAST(datetime AS TIMESTAMP) AS datetime,
+            {textwrap.indent(dims, "    ")}
+            FROM read_csv_auto({_sql_string(weather)}, header=true, all_varchar=true);
+        """
+        )
+    )
+
+
+def load_stored_weather(
+    db_con: duckdb.DuckDBPyConnection,
+    store: FeatureStore,
+    site_id: str,
+    date_start: datetime.date,
+    date_end: datetime.date,
+) -> None:
+    """Observed weather from the feature store, already pivoted (in place of `pivot_weather`)."""
+    columns = weather_feature_columns()
+    features = store.feature_matrix(
+        Source.OBSERVED, site_id, columns, date_start, date_end
+    )
+    if len(features) == 0:
+        raise FileNotFoundError(
+            "No historical weather; run `src.model.data.download_historical_weather` first"
+        )
+
+    definitions = ",\n".join(f'"{column}" DOUBLE' for column in columns)
+    db_con.execute(
+        textwrap.dedent(
+            f"""\
+            CREATE OR REPLACE TEMP TABLE {WEATHER_DAILY_TBL} (
+                date DATE NOT NULL,
+            {textwrap.indent(definitions, "    ")}
+            );
+        """
+        )
+    )
+    # One statement for every day: each column is bound as a list (missing values as NULL)
+    # and unnested
+    X = features.X.astype(object)
+    X[np.isnan(features.X)] = None
+    unnested = ", ".join(["unnest(?::DATE[])", *["unnest(?::DOUBLE[])"] * len(columns)])
+    db_con.execute(
+        f"INSERT INTO {WEATHER_DAILY_TBL} SELECT {unnested};",
+        [features.date.tolist(), *X.T.tolist()],
+    )
+
+
+def solar_production_date_range(
+    db_con: duckdb.DuckDBPyConnection,
+) -> tuple[datetime.date, datetime.date]:
+    date_start, date_end = db_con.execute(
+        f"SELECT min(date), max(date) FROM {SOLAR_PRODUCTION_TBL};"
+    ).fetchall()[0]
+    return date_start, date_end
+
+
+def load_aqi(db_con: duckdb.DuckDBPyConnection, aqi: pathlib.Path) -> None:
+    db_con.execute(
+        textwrap.dedent(
+            f"""\
+            CREATE OR REPLACE TEMP TABLE {AQI_TBL} AS
+            SELECT
+                CAST(date AS DATE) AS date,
+                CAST(nullif(pm25_daily_avg, '') AS DOUBLE) AS pm25_daily_avg
+            FROM read_csv_auto({_sql_string(aqi)}, header=true, all_varchar=true);
+        """
+        )
+    )
+
+
+def pivot_weather(db_con: duckdb.DuckDBPyConnection) -> None:
+    """
+    Pivot hourly weather into one row per date with a `<observation>|<hour>` column for each
+    hour between MIN_HOUR and MAX_HOUR. (An hour is only ever repeated on the day daylight
+    saving time ends, at 1am, so the aggregate used to pick a value doesn't matter.)
+    """
+    columns = ",\n".join(
+        f'max({obs_name}) FILTER (WHERE hour(datetime) = {hour}) AS "{obs_name}{OBSERVATION_NAME_AND_HOUR_SEPARATOR}{hour}"'
+        for hour in range(MIN_HOUR, MAX_HOUR + 1)
+        for obs_name in WEATHER_DIMS
+    )
+    db_con.execute(
+        textwrap.dedent(
+            f"""\
+            CREATE OR REPLACE TEMP TABLE {WEATHER_DAILY_TBL} AS
+            SELECT
+                CAST(datetime AS DATE) AS date,
+            {textwrap.indent(columns, "    ")}
+            FROM {WEATHER_HOURLY_TBL}
+            GROUP BY CAST(datetime AS DATE);
+        """
+        )
+    )
+
+
+def joined_query() -> str:
+    features = ", ".join(f'weather."{column}"' for column in weather_feature_columns())
+    # AQI is joined so that it's available, but not (yet) used as a feature:
+    # , {AQI_TBL}.pm25_daily_avg
+    return textwrap.dedent(
+        f"""\
+        SELECT
+            strftime(production.date, '%Y-%m-%d') AS date,
+            production.energy_production_Wh,
+            {features}
+        FROM {SOLAR_PRODUCTION_TBL} AS production
+        JOIN {WEATHER_DAILY_TBL} AS weather ON weather.date = production.date
+        LEFT JOIN {AQI_TBL} ON {AQI_TBL}.date = production.date
+        ORDER BY production.date
+    """
+    )
+
+
+def create_training_set(
+    solar_production: pathlib.Path = SOLAR_PRODUCTION,
+    weather: pathlib.Path | FeatureStore | None = None,
+    aqi: pathlib.Path = AQI,
+    outfile: pathlib.Path = OUTFILE,
+    site_id: str = DEFAULT_SITE_ID,
+) -> pathlib.Path:
+    """
+    `weather` is a Visual Crossing CSV export or a feature store (observations for `site_id`
+    are read); defaults to `WEATHER` if present, otherwise the default feature store.
+    """
+    if weather is None:
+        weather = WEATHER if WEATHER.exists() else FeatureStore()
+
+    db_con = duckdb.connect()
+    load_solar_production(db_con, solar_production)
+    if isinstance(weather, FeatureStore):
+        date_start, date_end = solar_production_date_range(db_con)
+        load_stored_weather(db_con, weather, site_id, date_start, date_end)
+    else:
+        load_weather(db_con, weather)
+        pivot_weather(db_con)
+    load_aqi(db_con, aqi)
+    db_con.execute(
+        f"COPY ({joined_query()}) TO {_sql_string(outfile)} (HEADER, DELIMITER ',');"
+    )
+
+    # Binary form of the same data, for fast loading (see `training_artifact`)
+    joined = db_con.execute(joined_query()).fetchnumpy()
+    write_training_artifact(joined, list(joined), outfile)
+    return outfile
+
+
+def _sql_string(path: pathlib.Path) -> str:
+    escaped = str(path).replace("'", "''")
+    return f"'{escaped}'"
+
+
+if __name__ == "__main__":
+    create_training_set()
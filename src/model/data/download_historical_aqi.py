@@ -1,22 +1,52 @@
+"""
+Download daily historical PM2.5 AQI from AirNow for one or more sites.
+
+Requests run concurrently, limited to AirNow's hourly request limit (responses already in the HTTP
+cache don't count).
+Progress is checkpointed (atomically) to `historical_aqi_data/checkpoint.json`, so an interrupted
+download resumes where it left off. Today's AQI is still partial, so it is never checkpointed and
+is downloaded again on every run.
+
+To run (for the site configured in `.env`):
+`/venv/bin/python -m src.model.data.download_historical_aqi`
+
+Or for every site in a site list (see `src.sites`):
+`/venv/bin/python -m src.model.data.download_historical_aqi --sites sites.csv`
+"""
 import argparse
+import concurrent.futures
 import csv
 import datetime
-import dbm
+import json
+import os
 import pathlib
 import sys
-import time
+import threading
 
-from ...external_data import AirNowApi
+from ...env import Env
+from ...external_data import (
+    AirNowApi,
+    HttpClient,
+    ResponseCache,
+)
+from ...external_data.rate_limit import (
+    SlidingWindowLimiter,
+)
+from ...sites import (
+    DEFAULT_SITE_ID,
+    Site,
+    load_sites,
+)
 
 WEB_SERVICE_HOURLY_REQUEST_LIMIT = 500
-THROTTLE_TIME = 3  # seconds
+DEFAULT_CONCURRENCY = 4
+CHECKPOINT_EVERY = 25  # completed requests
 
 DATE_START = datetime.date.fromisoformat("2017-12-13")
 DATE_END = datetime.date.fromisoformat("2022-12-26")
-TOTAL_DAYS = DATE_END - DATE_START
 
-HISTORICAL_AQI_DB = pathlib.Path(__file__).parent / "historical_aqi_data" / "db"
-HISTORICAL_AQI_DB.parent.mkdir(exist_ok=True, parents=True)
+HISTORICAL_AQI_DIR = pathlib.Path(__file__).parent / "historical_aqi_data"
+CHECKPOINT = HISTORICAL_AQI_DIR / "checkpoint.json"
 
 ONE_DAY_INCREMENT = datetime.timedelta(days=1)
 
@@ -27,57 +57,187 @@ HISTORICAL_AQI_CSV_OUTFILE = str(
 )
 FIELDNAME_DATE = "date"
 FIELDNAME_PM25_DAILY_AVG = "pm25_daily_avg"
-__all__ = (HISTORICAL_AQI_CSV_OUTFILE, FIELDNAME_DATE, FIELDNAME_PM25_DAILY_AVG)
+__all__ = (
+    "HISTORICAL_AQI_CSV_OUTFILE",
+    "FIELDNAME_DATE",
+    "FIELDNAME_PM25_DAILY_AVG",
+)
 
+# "<site_id>|<ISO date>" -> PM2.5 AQI (None if AirNow has no observation)
+Results = dict[str, float | None]
 
-def main(throttle_time: int = THROTTLE_TIME) -> None:
-    api = AirNowApi()
-    with dbm.open(str(HISTORICAL_AQI_DB), "c") as db:
-        current = DATE_START
-        while current <= DATE_END:
-            progress = (TOTAL_DAYS - (DATE_END - current)).days
-            sys.stdout.write(f"\r{progress:04d} / {TOTAL_DAYS.days}")
-            sys.stdout.flush()
 
-            db_key = current.isoformat()
-            if db_key in db:
-                current += ONE_DAY_INCREMENT
-                continue
+def checkpoint_key(site_id: str, date: datetime.date) -> str:
+    return f"{site_id}|{date.isoformat()}"
 
-            aqi = api.get_historical_aqi(current)
-            db[db_key] = str(aqi)
-            current += ONE_DAY_INCREMENT
-            time.sleep(throttle_time)
 
-    sys.stdout.write("\n")
-    sys.stdout.flush()
+def load_checkpoint(checkpoint: pathlib.Path = CHECKPOINT) -> Results:
+    if not checkpoint.exists():
+        return {}
+    results: Results = json.loads(checkpoint.read_text())
+    return results
+
+
+def save_checkpoint(results: Results, checkpoint: pathlib.Path = CHECKPOINT) -> None:
+    """Write-then-rename, so a checkpoint is never left half-written."""
+    checkpoint.parent.mkdir(exist_ok=True, parents=True)
+    partial = checkpoint.with_suffix(".partial")
+    partial.write_text(json.dumps(results, sort_keys=True))
+    os.replace(partial, checkpoint)
 
 
-def write_to_csv():
-    with dbm.open(str(HISTORICAL_AQI_DB), "r") as db:
-        with open(HISTORICAL_AQI_CSV_OUTFILE, mode="w", newline="") as fd:
-            field_names = [FIELDNAME_DATE, FIELDNAME_PM25_DAILY_AVG]
-            writer = csv.DictWriter(fd, fieldnames=field_names)
-            writer.writeheader()
-            for date, aqi in db.items():
-                writer.writerow(
-                    {
-                        "date": date.decode("utf-8"),
-                        "pm25_daily_avg": float(aqi.decode("utf-8")),
-                    }
-                )
+def dates_between(
+    date_start: datetime.date, date_end: datetime.date
+) -> list[datetime.date]:
+    return [
+        date_start + ONE_DAY_INCREMENT * i
+        for i in range((date_end - date_start).days + 1)
+    ]
+
+
+def main(
+    sites: list[Site],
+    date_start: datetime.date = DATE_START,
+    date_end: datetime.date = DATE_END,
+    requests_per_hour: int = WEB_SERVICE_HOURLY_REQUEST_LIMIT,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> Results:
+    # Rate limited in the client, so that responses served from the cache don't count
+    api = AirNowApi(
+        HttpClient(
+            cache=ResponseCache(),
+            rate_limiter=SlidingWindowLimiter.per_hour(requests_per_hour),
+        )
+    )
+    results = load_checkpoint()
+    # Today's (partial) AQI, kept out of the checkpoint
+    unsettled: Results = {}
+    lock = threading.Lock()
+    today = datetime.date.today()
+
+    todo = [
+        (site, date)
+        for site in sites
+        for date in dates_between(date_start, date_end)
+        if checkpoint_key(site.site_id, date) not in results
+    ]
+    total = len(todo)
+
+    def download(site: Site, date: datetime.date) -> None:
+        aqi = api.get_historical_aqi(date, site.latlong)
+        key = checkpoint_key(site.site_id, date)
+        with lock:
+            if date < today:
+                results[key] = aqi
+            else:
+                unsettled[key] = aqi
+
+    completed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(download, site, date) for site, date in todo]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                completed += 1
+                sys.stdout.write(f"\r{completed:04d} / {total}")
+                sys.stdout.flush()
+                if completed % CHECKPOINT_EVERY == 0:
+                    with lock:
+                        save_checkpoint(results)
+        finally:
+            for future in futures:
+                future.cancel()
+            with lock:
+                save_checkpoint(results)
+
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+    return {**results, **unsettled}
+
+
+def csv_outfile(site: Site, date_start: datetime.date, date_end: datetime.date) -> str:
+    # The default site's CSV keeps the original (site-less) file name
+    if site.site_id == DEFAULT_SITE_ID:
+        name = f"historical_aqi-{date_start.isoformat()}_to_{date_end.isoformat()}.csv"
+    else:
+        name = f"historical_aqi-{site.site_id}-{date_start.isoformat()}_to_{date_end.isoformat()}.csv"
+    return str(pathlib.Path(__file__).parent / name)
+
+
+def write_to_csv(
+    results: Results,
+    site: Site,
+    date_start: datetime.date = DATE_START,
+    date_end: datetime.date = DATE_END,
+) -> None:
+    """Write one row per date, in date order. Dates without an observation have an empty AQI."""
+    with open(csv_outfile(site, date_start, date_end), mode="w", newline="") as fd:
+        field_names = [FIELDNAME_DATE, FIELDNAME_PM25_DAILY_AVG]
+        writer = csv.DictWriter(fd, fieldnames=field_names)
+        writer.writeheader()
+        for date in dates_between(date_start, date_end):
+            key = checkpoint_key(site.site_id, date)
+            if key not in results:
+                continue
+            aqi = results[key]
+            writer.writerow(
+                {
+                    FIELDNAME_DATE: date.isoformat(),
+                    FIELDNAME_PM25_DAILY_AVG: "" if aqi is None else float(aqi),
+                }
+            )
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "--throttle",
-        dest="throttle_time",
+        "--sites",
+        dest="sites",
+        required=False,
+        type=pathlib.Path,
+        help="Site list CSV; defaults to the location configured in .env",
+    )
+    parser.add_argument(
+        "--start",
+        dest="date_start",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=DATE_START,
+    )
+    parser.add_argument(
+        "--end",
+        dest="date_end",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=DATE_END,
+    )
+    parser.add_argument(
+        "--requests-per-hour",
+        dest="requests_per_hour",
         required=False,
-        type=float,
-        default=THROTTLE_TIME,
+        type=int,
+        default=WEB_SERVICE_HOURLY_REQUEST_LIMIT,
+    )
+    parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        required=False,
+        type=int,
+        default=DEFAULT_CONCURRENCY,
     )
     args = parser.parse_args()
 
-    main(args.throttle_time)
-    write_to_csv()
+    if args.sites is not None:
+        sites = load_sites(args.sites)
+    else:
+        sites = [Site(DEFAULT_SITE_ID, *Env().latlong())]
+
+    results = main(
+        sites,
+        args.date_start,
+        args.date_end,
+        args.requests_per_hour,
+        args.concurrency,
+    )
+    for site in sites:
+        write_to_csv(results, site, args.date_start, args.date_end)
@@ -0,0 +1,155 @@
+"""
+Download hourly historical weather from Visual Crossing for one or more sites, into the
+feature store as observations (see `src.feature_store`).
+
+Each request covers one calendar month, which is written as that month's partition. Requests run
+concurrently, limited to `--requests-per-hour` in any one-hour window (responses already in the
+HTTP cache don't count). Months that have already been downloaded are skipped, so an interrupted
+download resumes where it left off.
+
+To run (for the site configured in `.env`):
+`/venv/bin/python -m src.model.data.download_historical_weather`
+
+Or for every site in a site list (see `src.sites`):
+`/venv/bin/python -m src.model.data.download_historical_weather --sites sites.csv`
+"""
+import argparse
+import concurrent.futures
+import datetime
+import pathlib
+import sys
+
+from ...env import Env
+from ...external_data import (
+    HttpClient,
+    ResponseCache,
+    VisualCrossingApi,
+)
+from ...external_data.rate_limit import (
+    SlidingWindowLimiter,
+)
+from ...feature_store import (
+    FeatureStore,
+    HourlyFeatures,
+    Source,
+    month_end,
+    months_between,
+)
+from ...sites import (
+    DEFAULT_SITE_ID,
+    Site,
+    load_sites,
+)
+
+DEFAULT_REQUESTS_PER_HOUR = 60
+DEFAULT_CONCURRENCY = 4
+
+DATE_START = datetime.date.fromisoformat("2017-12-01")
+DATE_END = datetime.date.fromisoformat("2022-12-29")
+
+
+def main(
+    sites: list[Site],
+    date_start: datetime.date = DATE_START,
+    date_end: datetime.date = DATE_END,
+    requests_per_hour: int = DEFAULT_REQUESTS_PER_HOUR,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    store: FeatureStore = FeatureStore(),
+) -> int:
+    """Returns the number of partitions downloaded."""
+    # Rate limited in the client, so that responses served from the cache don't count
+    api = VisualCrossingApi(
+        HttpClient(
+            cache=ResponseCache(),
+            rate_limiter=SlidingWindowLimiter.per_hour(requests_per_hour),
+        )
+    )
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+
+    todo = [
+        (site, month)
+        for site in sites
+        for month in months_between(date_start, min(date_end, yesterday))
+        if not store.is_complete(Source.OBSERVED, site.site_id, month)
+    ]
+    total = len(todo)
+
+    def download(site: Site, month: datetime.date) -> None:
+        weather = api.get_historical_weather(
+            month, min(month_end(month), yesterday), site.latlong
+        )
+        store.write(
+            Source.OBSERVED,
+            site.site_id,
+            HourlyFeatures.from_observations(weather.timestamps, weather.columns),
+        )
+
+    completed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(download, site, month) for site, month in todo]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                future.result()
+                completed += 1
+                sys.stdout.write(f"\r{completed:04d} / {total}")
+                sys.stdout.flush()
+        finally:
+            for future in futures:
+                future.cancel()
+
+    sys.stdout.write("\n")
+    sys.stdout.flush()
+    return completed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sites",
+        dest="sites",
+        required=False,
+        type=pathlib.Path,
+        help="Site list CSV; defaults to the location configured in .env",
+    )
+    parser.add_argument(
+        "--start",
+        dest="date_start",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=DATE_START,
+    )
+    parser.add_argument(
+        "--end",
+        dest="date_end",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=DATE_END,
+    )
+    parser.add_argument(
+        "--requests-per-hour",
+        dest="requests_per_hour",
+        required=False,
+        type=int,
+        default=DEFAULT_REQUESTS_PER_HOUR,
+    )
+    parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        required=False,
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+    )
+    args = parser.parse_args()
+
+    if args.sites is not None:
+        sites = load_sites(args.sites)
+    else:
+        sites = [Site(DEFAULT_SITE_ID, *Env().latlong())]
+
+    main(
+        sites,
+        args.date_start,
+        args.date_end,
+        args.requests_per_hour,
+        args.concurrency,
+    )
@@ -0,0 +1,108 @@
+"""
+Binary, column-major form of a training data CSV, for loading without per-cell parsing.
+
+For `<name>.csv` the artifact is `<name>.npy`, a Fortran-ordered float64 matrix, plus a
+`<name>.json` schema sidecar holding the CSV's fieldnames. Matrix columns are:
+```
+0     date (days since 1970-01-01)
+1     response variable (energy_production_Wh)
+2...  features, in fieldname order ("date" is encoded as its month, as in `load_data`)
+```
+so that `X` is a contiguous block of the memory-mapped matrix.
+
+To (re)build the artifact for a CSV:
+`/venv/bin/python -m src.model.data.training_artifact src/model/data/preprocessed_training_data.csv`
+"""
+import argparse
+import json
+import pathlib
+
+import duckdb
+import numpy as np
+
+RESPONSE_VARIABLE = "energy_production_Wh"
+FIELDNAME_DATE = "date"
+
+
+def artifact_paths(training_data: pathlib.Path) -> tuple[pathlib.Path, pathlib.Path]:
+    return training_data.with_suffix(".npy"), training_data.with_suffix(".json")
+
+
+def write_training_artifact(
+    columns: dict[str, np.ndarray],
+    fieldnames: list[str],
+    training_data: pathlib.Path,
+) -> None:
+    matrix_path, schema_path = artifact_paths(training_data)
+    dates = np.asarray(columns[FIELDNAME_DATE]).astype("datetime64[D]")
+    features = [field for field in fieldnames if field != RESPONSE_VARIABLE]
+
+    matrix = np.lib.format.open_memmap(
+        matrix_path,
+        mode="w+",
+        dtype=np.float64,
+        shape=(len(dates), 2 + len(features)),
+        fortran_order=True,
+    )
+    matrix[:, 0] = dates.astype(np.float64)
+    matrix[:, 1] = columns[RESPONSE_VARIABLE]
+    for i, field in enumerate(features, start=2):
+        if field == FIELDNAME_DATE:
+            matrix[:, i] = dates.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        else:
+            matrix[:, i] = columns[field]
+    matrix.flush()
+    del matrix
+
+    schema_path.write_text(json.dumps({"fieldnames": fieldnames}, indent=4))
+
+
+def build_training_artifact(training_data: pathlib.Path) -> None:
+    """Build the artifact for an existing training data CSV."""
+    db_con = duckdb.connect()
+    columns = db_con.execute(
+        f"SELECT * FROM read_csv_auto({_sql_string(training_data)}, header=true)"
+    ).fetchnumpy()
+    write_training_artifact(columns, list(columns), training_data)
+
+
+def load_training_data(
+    training_data: pathlib.Path,
+) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """
+    Same result as `load_data`, as arrays: `X` (float64, column-major) is a memory-mapped view
+    of the artifact, built from the CSV first if it is missing or older than the CSV.
+    """
+    matrix_path, fieldnames = training_artifact(training_data)
+    matrix = np.load(matrix_path, mmap_mode="r")
+    return matrix[:, 2:], matrix[:, 1], fieldnames
+
+
+def training_artifact(training_data: pathlib.Path) -> tuple[pathlib.Path, list[str]]:
+    """
+    Path to the artifact's matrix (built from the CSV first if it is missing or older than the CSV),
+    and the CSV's fieldnames.
+    """
+    matrix_path, schema_path = artifact_paths(training_data)
+    if _is_stale(training_data, matrix_path) or _is_stale(training_data, schema_path):
+        build_training_artifact(training_data)
+
+    fieldnames: list[str] = json.loads(schema_path.read_text())["fieldnames"]
+    return matrix_path, fieldnames
+
+
+def _is_stale(source: pathlib.Path, derived: pathlib.Path) -> bool:
+    return not derived.exists() or derived.stat().st_mtime < source.stat().st_mtime
+
+
+def _sql_string(path: pathlib.Path) -> str:
+    escaped = str(path).replace("'", "''")
+    return f"'{escaped}'"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("training_data", type=pathlib.Path)
+    args = parser.parse_args()
+
+    build_training_artifact(args.training_data)
@@ -0,0 +1,303 @@
+"""
+Incrementally updated linear model.
+
+Keeps the sufficient statistics of ordinary least squares (`AᵀA`, `Aᵀy`, `yᵀy` and the row count,
+where `A` is the feature matrix with a leading intercept column), so that each day's new
+(features, actual energy production) rows are folded in in O(rows x features²), and the
+coefficients are re-solved in O(features³) without revisiting the history.
+
+Each update publishes a new model version (see `registry`), with its statistics alongside in
+`statistics.npz`; the next update starts from the latest published statistics. The first update
+seeds the statistics from the full training data snapshot of the latest registered version.
+
+New rows are replayed from the forecasts persisted by the prediction job (see
+`persistence.forecast_features`) for days whose actual energy production is known, using the
+forecast made `--days-ahead` days before; or given in training data format (see
+`data.create_training_set`). The statistics record every day folded in, and rows for those days
+are ignored, so re-running with overlapping data is safe, and a day whose actual energy
+production arrives late is folded in by the first update after it does.
+
+To run:
+`./venv/bin/python -m src.model.incremental`
+
+Or from a file:
+`./venv/bin/python -m src.model.incremental new_rows.csv`
+"""
+import argparse
+import datetime
+import pathlib
+
+import duckdb
+import numpy as np
+
+from ..persistence import (
+    PREDICTIONS_DB_PATH,
+    replay_features,
+)
+from .data.training_artifact import (
+    RESPONSE_VARIABLE,
+    training_artifact,
+)
+from .linear import LinearCoefficients
+from .model_base import Model
+from .registry import (
+    MODELS_DIR,
+    ModelRegistry,
+    registry,
+    save_model,
+)
+
+STATISTICS_FILE = "statistics.npz"
+SNAPSHOT_TRAINING_DATA_FILE = "training_data.csv"
+DEFAULT_DAYS_AHEAD = 1
+
+
+class SufficientStatistics:
+    fieldnames: list[str]
+    AtA: np.ndarray  # (1 + features) x (1 + features)
+    Aty: np.ndarray  # 1 + features
+    yty: float
+    n: int
+    folded_dates: np.ndarray  # datetime64[D], sorted: every day folded in
+
+    def __init__(
+        self,
+        fieldnames: list[str],
+        AtA: np.ndarray,
+        Aty: np.ndarray,
+        yty: float,
+        n: int,
+        folded_dates: np.ndarray,
+    ) -> None:
+        self.fieldnames = fieldnames
+        self.AtA = AtA
+        self.Aty = Aty
+        self.yty = yty
+        self.n = n
+        self.folded_dates = folded_dates
+
+    @property
+    def trained_through(self) -> datetime.date | None:
+        """Date of the latest row folded in."""
+        if len(self.folded_dates) == 0:
+            return None
+        latest: datetime.date = self.folded_dates[-1].astype(datetime.date)
+        return latest
+
+    @classmethod
+    def empty(cls, fieldnames: list[str]) -> "SufficientStatistics":
+        n_features = len([field for field in fieldnames if field != RESPONSE_VARIABLE])
+        return cls(
+            fieldnames,
+            np.zeros((1 + n_features, 1 + n_features)),
+            np.zeros(1 + n_features),
+            0.0,
+            0,
+            np.array([], dtype="datetime64[D]"),
+        )
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "SufficientStatistics":
+        with np.load(path, allow_pickle=False) as statistics:
+            return cls(
+                statistics["fieldnames"].tolist(),
+                statistics["AtA"],
+                statistics["Aty"],
+                float(statistics["yty"]),
+                int(statistics["n"]),
+                statistics["folded_dates"].astype("datetime64[D]"),
+            )
+
+    def save(self, path: pathlib.Path) -> None:
+        np.savez(
+            path,
+            fieldnames=np.array(self.fieldnames),
+            AtA=self.AtA,
+            Aty=self.Aty,
+            yty=np.float64(self.yty),
+            n=np.int64(self.n),
+            folded_dates=self.folded_dates,
+        )
+
+    def update(self, dates: np.ndarray, X: np.ndarray, y: np.ndarray) -> int:
+        """
+        Fold in rows for days not already folded in (`dates` as datetime64[D]), whether or not
+        they are before `trained_through`. Returns the number of rows folded in.
+        """
+        dates = dates.astype("datetime64[D]")
+        new = ~np.isin(dates, self.folded_dates)
+        dates, X, y = dates[new], X[new], y[new]
+        if len(y) == 0:
+            return 0
+
+        A = np.column_stack([np.ones(len(y)), X])
+        self.AtA += A.T @ A
+        self.Aty += A.T @ y
+        self.yty += float(y @ y)
+        self.n += len(y)
+        self.folded_dates = np.union1d(self.folded_dates, dates)
+        return len(y)
+
+    def solve(self, ridge: float = 0.0) -> LinearCoefficients:
+        """Least squares (optionally ridge-penalized; the intercept is not penalized) coefficients."""
+        penalty = np.full(len(self.Aty), ridge)
+        penalty[0] = 0.0
+        beta, *_ = np.linalg.lstsq(self.AtA + np.diag(penalty), self.Aty, rcond=None)
+        return LinearCoefficients(beta[1:], float(beta[0]))
+
+    def rmse(self, coefficients: LinearCoefficients) -> float:
+        """RMSE over every row folded in, computed from the statistics alone."""
+        beta = np.concatenate([[coefficients.intercept_], coefficients.coef_])
+        sse = self.yty - 2 * beta @ self.Aty + beta @ self.AtA @ beta
+        return float(np.sqrt(max(sse, 0.0) / self.n))
+
+
+def load_rows(
+    training_data: pathlib.Path,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    """Dates (datetime64[D]), X, y and fieldnames of rows in training data format."""
+    matrix_path, fieldnames = training_artifact(training_data)
+    matrix = np.load(matrix_path, mmap_mode="r")
+    dates = matrix[:, 0].astype("datetime64[D]")
+    return dates, matrix[:, 2:], matrix[:, 1], fieldnames
+
+
+def replay_rows(
+    db_con: duckdb.DuckDBPyConnection,
+    fieldnames: list[str],
+    through: datetime.date,
+    days_ahead: int = DEFAULT_DAYS_AHEAD,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Dates (datetime64[D]), X and y of persisted forecasts for days through `through` that have a
+    complete forecast and a known actual energy production. Every such day is replayed, not just
+    those after the last update, since actual energy production can arrive late; days already
+    folded in are skipped by `SufficientStatistics.update`.
+    """
+    replayed = replay_features(
+        db_con, fieldnames, datetime.date.min, through, days_ahead
+    )
+    usable = replayed.sufficient & ~np.isnan(replayed.actual_energy_production)
+    return (
+        replayed.prediction_for_date[usable],
+        replayed.X[usable],
+        replayed.actual_energy_production[usable],
+    )
+
+
+def latest_statistics(
+    model_registry: ModelRegistry = registry,
+) -> tuple[SufficientStatistics, str]:
+    """
+    Statistics of the latest version that has them, and that version. If there are none,
+    seeded from the training data snapshot of the latest registered version.
+    """
+    for registered in reversed(model_registry.models()):
+        if (registered.directory / STATISTICS_FILE).exists():
+            statistics = SufficientStatistics.load(
+                registered.directory / STATISTICS_FILE
+            )
+            return statistics, registered.version
+
+    base = model_registry.latest()
+    dates, X, y, fieldnames = load_rows(base.directory / SNAPSHOT_TRAINING_DATA_FILE)
+    if fieldnames != base.fieldnames:
+        raise ValueError(
+            f"Training data of model {base.version} does not match its fieldnames"
+        )
+    statistics = SufficientStatistics.empty(fieldnames)
+    statistics.update(dates, X, y)
+    return statistics, base.version
+
+
+def publish(
+    statistics: SufficientStatistics,
+    version: datetime.date,
+    base_version: str,
+    ridge: float = 0.0,
+    models_dir: pathlib.Path = MODELS_DIR,
+) -> Model:
+    directory = models_dir / f"v{version.strftime('%Y_%m_%d')}"
+    if directory.exists():
+        raise FileExistsError(
+            f"Model {version} already exists. Create a new model instead of overwritting an existing one."
+        )
+
+    coefficients = statistics.solve(ridge)
+    model = Model(
+        coefficients,
+        statistics.fieldnames,
+        0,
+        0.0,
+        version.isoformat(),
+        base_version=base_version,
+        ridge=ridge,
+        n_observations=statistics.n,
+        trained_through=(
+            None
+            if statistics.trained_through is None
+            else statistics.trained_through.isoformat()
+        ),
+        rmse_train=statistics.rmse(coefficients),
+    )
+
+    directory.mkdir()
+    save_model(model, directory)
+    statistics.save(directory / STATISTICS_FILE)
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "new_rows",
+        nargs="?",
+        type=pathlib.Path,
+        help="New (features, actual energy production) rows, in training data format; defaults to replaying persisted forecasts",
+    )
+    parser.add_argument(
+        "--days-ahead",
+        dest="days_ahead",
+        required=False,
+        type=int,
+        default=DEFAULT_DAYS_AHEAD,
+    )
+    parser.add_argument(
+        "--version",
+        dest="version",
+        required=False,
+        type=datetime.date.fromisoformat,
+        default=datetime.date.today(),
+    )
+    parser.add_argument(
+        "--ridge",
+        dest="ridge",
+        required=False,
+        type=float,
+        default=0.0,
+    )
+    args = parser.parse_args()
+
+    statistics, base_version = latest_statistics()
+    if args.new_rows is None:
+        db_con = duckdb.connect(PREDICTIONS_DB_PATH, read_only=True)
+        dates, X, y = replay_rows(
+            db_con,
+            statistics.fieldnames,
+            args.version - datetime.timedelta(days=1),
+            args.days_ahead,
+        )
+    else:
+        dates, X, y, fieldnames = load_rows(args.new_rows)
+        if fieldnames != statistics.fieldnames:
+            raise ValueError(
+                f"{args.new_rows} fieldnames do not match those of model {base_version}"
+            )
+
+    n_new = statistics.update(dates, X, y)
+    if n_new == 0:
+        print("No rows for days not already folded in; nothing to update")
+    else:
+        model = publish(statistics, args.version, base_version, args.ridge)
+        print(f"Published model {model.version} ({n_new} new rows):")
+        print(model.to_json())
@@ -0,0 +1,102 @@
+"""
+Compact, sklearn-free representation of a fitted linear model.
+
+Saved as a single float64 `.npy` vector, `[intercept, *coefficients]`, which can be memory-mapped.
+"""
+import pathlib
+import typing
+
+import numpy as np
+
+
+class LinearCoefficients:
+    """
+    Estimator-like holder of a linear model's coefficients (`predict` only).
+    Attribute names mirror sklearn's fitted linear models.
+    """
+
+    coef_: np.ndarray
+    intercept_: float
+
+    def __init__(self, coef: np.ndarray, intercept: float) -> None:
+        self.coef_ = coef
+        self.intercept_ = intercept
+
+    @classmethod
+    def from_estimator(cls, estimator: typing.Any) -> "LinearCoefficients":
+        """From any fitted single-output linear estimator exposing `coef_` and `intercept_`."""
+        coef = np.asarray(estimator.coef_, dtype=np.float64)
+        if coef.ndim != 1:
+            raise ValueError(
+                f"Expected single-output linear model; coef_ is {coef.shape}"
+            )
+        return cls(coef, float(estimator.intercept_))
+
+    @classmethod
+    def load(cls, path: pathlib.Path, mmap: bool = True) -> "LinearCoefficients":
+        vector = np.load(path, mmap_mode="r" if mmap else None)
+        return cls(vector[1:], float(vector[0]))
+
+    def save(self, path: pathlib.Path) -> None:
+        np.save(path, np.concatenate([[self.intercept_], self.coef_]))
+
+    @property
+    def n_features_in_(self) -> int:
+        return len(self.coef_)
+
+    def predict(self, X: typing.Any) -> np.ndarray:
+        X = validate_features(X, self.n_features_in_)
+        return X @ self.coef_ + self.intercept_
+
+
+def validate_features(X: typing.Any, n_features: int) -> np.ndarray:
+    """
+    The checks sklearn's `predict` makes on its input (see `sklearn.utils.check_array`),
+    done once for a whole batch: a finite, 2D float array with `n_features` columns.
+    """
+    try:
+        X = np.asarray(X, dtype=np.float64)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Features must be numeric: {exc}") from exc
+    if X.ndim != 2:
+        raise ValueError(
+            f"Expected 2D array, got {X.ndim}D array instead. Reshape your data "
+            "using X.reshape(-1, 1) if it has a single feature or X.reshape(1, -1) if it contains a single sample."
+        )
+    if X.shape[0] < 1:
+        raise ValueError(
+            f"Found array with 0 sample(s) (shape={X.shape}); a minimum of 1 is required."
+        )
+    if X.shape[1] != n_features:
+        raise ValueError(
+            f"X has {X.shape[1]} features, but the model is expecting {n_features} features as input."
+        )
+    if not np.isfinite(X).all():
+        raise ValueError("Input X contains NaN or infinity.")
+    return X
+
+
+def is_linear(estimator: typing.Any) -> bool:
+    """
+    Whether `estimator` predicts exactly `X @ coef_ + intercept_`, with a 1D `coef_`: a
+    `LinearCoefficients`, or a fitted single-output sklearn linear regressor (`LinearModel`).
+    Generalized linear models (e.g., `PoissonRegressor`) also have `coef_` and `intercept_`, but
+    apply an inverse link function, so they are not.
+    """
+    if isinstance(estimator, LinearCoefficients):
+        return True
+
+    from sklearn.linear_model._base import (
+        LinearModel,
+    )
+    from sklearn.linear_model._glm import (
+        _GeneralizedLinearRegressor,
+    )
+
+    return (
+        isinstance(estimator, LinearModel)
+        and not isinstance(estimator, _GeneralizedLinearRegressor)
+        and hasattr(estimator, "coef_")
+        and np.ndim(estimator.coef_) == 1
+        and np.ndim(estimator.intercept_) == 0
+    )
@@ -1,11 +1,17 @@
+import functools
 import json
 import typing
 
-from sklearn.base import BaseEstimator
+import numpy as np
+
+from .linear import LinearCoefficients, is_linear
+
+if typing.TYPE_CHECKING:
+    from sklearn.base import BaseEstimator
 
 
 class Model:
-    _estimator: BaseEstimator
+    _estimator: "BaseEstimator"
     _fieldnames: list[str]
     _kwargs: dict[str, typing.Any]
     _random_state: int
@@ -14,13 +20,13 @@ class Model:
 
     def __init__(
         self,
-        estimator: BaseEstimator,
+        estimator: "BaseEstimator",
         fieldnames: list[str],
         random_state: int,
         test_size: float,
         version: str,
         /,
-        **kwargs: dict[str, typing.Any],
+        **kwargs: typing.Any,
     ) -> None:
         self._estimator = estimator
         self._fieldnames = fieldnames
@@ -34,7 +40,7 @@ class Model:
         return self._fieldnames
 
     @property
-    def estimator(self) -> BaseEstimator:
+    def estimator(self) -> "BaseEstimator":
         return self._estimator
 
     @property
@@ -51,15 +57,36 @@ class Model:
     def version(self) -> str:
         return self._version
 
+    @property
+    def metadata(self) -> dict[str, typing.Any]:
+        return {
+            "estimator": type(self._estimator).__name__,
+            "fieldnames": self._fieldnames,
+            "random_state": self._random_state,
+            "test_size": self._test_size,
+            "version": self._version,
+            **self._kwargs,
+        }
+
+    def predict(self, X: typing.Any) -> np.ndarray:
+        """
+        Predict with the estimator. Plain linear models (see `linear.is_linear`) are evaluated
+        directly as `X @ coef + intercept` (see `linear.LinearCoefficients`), without going
+        through sklearn; everything else goes through the estimator's `predict`.
+        """
+        coefficients = self._linear_coefficients
+        if coefficients is None:
+            prediction: np.ndarray = self._estimator.predict(X)
+            return prediction
+        return coefficients.predict(X)
+
+    @functools.cached_property
+    def _linear_coefficients(self) -> LinearCoefficients | None:
+        if isinstance(self._estimator, LinearCoefficients):
+            return self._estimator
+        if is_linear(self._estimator):
+            return LinearCoefficients.from_estimator(self._estimator)
+        return None
+
     def to_json(self) -> str:
-        return json.dumps(
-            {
-                "estimator": type(self._estimator).__name__,
-                "fieldnames": self._fieldnames,
-                "random_state": self._random_state,
-                "test_size": self._test_size,
-                "version": self._version,
-                **self._kwargs,
-            },
-            indent=4,
-        )
+        return json.dumps(self.metadata, indent=4)
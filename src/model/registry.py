@@ -0,0 +1,167 @@
+"""
+Registry of trained model versions.
+
+Each version is a package under `src/model` named `v<YYYY>_<MM>_<DD>` containing:
+```
+model.json         metadata (`Model.to_json`); required for a version to be registered
+coefficients.npy   (linear models) `[intercept, *coefficients]`, see `linear.LinearCoefficients`
+model.pickle       the pickled `Model`
+statistics.npz     (incrementally updated models) see `incremental.SufficientStatistics`
+```
+Metadata is read without loading the estimator. Estimators are loaded on first use, from
+`coefficients.npy` when present (memory-mapped, no sklearn import or unpickling),
+falling back to `model.pickle`, and cached.
+"""
+import json
+import pathlib
+import pickle
+import re
+import threading
+import typing
+
+from .linear import LinearCoefficients, is_linear
+from .model_base import Model
+
+MODELS_DIR = pathlib.Path(__file__).parent
+VERSION_PACKAGE_PATTERN = re.compile(r"^v(\d{4})_(\d{2})_(\d{2})$")
+
+METADATA_FILE = "model.json"
+COEFFICIENTS_FILE = "coefficients.npy"
+PICKLE_FILE = "model.pickle"
+
+
+class ModelNotTrainedError(Exception):
+    pass
+
+
+class RegisteredModel:
+    """A model version on disk. `load` the estimator only when it is needed."""
+
+    directory: pathlib.Path
+    metadata: dict[str, typing.Any]
+    _model: Model | None
+    _lock: threading.Lock
+
+    def __init__(self, directory: pathlib.Path) -> None:
+        self.directory = directory
+        self.metadata = json.loads((directory / METADATA_FILE).read_text())
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> str:
+        version: str = self.metadata["version"]
+        return version
+
+    @property
+    def fieldnames(self) -> list[str]:
+        fieldnames: list[str] = self.metadata["fieldnames"]
+        return fieldnames
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> Model:
+        with self._lock:
+            if self._model is None:
+                self._model = self._load()
+            return self._model
+
+    def _load(self) -> Model:
+        coefficients = self.directory / COEFFICIENTS_FILE
+        if coefficients.exists():
+            metadata = dict(self.metadata)
+            del metadata["estimator"]
+            return Model(
+                LinearCoefficients.load(coefficients),
+                metadata.pop("fieldnames"),
+                metadata.pop("random_state"),
+                metadata.pop("test_size"),
+                metadata.pop("version"),
+                **metadata,
+            )
+
+        try:
+            with open(self.directory / PICKLE_FILE, "rb") as file_handle:
+                model: Model = pickle.load(file_handle)
+                return model
+        except FileNotFoundError:
+            raise ModelNotTrainedError(
+                f"Model {self.version} ({self.directory}) has no persisted estimator; model must be trained."
+            )
+
+
+class ModelRegistry:
+    """Discovers model versions under `root` (once, on first use)."""
+
+    _root: pathlib.Path
+    _models: dict[str, RegisteredModel] | None
+    _lock: threading.Lock
+
+    def __init__(self, root: pathlib.Path = MODELS_DIR) -> None:
+        self._root = root
+        self._models = None
+        self._lock = threading.Lock()
+
+    def versions(self) -> list[str]:
+        """Registered versions, oldest first."""
+        return sorted(self._discover())
+
+    def get(self, version: str) -> RegisteredModel:
+        models = self._discover()
+        if version not in models:
+            raise KeyError(
+                f"Unknown model version {version}; registered: {', '.join(sorted(models))}"
+            )
+        return models[version]
+
+    def latest(self) -> RegisteredModel:
+        versions = self.versions()
+        if not versions:
+            raise ModelNotTrainedError(f"No model versions registered in {self._root}")
+        return self.get(versions[-1])
+
+    def models(self) -> list[RegisteredModel]:
+        return [self.get(version) for version in self.versions()]
+
+    def load(self, versions: typing.Sequence[str] | None = None) -> list[Model]:
+        """Load the given versions (default: every registered version that has been trained)."""
+        if versions is not None:
+            return [self.get(version).load() for version in versions]
+
+        models = []
+        for registered in self.models():
+            try:
+                models.append(registered.load())
+            except ModelNotTrainedError as exc:
+                print(exc)
+        return models
+
+    def _discover(self) -> dict[str, RegisteredModel]:
+        with self._lock:
+            if self._models is None:
+                self._models = {}
+                for directory in sorted(self._root.iterdir()):
+                    if (
+                        directory.is_dir()
+                        and VERSION_PACKAGE_PATTERN.match(directory.name)
+                        and (directory / METADATA_FILE).exists()
+                    ):
+                        registered = RegisteredModel(directory)
+                        self._models[registered.version] = registered
+            return self._models
+
+
+def save_model(model: Model, directory: pathlib.Path) -> None:
+    """Persist a trained model in the layout the registry reads."""
+    (directory / METADATA_FILE).write_text(model.to_json())
+    if is_linear(model.estimator):
+        LinearCoefficients.from_estimator(model.estimator).save(
+            directory / COEFFICIENTS_FILE
+        )
+    with open(directory / PICKLE_FILE, "wb") as file_handle:
+        pickle.dump(model, file_handle)
+
+
+registry = ModelRegistry()
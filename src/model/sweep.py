@@ -0,0 +1,320 @@
+"""
+Evaluate a grid of estimators x feature subsets with time-series cross-validation,
+in parallel, and write a leaderboard (CSV, best first).
+
+Folds are `TimeSeriesSplit`s of the training data in date order: every fold is
+tested on days after the ones it was trained on.
+
+Worker processes memory-map the training data's binary artifact (see `data.training_artifact`),
+so the training matrix is shared through the page cache rather than pickled to each task.
+
+To run:
+`./venv/bin/python -m src.model.sweep`
+"""
+import argparse
+import concurrent.futures
+import csv
+import dataclasses
+import datetime
+import importlib
+import itertools
+import json
+import os
+import pathlib
+import sys
+import time
+import typing
+
+import numpy as np
+
+from .data import (
+    MAX_HOUR,
+    MIN_HOUR,
+    OBSERVATION_NAME_AND_HOUR_SEPARATOR,
+    TRAINING_DATA,
+)
+from .data.training_artifact import (
+    FIELDNAME_DATE,
+    RESPONSE_VARIABLE,
+    training_artifact,
+)
+
+SWEEPS_DIR = pathlib.Path(__file__).parent / "sweeps"
+DEFAULT_N_SPLITS = 5
+DEFAULT_TOP = 20
+RANDOM_STATE = 6853
+
+# Observed once per day rather than per hour
+DAILY_VARIABLES = ("pm25_daily_avg",)
+FEATURE_VARIABLES = ("temp", "humidity", "cloudcover", *DAILY_VARIABLES)
+
+# Matrix columns preceding the features; see `data.training_artifact`
+DATE_COLUMN = 0
+RESPONSE_COLUMN = 1
+FIRST_FEATURE_COLUMN = 2
+
+
+@dataclasses.dataclass(frozen=True)
+class EstimatorSpec:
+    """An estimator class (by import path, so specs are cheap to send to workers) and its params."""
+
+    estimator: str  # e.g. "sklearn.linear_model.Ridge"
+    params: tuple[tuple[str, typing.Any], ...] = ()
+
+    @property
+    def name(self) -> str:
+        return self.estimator.rsplit(".", maxsplit=1)[-1]
+
+    def create(self) -> typing.Any:
+        module, name = self.estimator.rsplit(".", maxsplit=1)
+        return getattr(importlib.import_module(module), name)(**dict(self.params))
+
+
+@dataclasses.dataclass(frozen=True)
+class FeatureSubset:
+    variables: tuple[str, ...]
+    include_month: bool = True
+    min_hour: int = MIN_HOUR
+    max_hour: int = MAX_HOUR
+
+    @property
+    def name(self) -> str:
+        hours = f"{self.min_hour}-{self.max_hour}"
+        month = "month+" if self.include_month else ""
+        return f"{month}{'+'.join(self.variables)}@{hours}"
+
+    def fieldnames(self, available: list[str]) -> list[str] | None:
+        """Fieldnames selected from `available`; None if a variable is missing from the data."""
+        selected = [FIELDNAME_DATE] if self.include_month else []
+        for variable in self.variables:
+            if variable in DAILY_VARIABLES:
+                columns = [variable] if variable in available else []
+            else:
+                columns = [
+                    f"{variable}{OBSERVATION_NAME_AND_HOUR_SEPARATOR}{hour}"
+                    for hour in range(self.min_hour, self.max_hour + 1)
+                ]
+                columns = [column for column in columns if column in available]
+            if not columns:
+                return None
+            selected.extend(columns)
+        return selected
+
+
+@dataclasses.dataclass(frozen=True)
+class Configuration:
+    estimator: EstimatorSpec
+    features: FeatureSubset
+
+
+@dataclasses.dataclass
+class Score:
+    estimator: str
+    params: str  # JSON
+    features: str
+    n_features: int
+    rmse_mean: float
+    rmse_std: float
+    mae_mean: float
+    r2_mean: float
+    fit_seconds: float
+
+
+def _grid(
+    estimator: str, **param_values: typing.Sequence[typing.Any]
+) -> list[EstimatorSpec]:
+    names = sorted(param_values)
+    return [
+        EstimatorSpec(estimator, tuple(zip(names, values)))
+        for values in itertools.product(*(param_values[name] for name in names))
+    ]
+
+
+ESTIMATOR_GRID: list[EstimatorSpec] = [
+    EstimatorSpec("sklearn.linear_model.LinearRegression"),
+    *_grid("sklearn.linear_model.Ridge", alpha=[0.1, 1.0, 10.0, 100.0]),
+    *_grid("sklearn.linear_model.Lasso", alpha=[1.0, 10.0, 100.0], max_iter=[10000]),
+    *_grid(
+        "sklearn.linear_model.ElasticNet",
+        alpha=[1.0, 10.0],
+        l1_ratio=[0.2, 0.5, 0.8],
+        max_iter=[10000],
+    ),
+    *_grid(
+        "sklearn.ensemble.RandomForestRegressor",
+        n_estimators=[200],
+        max_depth=[None, 8],
+        random_state=[RANDOM_STATE],
+    ),
+    *_grid(
+        "sklearn.ensemble.HistGradientBoostingRegressor",
+        learning_rate=[0.05, 0.1],
+        max_depth=[3, None],
+        random_state=[RANDOM_STATE],
+    ),
+]
+
+FEATURE_GRID: list[FeatureSubset] = [
+    FeatureSubset(variables, include_month, min_hour, max_hour)
+    for n_variables in range(1, len(FEATURE_VARIABLES) + 1)
+    for variables in itertools.combinations(FEATURE_VARIABLES, n_variables)
+    for include_month in (True, False)
+    for min_hour, max_hour in ((MIN_HOUR, MAX_HOUR), (9, 16))
+]
+
+
+# Per-worker state, set by `_init_worker`: the memory-mapped matrix, its rows' date order, and
+# the response variable in that order
+_matrix: np.ndarray
+_order: np.ndarray
+_y: np.ndarray
+
+
+def _init_worker(matrix_path: pathlib.Path) -> None:
+    global _matrix, _order, _y
+    _matrix = np.load(matrix_path, mmap_mode="r")
+    _order = np.argsort(_matrix[:, DATE_COLUMN], kind="stable")
+    _y = _matrix[_order, RESPONSE_COLUMN]
+
+
+def _evaluate(
+    configuration: Configuration, feature_columns: list[int], n_splits: int
+) -> Score:
+    from sklearn.metrics import (
+        mean_absolute_error,
+        mean_squared_error,
+        r2_score,
+    )
+    from sklearn.model_selection import (
+        TimeSeriesSplit,
+    )
+
+    # Reads (and copies) only the configuration's columns of the memory-mapped matrix
+    X = _matrix[np.ix_(_order, np.asarray(feature_columns))]
+    y = _y
+
+    rmse, mae, r2 = [], [], []
+    started = time.perf_counter()
+    for train_index, test_index in TimeSeriesSplit(n_splits=n_splits).split(X):
+        estimator = configuration.estimator.create()
+        estimator.fit(X[train_index], y[train_index])
+        y_predicted = estimator.predict(X[test_index])
+        rmse.append(mean_squared_error(y[test_index], y_predicted, squared=False))
+        mae.append(mean_absolute_error(y[test_index], y_predicted))
+        r2.append(r2_score(y[test_index], y_predicted))
+
+    return Score(
+        estimator=configuration.estimator.name,
+        params=json.dumps(dict(configuration.estimator.params)),
+        features=configuration.features.name,
+        n_features=len(feature_columns),
+        rmse_mean=float(np.mean(rmse)),
+        rmse_std=float(np.std(rmse)),
+        mae_mean=float(np.mean(mae)),
+        r2_mean=float(np.mean(r2)),
+        fit_seconds=time.perf_counter() - started,
+    )
+
+
+def sweep(
+    training_data: pathlib.Path = TRAINING_DATA,
+    estimators: typing.Sequence[EstimatorSpec] = ESTIMATOR_GRID,
+    feature_subsets: typing.Sequence[FeatureSubset] = FEATURE_GRID,
+    n_splits: int = DEFAULT_N_SPLITS,
+    max_workers: int | None = None,
+) -> list[Score]:
+    """Scores of every configuration, best (lowest mean RMSE) first."""
+    matrix_path, fieldnames = training_artifact(training_data)
+    features = [field for field in fieldnames if field != RESPONSE_VARIABLE]
+
+    tasks: list[tuple[Configuration, list[int]]] = []
+    skipped = 0
+    for feature_subset in feature_subsets:
+        selected = feature_subset.fieldnames(features)
+        if selected is None:
+            skipped += 1
+            continue
+        columns = [FIRST_FEATURE_COLUMN + features.index(field) for field in selected]
+        for estimator in estimators:
+            tasks.append((Configuration(estimator, feature_subset), columns))
+    if skipped:
+        print(
+            f"Skipping {skipped} feature subsets with variables missing from {training_data.name}"
+        )
+
+    scores: list[Score] = []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, initializer=_init_worker, initargs=(matrix_path,)
+    ) as executor:
+        futures = [
+            executor.submit(_evaluate, configuration, columns, n_splits)
+            for configuration, columns in tasks
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            scores.append(future.result())
+            sys.stdout.write(f"\r{len(scores):04d} / {len(tasks)}")
+            sys.stdout.flush()
+    sys.stdout.write("\n")
+
+    return sorted(scores, key=lambda score: score.rmse_mean)
+
+
+def write_leaderboard(scores: list[Score], outfile: pathlib.Path) -> None:
+    outfile.parent.mkdir(parents=True, exist_ok=True)
+    with open(outfile, mode="w", newline="") as fd:
+        field_names = [field.name for field in dataclasses.fields(Score)]
+        writer = csv.DictWriter(fd, fieldnames=["rank", *field_names])
+        writer.writeheader()
+        for rank, score in enumerate(scores, start=1):
+            writer.writerow({"rank": rank, **dataclasses.asdict(score)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--training-data",
+        dest="training_data",
+        required=False,
+        type=pathlib.Path,
+        default=TRAINING_DATA,
+    )
+    parser.add_argument(
+        "--splits",
+        dest="n_splits",
+        required=False,
+        type=int,
+        default=DEFAULT_N_SPLITS,
+    )
+    parser.add_argument(
+        "--workers",
+        dest="max_workers",
+        required=False,
+        type=int,
+        default=os.cpu_count(),
+    )
+    parser.add_argument(
+        "--out",
+        dest="outfile",
+        required=False,
+        type=pathlib.Path,
+        default=SWEEPS_DIR / f"leaderboard-{datetime.date.today().isoformat()}.csv",
+    )
+    parser.add_argument(
+        "--top",
+        dest="top",
+        required=False,
+        type=int,
+        default=DEFAULT_TOP,
+    )
+    args = parser.parse_args()
+
+    scores = sweep(
+        args.training_data, n_splits=args.n_splits, max_workers=args.max_workers
+    )
+    write_leaderboard(scores, args.outfile)
+
+    print(f"Wrote {len(scores)} results to {args.outfile}")
+    for rank, score in enumerate(scores[: args.top], start=1):
+        print(
+            f"{rank:3d}. RMSE {score.rmse_mean:8.1f} (±{score.rmse_std:6.1f})  R² {score.r2_mean:.3f}  {score.estimator} {score.params} [{score.features}]"
+        )
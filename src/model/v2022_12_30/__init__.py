@@ -1,15 +1,25 @@
 import pathlib
-import pickle
+import typing
 
-from ..model_base import Model
+from ..registry import (
+    PICKLE_FILE,
+    ModelNotTrainedError,
+    registry,
+)
 
-PERSISTED_MODEL = pathlib.Path(__file__).parent / "model.pickle"
+MODEL_DIR = pathlib.Path(__file__).parent
+PERSISTED_MODEL = MODEL_DIR / PICKLE_FILE
+VERSION = "2022-12-30"
 
-model: Model | None = None
-try:
-    with open(PERSISTED_MODEL, "rb") as file_handle:
-        model = pickle.load(file_handle)
-except FileNotFoundError:
-    print(f"Model {PERSISTED_MODEL} does not exist; model must be trained.")
+__all__ = ("model", "PERSISTED_MODEL", "MODEL_DIR", "VERSION")
 
-__all__ = ("model", "PERSISTED_MODEL")
+
+def __getattr__(name: str) -> typing.Any:
+    # Loaded on first access, not on import; see `src.model.registry`
+    if name == "model":
+        try:
+            return registry.get(VERSION).load()
+        except (KeyError, ModelNotTrainedError):
+            print(f"Model {PERSISTED_MODEL} does not exist; model must be trained.")
+            return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
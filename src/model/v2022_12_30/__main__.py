@@ -6,11 +6,14 @@ To run:
 """
 import datetime
 import pathlib
-import pickle
 import stat
 
-from . import PERSISTED_MODEL
-from ..data import TRAINING_DATA, load_data
+from . import MODEL_DIR, PERSISTED_MODEL
+from ..data import (
+    TRAINING_DATA,
+    load_training_data,
+)
+from ..registry import save_model
 from .train import train
 
 if PERSISTED_MODEL.exists():
@@ -26,7 +29,7 @@ if not SNAPSHOT_TRAINING_DATA.exists():
     # set to readonly
     SNAPSHOT_TRAINING_DATA.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
 
-x, y, fieldnames = load_data(SNAPSHOT_TRAINING_DATA)
+x, y, fieldnames = load_training_data(SNAPSHOT_TRAINING_DATA)
 model = train(x, y, fieldnames)
 
 readme = f"""\
@@ -40,5 +43,4 @@ readme = f"""\
 README = pathlib.Path(__file__).parent / "README.md"
 README.write_text(readme)
 
-with open(PERSISTED_MODEL, "wb") as file_handle:
-    pickle.dump(model, file_handle)
+save_model(model, MODEL_DIR)
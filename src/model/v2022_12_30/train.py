@@ -1,3 +1,4 @@
+import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error
 from sklearn.model_selection import (
@@ -12,7 +13,9 @@ VERSION = "2022-12-30"
 
 
 def train(
-    X: list[list[float | int]], Y: list[float | int], fieldnames: list[str]
+    X: list[list[float | int]] | np.ndarray,
+    Y: list[float | int] | np.ndarray,
+    fieldnames: list[str],
 ) -> Model:
     x_train, x_test, y_train, y_test = train_test_split(
         X, Y, test_size=TEST_SIZE, random_state=RANDOM_STATE
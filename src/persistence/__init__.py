@@ -13,8 +13,69 @@ $ ./venv/bin/python
 
 import pathlib
 
-from .ddl import PREDICTIONS_TBL
+from .actuals import (
+    dates_missing_actual_energy_production,
+    write_actual_energy_production,
+)
+from .archive import (
+    archive_before,
+    archive_cutoff,
+    register_views,
+)
+from .ddl import (
+    ALL_FORECAST_FEATURES_VIEW,
+    ALL_PREDICTIONS_VIEW,
+    FORECAST_FEATURES_TBL,
+    PIPELINE_RUNS_TBL,
+    PREDICTIONS_TBL,
+)
+from .forecast_features import (
+    ForecastFeatureBatch,
+    ReplayedFeatures,
+    replay_features,
+    write_forecast_features,
+)
+from .migrations import (
+    MIGRATIONS,
+    Backfill,
+    Migration,
+    MigrationError,
+    migrate,
+    schema_version,
+)
+from .predictions import (
+    OnConflict,
+    PredictionBatch,
+    WriteResult,
+    write_predictions,
+)
 
 PREDICTIONS_DB_PATH = str(pathlib.Path(__file__).parent / "predictions.duckdb")
 
-__all__ = ("PREDICTIONS_DB_PATH", "PREDICTIONS_TBL")
+__all__ = (
+    "ALL_FORECAST_FEATURES_VIEW",
+    "ALL_PREDICTIONS_VIEW",
+    "archive_before",
+    "archive_cutoff",
+    "Backfill",
+    "dates_missing_actual_energy_production",
+    "FORECAST_FEATURES_TBL",
+    "migrate",
+    "Migration",
+    "MigrationError",
+    "MIGRATIONS",
+    "ForecastFeatureBatch",
+    "OnConflict",
+    "PIPELINE_RUNS_TBL",
+    "PredictionBatch",
+    "PREDICTIONS_DB_PATH",
+    "PREDICTIONS_TBL",
+    "register_views",
+    "replay_features",
+    "schema_version",
+    "ReplayedFeatures",
+    "write_actual_energy_production",
+    "write_forecast_features",
+    "write_predictions",
+    "WriteResult",
+)
@@ -0,0 +1,96 @@
+import datetime
+import textwrap
+import typing
+
+import duckdb
+
+from ..metrics import DB_WRITE_TIME
+from ..sites import DEFAULT_SITE_ID
+from .ddl import PREDICTIONS_TBL
+
+STAGED_ACTUALS_TBL = "staged_actual_energy_production"
+
+
+def dates_missing_actual_energy_production(
+    db_con: duckdb.DuckDBPyConnection,
+    before: datetime.date,
+    site_id: str = DEFAULT_SITE_ID,
+) -> list[datetime.date]:
+    """
+    Dates before `before` that have predictions for the site but no actual energy production,
+    in order. (Archived months aren't considered; see `archive`.)
+    """
+    rows: list[tuple[datetime.date]] = db_con.execute(
+        textwrap.dedent(
+            f"""\
+            SELECT DISTINCT prediction_for_date
+            FROM {PREDICTIONS_TBL}
+            WHERE
+                site_id = ?
+                AND prediction_for_date < ?
+                AND actual_energy_production IS NULL
+            ORDER BY prediction_for_date;
+        """
+        ),
+        [site_id, before],
+    ).fetchall()
+    return [date for (date,) in rows]
+
+
+@DB_WRITE_TIME.timed
+def write_actual_energy_production(
+    db_con: duckdb.DuckDBPyConnection,
+    actuals: typing.Sequence[tuple[datetime.date, int | float]],
+    site_id: str = DEFAULT_SITE_ID,
+) -> int:
+    """
+    Set `actual_energy_production` on every prediction for the site for the given dates, in a
+    single transaction with one join-based UPDATE. Returns the number of predictions updated.
+    """
+    if not actuals:
+        return 0
+
+    db_con.execute("BEGIN TRANSACTION")
+    try:
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                CREATE OR REPLACE TEMP TABLE {STAGED_ACTUALS_TBL} (
+                    prediction_for_date      DATE NOT NULL,
+                    actual_energy_production DOUBLE NOT NULL
+                );
+            """
+            )
+        )
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                INSERT INTO {STAGED_ACTUALS_TBL}
+                SELECT unnest(?::DATE[]), unnest(?::DOUBLE[]);
+            """
+            ),
+            [
+                [date for date, _ in actuals],
+                [float(energy_produced) for _, energy_produced in actuals],
+            ],
+        )
+        rows = db_con.execute(
+            textwrap.dedent(
+                f"""\
+                UPDATE {PREDICTIONS_TBL}
+                SET actual_energy_production = staged.actual_energy_production
+                FROM {STAGED_ACTUALS_TBL} AS staged
+                WHERE
+                    {PREDICTIONS_TBL}.site_id = ?
+                    AND {PREDICTIONS_TBL}.prediction_for_date = staged.prediction_for_date;
+            """
+            ),
+            [site_id],
+        ).fetchall()
+        db_con.execute(f"DROP TABLE {STAGED_ACTUALS_TBL}")
+        db_con.execute("COMMIT")
+    except Exception:
+        db_con.execute("ROLLBACK")
+        raise
+
+    return int(rows[0][0]) if rows else 0
@@ -0,0 +1,169 @@
+"""
+Months older than `ARCHIVE_AFTER_MONTHS` are moved out of the database into Parquet
+partitions, one per table per calendar month (of `prediction_for_date`):
+```
+archive/<table>/<YYYY>-<MM>.parquet
+```
+sorted by site and date, so that DuckDb can skip row groups that can't match a query. The
+database file stays small, and an archived month's partition is written once and then never
+changes.
+
+Queries read a table and its archive together through a temporary view (see `ALL_PREDICTIONS_VIEW`,
+`register_views`). Archived predictions are not updated any more (e.g., with actual energy
+production), so only months whose actuals are long settled are archived.
+
+See `src.bin.archive_predictions` to run.
+"""
+import datetime
+import os
+import pathlib
+import textwrap
+
+import duckdb
+
+from .ddl import (
+    ALL_FORECAST_FEATURES_VIEW,
+    ALL_PREDICTIONS_VIEW,
+    FORECAST_FEATURES_TBL,
+    PREDICTIONS_TBL,
+)
+
+ARCHIVE_DIR = pathlib.Path(__file__).parent / "archive"
+ARCHIVE_AFTER_MONTHS = 3
+
+# Table, its view, and the order of rows within a partition
+ARCHIVED_TABLES = (
+    (
+        PREDICTIONS_TBL,
+        ALL_PREDICTIONS_VIEW,
+        "site_id, prediction_for_date, date_of_prediction, model_version",
+    ),
+    (
+        FORECAST_FEATURES_TBL,
+        ALL_FORECAST_FEATURES_VIEW,
+        "site_id, prediction_for_date, date_of_prediction, hour, variable",
+    ),
+)
+
+
+def partitions(
+    table: str, archive_dir: pathlib.Path = ARCHIVE_DIR
+) -> list[pathlib.Path]:
+    return sorted((archive_dir / table).glob("*.parquet"))
+
+
+def register_views(
+    db_con: duckdb.DuckDBPyConnection, archive_dir: pathlib.Path = ARCHIVE_DIR
+) -> None:
+    """(Re)create the temporary views over each table and its archived months."""
+    for table, view, _ in ARCHIVED_TABLES:
+        if not _table_exists(db_con, table):
+            continue
+        archived = partitions(table, archive_dir)
+        union = (
+            f"\nUNION ALL\nSELECT * FROM read_parquet([{', '.join(_sql_string(p) for p in archived)}])"
+            if archived
+            else ""
+        )
+        db_con.execute(
+            f"CREATE OR REPLACE TEMP VIEW {view} AS\nSELECT * FROM {table}{union};"
+        )
+
+
+def archive_cutoff(today: datetime.date) -> datetime.date:
+    """First day of the month `ARCHIVE_AFTER_MONTHS` months before `today`'s."""
+    cutoff = today.replace(day=1)
+    for _ in range(ARCHIVE_AFTER_MONTHS):
+        cutoff = (cutoff - datetime.timedelta(days=1)).replace(day=1)
+    return cutoff
+
+
+def archive_before(
+    db_con: duckdb.DuckDBPyConnection,
+    before: datetime.date,
+    archive_dir: pathlib.Path = ARCHIVE_DIR,
+) -> list[pathlib.Path]:
+    """
+    Move every month that ends before `before` to its partition (merged with any rows already
+    archived for it), then delete it from the database. Returns the partitions written.
+    """
+    written: list[pathlib.Path] = []
+    for table, _, order in ARCHIVED_TABLES:
+        if not _table_exists(db_con, table):
+            continue
+        months: list[tuple[datetime.date]] = db_con.execute(
+            textwrap.dedent(
+                f"""\
+                SELECT DISTINCT CAST(date_trunc('month', prediction_for_date) AS DATE) AS month
+                FROM {table}
+                WHERE prediction_for_date < date_trunc('month', CAST(? AS DATE))
+                ORDER BY month;
+            """
+            ),
+            [before],
+        ).fetchall()
+        for (month,) in months:
+            partition = archive_dir / table / f"{month.strftime('%Y-%m')}.parquet"
+            _write_partition(db_con, table, order, month, partition)
+            _delete_month(db_con, table, month)
+            written.append(partition)
+
+    if written:
+        db_con.execute("CHECKPOINT")
+    return written
+
+
+def _write_partition(
+    db_con: duckdb.DuckDBPyConnection,
+    table: str,
+    order: str,
+    month: datetime.date,
+    partition: pathlib.Path,
+) -> None:
+    partition.parent.mkdir(parents=True, exist_ok=True)
+    partial = partition.with_name(f".{partition.name}.partial")
+    rows = f"SELECT * FROM {table} WHERE {_in_month(month)}"
+    if partition.exists():
+        # UNION, not UNION ALL: re-archiving a month (e.g., after an interrupted run) is a no-op
+        rows += f"\nUNION\nSELECT * FROM read_parquet({_sql_string(partition)})"
+    db_con.execute(
+        f"COPY ({rows}\nORDER BY {order}) TO {_sql_string(partial)} (FORMAT PARQUET);"
+    )
+    os.replace(partial, partition)
+
+
+def _delete_month(
+    db_con: duckdb.DuckDBPyConnection, table: str, month: datetime.date
+) -> None:
+    db_con.execute("BEGIN TRANSACTION")
+    try:
+        db_con.execute(f"DELETE FROM {table} WHERE {_in_month(month)}")
+        db_con.execute("COMMIT")
+    except Exception:
+        db_con.execute("ROLLBACK")
+        raise
+
+
+def _table_exists(db_con: duckdb.DuckDBPyConnection, table: str) -> bool:
+    rows = db_con.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [table]
+    ).fetchall()
+    return rows[0][0] > 0
+
+
+def _in_month(month: datetime.date) -> str:
+    # A range rather than `date_trunc(...) = month`, so that zone maps can prune it
+    next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return (
+        f"prediction_for_date >= {_sql_date(month)}"
+        f" AND prediction_for_date < {_sql_date(next_month)}"
+    )
+
+
+def _sql_date(date: datetime.date) -> str:
+    return f"DATE '{date.isoformat()}'"
+
+
+def _sql_string(path: pathlib.Path) -> str:
+    escaped = str(path).replace("'", "''")
+    return f"'{escaped}'"
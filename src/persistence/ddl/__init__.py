@@ -1,3 +1,6 @@
+# Each statement here is applied once, as a migration (see `src.persistence.migrations`), and
+# must not be edited afterwards
+
 PREDICTIONS_TBL = "predictions"
 
 CREATE_PREDICTIONS_TABLE = f"""\
@@ -14,3 +17,85 @@ CREATE TABLE IF NOT EXISTS {PREDICTIONS_TBL} (
 SWAP_ACCURACY_FOR_ACTUAL_WATTAGE = f"""\
 ALTER TABLE {PREDICTIONS_TBL} RENAME COLUMN accuracy TO actual_energy_production;
 """
+
+# DuckDb can't change a table's primary key, so the table is rebuilt, in (site, date) order.
+# Predictions made before there were sites are for the default site (see `src.sites`).
+ADD_SITE_TO_PREDICTIONS = f"""\
+CREATE TABLE {PREDICTIONS_TBL}_by_site (
+    site_id                  VARCHAR NOT NULL,       -- Site prediction is for (see `src.sites`)
+    prediction_for_date      DATE NOT NULL,          -- Date for which prediction is made
+    date_of_prediction       DATE NOT NULL,          -- Date prediction was made
+    model_version            VARCHAR NOT NULL,       -- Version of model used to make prediction; date-like (e.g., "2022-12-31")
+    energy_production        DOUBLE NOT NULL,        -- Energy production prediction (Wh)
+    actual_energy_production DOUBLE DEFAULT NULL,    -- Energy produced (Wh), once known
+    PRIMARY KEY (site_id, prediction_for_date, date_of_prediction, model_version)
+);
+INSERT INTO {PREDICTIONS_TBL}_by_site
+SELECT
+    'default',
+    prediction_for_date,
+    date_of_prediction,
+    model_version,
+    energy_production,
+    actual_energy_production
+FROM {PREDICTIONS_TBL}
+ORDER BY prediction_for_date, date_of_prediction, model_version;
+DROP TABLE {PREDICTIONS_TBL};
+ALTER TABLE {PREDICTIONS_TBL}_by_site RENAME TO {PREDICTIONS_TBL};
+"""
+
+FORECAST_FEATURES_TBL = "forecast_features"
+
+CREATE_FORECAST_FEATURES_TABLE = f"""\
+CREATE TABLE IF NOT EXISTS {FORECAST_FEATURES_TBL} (
+    date_of_prediction  DATE NOT NULL,       -- Date forecast was fetched (and prediction made)
+    prediction_for_date DATE NOT NULL,       -- Date forecasted
+    hour                UTINYINT NOT NULL,   -- Local hour of day (0..23) forecasted
+    variable            VARCHAR NOT NULL,    -- Weather prediction variable (e.g., "temp")
+    value               DOUBLE NOT NULL,
+    PRIMARY KEY (date_of_prediction, prediction_for_date, hour, variable)
+);
+"""
+
+ADD_SITE_TO_FORECAST_FEATURES = f"""\
+CREATE TABLE {FORECAST_FEATURES_TBL}_by_site (
+    site_id             VARCHAR NOT NULL,    -- Site forecasted (see `src.sites`)
+    date_of_prediction  DATE NOT NULL,       -- Date forecast was fetched (and prediction made)
+    prediction_for_date DATE NOT NULL,       -- Date forecasted
+    hour                UTINYINT NOT NULL,   -- Local hour of day (0..23) forecasted
+    variable            VARCHAR NOT NULL,    -- Weather prediction variable (e.g., "temp")
+    value               DOUBLE NOT NULL,
+    PRIMARY KEY (site_id, prediction_for_date, date_of_prediction, hour, variable)
+);
+INSERT INTO {FORECAST_FEATURES_TBL}_by_site
+SELECT
+    'default',
+    date_of_prediction,
+    prediction_for_date,
+    hour,
+    variable,
+    value
+FROM {FORECAST_FEATURES_TBL}
+ORDER BY prediction_for_date, date_of_prediction, hour, variable;
+DROP TABLE {FORECAST_FEATURES_TBL};
+ALTER TABLE {FORECAST_FEATURES_TBL}_by_site RENAME TO {FORECAST_FEATURES_TBL};
+"""
+
+# Temporary views over each table and its archived months (see `archive`); queries should
+# read through these
+ALL_PREDICTIONS_VIEW = f"all_{PREDICTIONS_TBL}"
+ALL_FORECAST_FEATURES_VIEW = f"all_{FORECAST_FEATURES_TBL}"
+
+PIPELINE_RUNS_TBL = "pipeline_runs"
+
+CREATE_PIPELINE_RUNS_TABLE = f"""\
+CREATE TABLE IF NOT EXISTS {PIPELINE_RUNS_TBL} (
+    run_started_at TIMESTAMP NOT NULL,   -- When the pipeline run the step was part of started
+    step           VARCHAR NOT NULL,     -- Name of the step (see `src.pipeline`)
+    status         VARCHAR NOT NULL,     -- "succeeded", "failed", "skipped", or "blocked"
+    fingerprint    VARCHAR DEFAULT NULL, -- Hash of the step's inputs when it ran
+    started_at     TIMESTAMP NOT NULL,
+    duration       DOUBLE NOT NULL,      -- Seconds
+    PRIMARY KEY (run_started_at, step)
+);
+"""
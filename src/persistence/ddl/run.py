@@ -1,20 +1,18 @@
 """
-Setup predictions-db. DDL statements must be idempotent.
+Bring predictions-db up to date (see `src.persistence.migrations`). Jobs that use the database
+also do this at startup.
 
 To run:
 `./venv/bin/python -m src.persistence.ddl.run`
 """
-
 import duckdb
 
-from . import (
-    CREATE_PREDICTIONS_TABLE,
-    SWAP_ACCURACY_FOR_ACTUAL_WATTAGE,
-)
 from .. import PREDICTIONS_DB_PATH
+from ..migrations import migrate, schema_version
 
-statements = (CREATE_PREDICTIONS_TABLE, SWAP_ACCURACY_FOR_ACTUAL_WATTAGE)
-
-db_con = duckdb.connect(PREDICTIONS_DB_PATH)
-for statement in statements:
-    db_con.execute(statement)
+if __name__ == "__main__":
+    db_con = duckdb.connect(PREDICTIONS_DB_PATH)
+    applied = migrate(db_con)
+    for migration in applied:
+        print(f"Applied migration {migration.version} ({migration.name})")
+    print(f"predictions-db is at schema version {schema_version(db_con)}")
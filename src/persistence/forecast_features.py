@@ -0,0 +1,263 @@
+import dataclasses
+import datetime
+import textwrap
+import typing
+
+import duckdb
+import numpy as np
+
+from ..external_data import DailyForecast
+from ..feature_store import (
+    HourlyFeatures,
+    compile_feature_layout,
+    feature_matrix,
+)
+from ..metrics import DB_WRITE_TIME
+from ..sites import DEFAULT_SITE_ID
+from .archive import register_views
+from .ddl import (
+    ALL_FORECAST_FEATURES_VIEW,
+    ALL_PREDICTIONS_VIEW,
+    FORECAST_FEATURES_TBL,
+)
+
+STAGED_FORECAST_FEATURES_TBL = "staged_forecast_features"
+
+
+@dataclasses.dataclass
+class ForecastFeatureBatch:
+    """
+    Column-oriented batch of forecast values, one entry per (site, forecast day, hour, variable).
+    """
+
+    site_id: np.ndarray  # str
+    date_of_prediction: np.ndarray  # datetime64[D]
+    prediction_for_date: np.ndarray  # datetime64[D]
+    hour: np.ndarray  # uint8
+    variable: np.ndarray  # str
+    value: np.ndarray  # float64
+
+    @classmethod
+    def from_daily_forecasts(
+        cls,
+        daily_forecasts: typing.Sequence[DailyForecast],
+        date_of_prediction: datetime.date,
+        site_id: str = DEFAULT_SITE_ID,
+    ) -> "ForecastFeatureBatch":
+        # Same values, and the same first-forecast-for-an-hour-wins rule, as the feature store
+        features = HourlyFeatures.from_daily_forecasts(
+            daily_forecasts, date_of_prediction
+        )
+        return cls(
+            site_id=np.full(len(features), site_id, dtype=object),
+            date_of_prediction=features.date_of_prediction,
+            prediction_for_date=features.date,
+            hour=features.hour,
+            variable=features.variable,
+            value=features.value,
+        )
+
+    @classmethod
+    def concatenate(
+        cls, batches: typing.Sequence["ForecastFeatureBatch"]
+    ) -> "ForecastFeatureBatch":
+        return cls(
+            *(
+                np.concatenate([getattr(batch, field.name) for batch in batches])
+                for field in dataclasses.fields(cls)
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+    def columns(self) -> list[list]:
+        """Each column as a list of Python values, e.g., to bind as DuckDb list parameters."""
+        return [
+            self.site_id.tolist(),
+            self.date_of_prediction.astype("datetime64[D]").tolist(),
+            self.prediction_for_date.astype("datetime64[D]").tolist(),
+            self.hour.tolist(),
+            self.variable.tolist(),
+            self.value.tolist(),
+        ]
+
+
+@dataclasses.dataclass
+class ReplayedFeatures:
+    """
+    Feature matrices rebuilt from persisted forecasts; row `i` is the forecast made on
+    `date_of_prediction[i]` for `prediction_for_date[i]`. Missing features are NaN,
+    and `sufficient` is True for complete rows. `actual_energy_production` is NaN where unknown.
+    """
+
+    date_of_prediction: np.ndarray  # datetime64[D]
+    prediction_for_date: np.ndarray  # datetime64[D]
+    X: np.ndarray
+    sufficient: np.ndarray
+    actual_energy_production: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.prediction_for_date)
+
+
+@DB_WRITE_TIME.timed
+def write_forecast_features(
+    db_con: duckdb.DuckDBPyConnection, batch: ForecastFeatureBatch
+) -> int:
+    """
+    Persist a batch of forecast values in a single transaction. Values already persisted
+    (e.g., the forecast was fetched earlier the same day) are kept. Returns the number inserted.
+    """
+    if len(batch) == 0:
+        return 0
+
+    db_con.execute("BEGIN TRANSACTION")
+    try:
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                CREATE OR REPLACE TEMP TABLE {STAGED_FORECAST_FEATURES_TBL} (
+                    site_id             VARCHAR NOT NULL,
+                    date_of_prediction  DATE NOT NULL,
+                    prediction_for_date DATE NOT NULL,
+                    hour                UTINYINT NOT NULL,
+                    variable            VARCHAR NOT NULL,
+                    value               DOUBLE NOT NULL
+                );
+            """
+            )
+        )
+        # One statement for the whole batch: each column is bound as a list and unnested
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                INSERT INTO {STAGED_FORECAST_FEATURES_TBL}
+                SELECT
+                    unnest(?::VARCHAR[]),
+                    unnest(?::DATE[]),
+                    unnest(?::DATE[]),
+                    unnest(?::UTINYINT[]),
+                    unnest(?::VARCHAR[]),
+                    unnest(?::DOUBLE[]);
+            """
+            ),
+            batch.columns(),
+        )
+        rows = db_con.execute(
+            textwrap.dedent(
+                f"""\
+                INSERT INTO {FORECAST_FEATURES_TBL} (
+                    site_id,
+                    date_of_prediction,
+                    prediction_for_date,
+                    hour,
+                    variable,
+                    value
+                )
+                SELECT DISTINCT ON (site_id, prediction_for_date, date_of_prediction, hour, variable)
+                    staged.*
+                FROM
+                    {STAGED_FORECAST_FEATURES_TBL} AS staged
+                WHERE NOT EXISTS (
+                    SELECT 1
+                    FROM {FORECAST_FEATURES_TBL} AS existing
+                    WHERE
+                        existing.site_id = staged.site_id
+                        AND existing.date_of_prediction = staged.date_of_prediction
+                        AND existing.prediction_for_date = staged.prediction_for_date
+                        AND existing.hour = staged.hour
+                        AND existing.variable = staged.variable
+                )
+                -- Inserted in key order, so that each block's zone map covers few sites and dates
+                ORDER BY site_id, prediction_for_date, date_of_prediction, hour, variable;
+            """
+            )
+        ).fetchall()
+        db_con.execute(f"DROP TABLE {STAGED_FORECAST_FEATURES_TBL}")
+        db_con.execute("COMMIT")
+    except Exception:
+        db_con.execute("ROLLBACK")
+        raise
+
+    return int(rows[0][0]) if rows else 0
+
+
+def replay_features(
+    db_con: duckdb.DuckDBPyConnection,
+    fieldnames: typing.Sequence[str],
+    start: datetime.date,
+    end: datetime.date,
+    days_ahead: int | None = None,
+    site_id: str = DEFAULT_SITE_ID,
+) -> ReplayedFeatures:
+    """
+    Rebuild the feature matrix (for a model with `fieldnames`) of every persisted forecast
+    for the site for `start`..`end` (inclusive), archived or not. The long-format values are
+    materialized by the feature store (see `feature_store.feature_matrix`), as at inference.
+    With `days_ahead`, only forecasts made that many days before the day forecasted.
+    Ordered by prediction_for_date, date_of_prediction.
+    """
+    register_views(db_con)
+    lead = (
+        ""
+        if days_ahead is None
+        else f"\n    AND prediction_for_date - date_of_prediction = {int(days_ahead)}"
+    )
+    values = db_con.execute(
+        textwrap.dedent(
+            f"""\
+            SELECT date_of_prediction, prediction_for_date, hour, variable, value
+            FROM {ALL_FORECAST_FEATURES_VIEW}
+            WHERE site_id = ? AND prediction_for_date BETWEEN ? AND ?{lead};
+        """
+        ),
+        [site_id, start, end],
+    ).fetchnumpy()
+    actuals = db_con.execute(
+        textwrap.dedent(
+            f"""\
+            SELECT prediction_for_date, max(actual_energy_production) AS actual_energy_production
+            FROM {ALL_PREDICTIONS_VIEW}
+            WHERE site_id = ? AND prediction_for_date BETWEEN ? AND ?
+            GROUP BY prediction_for_date
+            ORDER BY prediction_for_date;
+        """
+        ),
+        [site_id, start, end],
+    ).fetchnumpy()
+
+    features = feature_matrix(
+        HourlyFeatures(
+            np.asarray(values["date_of_prediction"]).astype("datetime64[D]"),
+            np.asarray(values["prediction_for_date"]).astype("datetime64[D]"),
+            np.asarray(values["hour"]).astype(np.uint8),
+            np.asarray(values["variable"]).astype(object),
+            np.asarray(values["value"]).astype(np.float64),
+        ),
+        compile_feature_layout(tuple(fieldnames)),
+    )
+    return ReplayedFeatures(
+        date_of_prediction=features.date_of_prediction,
+        prediction_for_date=features.date,
+        X=features.X,
+        sufficient=features.sufficient,
+        actual_energy_production=_actual_energy_production(features.date, actuals),
+    )
+
+
+def _actual_energy_production(
+    dates: np.ndarray, actuals: dict[str, np.ndarray]
+) -> np.ndarray:
+    """The actual of each of `dates`, from `actuals` ordered by date; NaN where unknown."""
+    actual_dates = np.asarray(actuals["prediction_for_date"]).astype("datetime64[D]")
+    actual = _filled(actuals["actual_energy_production"])
+    if len(actual_dates) == 0:
+        return np.full(len(dates), np.nan)
+    index = np.minimum(np.searchsorted(actual_dates, dates), len(actual_dates) - 1)
+    return np.where(actual_dates[index] == dates, actual[index], np.nan)
+
+
+def _filled(column: np.ndarray) -> np.ndarray:
+    """NULLs (masked by `fetchnumpy`) as NaN."""
+    return np.ma.filled(np.ma.asarray(column).astype(np.float64), np.nan)
@@ -0,0 +1,262 @@
+"""
+Versioned schema migrations for predictions-db.
+
+Migrations are applied in order, each in its own transaction together with its row in
+`schema_migrations` (version, name, checksum of its SQL, time applied), so a database is always
+at exactly one version. An applied migration must never be edited: its checksum is compared on
+every run, and a mismatch is an error. Add a new migration instead.
+
+Checking an up-to-date database is a single query, so jobs call `migrate` at startup.
+
+Data migrations over large tables are written as a `Backfill`: set-based SQL run one month (of
+`prediction_for_date`) at a time, each month in its own transaction, so that an interrupted
+backfill keeps the months already done and picks up where it left off when re-run. A backfill
+is a migration of its own; any schema change it needs goes in the migration before it.
+
+Databases created before migrations were versioned are adopted: the migrations they already
+have (see `Migration.present`) are recorded as applied, without being run again.
+"""
+import contextlib
+import dataclasses
+import datetime
+import hashlib
+import textwrap
+import typing
+
+import duckdb
+
+from .ddl import (
+    ADD_SITE_TO_FORECAST_FEATURES,
+    ADD_SITE_TO_PREDICTIONS,
+    CREATE_FORECAST_FEATURES_TABLE,
+    CREATE_PIPELINE_RUNS_TABLE,
+    CREATE_PREDICTIONS_TABLE,
+    FORECAST_FEATURES_TBL,
+    PREDICTIONS_TBL,
+    SWAP_ACCURACY_FOR_ACTUAL_WATTAGE,
+)
+
+SCHEMA_MIGRATIONS_TBL = "schema_migrations"
+
+CREATE_SCHEMA_MIGRATIONS_TABLE = f"""\
+CREATE TABLE IF NOT EXISTS {SCHEMA_MIGRATIONS_TBL} (
+    version    INTEGER NOT NULL PRIMARY KEY,
+    name       VARCHAR NOT NULL,
+    checksum   VARCHAR NOT NULL,   -- sha256 of the migration's SQL
+    applied_at TIMESTAMP NOT NULL
+);
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class Backfill:
+    """
+    `sql` is run once per month of `table` (by `prediction_for_date`) with the month's first day
+    and the next month's first day as parameters. It must only touch rows that still need it
+    (e.g., `WHERE ... IS NULL`), so that re-running a month is harmless.
+    """
+
+    table: str
+    sql: str
+
+
+@dataclasses.dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    sql: str = ""
+    backfill: Backfill | None = None
+    # Whether a database from before migrations were versioned already has this change
+    present: typing.Callable[[duckdb.DuckDBPyConnection], bool] | None = None
+
+    @property
+    def checksum(self) -> str:
+        digest = hashlib.sha256(self.sql.encode("utf-8"))
+        if self.backfill is not None:
+            digest.update(
+                f"\0{self.backfill.table}\0{self.backfill.sql}".encode("utf-8")
+            )
+        return digest.hexdigest()
+
+
+def has_table(db_con: duckdb.DuckDBPyConnection, table: str) -> bool:
+    rows = db_con.execute(
+        "SELECT count(*) FROM information_schema.tables WHERE table_name = ?", [table]
+    ).fetchall()
+    return rows[0][0] > 0
+
+
+def has_column(db_con: duckdb.DuckDBPyConnection, table: str, column: str) -> bool:
+    rows = db_con.execute(
+        "SELECT count(*) FROM information_schema.columns WHERE table_name = ? AND column_name = ?",
+        [table, column],
+    ).fetchall()
+    return rows[0][0] > 0
+
+
+MIGRATIONS: tuple[Migration, ...] = (
+    Migration(
+        1,
+        "create_predictions",
+        CREATE_PREDICTIONS_TABLE,
+        present=lambda db_con: has_table(db_con, PREDICTIONS_TBL),
+    ),
+    Migration(
+        2,
+        "swap_accuracy_for_actual_energy_production",
+        SWAP_ACCURACY_FOR_ACTUAL_WATTAGE,
+        present=lambda db_con: has_column(
+            db_con, PREDICTIONS_TBL, "actual_energy_production"
+        ),
+    ),
+    Migration(
+        3,
+        "add_site_to_predictions",
+        ADD_SITE_TO_PREDICTIONS,
+        present=lambda db_con: has_column(db_con, PREDICTIONS_TBL, "site_id"),
+    ),
+    Migration(
+        4,
+        "create_forecast_features",
+        CREATE_FORECAST_FEATURES_TABLE,
+        present=lambda db_con: has_table(db_con, FORECAST_FEATURES_TBL),
+    ),
+    Migration(
+        5,
+        "add_site_to_forecast_features",
+        ADD_SITE_TO_FORECAST_FEATURES,
+        present=lambda db_con: has_column(db_con, FORECAST_FEATURES_TBL, "site_id"),
+    ),
+    Migration(6, "create_pipeline_runs", CREATE_PIPELINE_RUNS_TABLE),
+)
+
+
+def applied_migrations(db_con: duckdb.DuckDBPyConnection) -> dict[int, str] | None:
+    """Checksum of each applied migration, by version; None if the database isn't versioned."""
+    try:
+        rows = db_con.execute(
+            f"SELECT version, checksum FROM {SCHEMA_MIGRATIONS_TBL};"
+        ).fetchall()
+    except duckdb.CatalogException:
+        return None
+    return {version: checksum for version, checksum in rows}
+
+
+def schema_version(db_con: duckdb.DuckDBPyConnection) -> int:
+    return max(applied_migrations(db_con) or {}, default=0)
+
+
+def pending_migrations(
+    db_con: duckdb.DuckDBPyConnection,
+    migrations: typing.Sequence[Migration] = MIGRATIONS,
+) -> list[Migration]:
+    """
+    Migrations not yet applied, in order. Raises `MigrationError` if an applied migration has
+    changed, or the database is at a version this code doesn't know about.
+    """
+    applied = applied_migrations(db_con)
+    if applied is None:
+        return list(migrations)
+
+    known = {migration.version: migration for migration in migrations}
+    for version, checksum in applied.items():
+        if version not in known:
+            raise MigrationError(
+                f"Database has migration {version}, which is newer than this code"
+            )
+        if known[version].checksum != checksum:
+            raise MigrationError(
+                f"Migration {version} ({known[version].name}) has changed since it was applied"
+            )
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+def migrate(
+    db_con: duckdb.DuckDBPyConnection,
+    migrations: typing.Sequence[Migration] = MIGRATIONS,
+) -> list[Migration]:
+    """Bring the database up to date. Returns the migrations applied (none, usually)."""
+    _check(migrations)
+    pending = pending_migrations(db_con, migrations)
+    if not pending:
+        return []
+
+    if applied_migrations(db_con) is None:
+        db_con.execute(CREATE_SCHEMA_MIGRATIONS_TABLE)
+        pending = _adopt(db_con, pending)
+
+    for migration in pending:
+        if migration.backfill is not None:
+            _run_backfill(db_con, migration.backfill)
+            with _transaction(db_con):
+                _record(db_con, migration)
+        else:
+            with _transaction(db_con):
+                db_con.execute(migration.sql)
+                _record(db_con, migration)
+    return pending
+
+
+def _adopt(
+    db_con: duckdb.DuckDBPyConnection, migrations: list[Migration]
+) -> list[Migration]:
+    """Record the leading migrations an unversioned database already has; returns the rest."""
+    present = 0
+    for migration in migrations:
+        if migration.present is None or not migration.present(db_con):
+            break
+        present += 1
+
+    with _transaction(db_con):
+        for migration in migrations[:present]:
+            _record(db_con, migration)
+    return migrations[present:]
+
+
+def _run_backfill(db_con: duckdb.DuckDBPyConnection, backfill: Backfill) -> None:
+    months: list[tuple[datetime.date]] = db_con.execute(
+        textwrap.dedent(
+            f"""\
+            SELECT DISTINCT CAST(date_trunc('month', prediction_for_date) AS DATE) AS month
+            FROM {backfill.table}
+            ORDER BY month;
+        """
+        )
+    ).fetchall()
+    for (month,) in months:
+        next_month = (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        with _transaction(db_con):
+            db_con.execute(backfill.sql, [month, next_month])
+
+
+def _record(db_con: duckdb.DuckDBPyConnection, migration: Migration) -> None:
+    db_con.execute(
+        f"INSERT INTO {SCHEMA_MIGRATIONS_TBL} VALUES (?, ?, ?, current_timestamp);",
+        [migration.version, migration.name, migration.checksum],
+    )
+
+
+@contextlib.contextmanager
+def _transaction(db_con: duckdb.DuckDBPyConnection) -> typing.Iterator[None]:
+    db_con.execute("BEGIN TRANSACTION")
+    try:
+        yield
+        db_con.execute("COMMIT")
+    except Exception:
+        db_con.execute("ROLLBACK")
+        raise
+
+
+def _check(migrations: typing.Sequence[Migration]) -> None:
+    versions = [migration.version for migration in migrations]
+    if versions != list(range(1, len(versions) + 1)):
+        raise MigrationError(f"Migration versions must be 1, 2, ...; got {versions}")
+    for migration in migrations:
+        if bool(migration.sql) == (migration.backfill is not None):
+            raise MigrationError(
+                f"Migration {migration.version} must have either SQL or a backfill"
+            )
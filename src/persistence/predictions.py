@@ -0,0 +1,199 @@
+import dataclasses
+import enum
+import textwrap
+import typing
+
+import duckdb
+import numpy as np
+
+from ..metrics import DB_WRITE_TIME
+from .ddl import PREDICTIONS_TBL
+
+STAGED_PREDICTIONS_TBL = "staged_predictions"
+
+
+class OnConflict(enum.Enum):
+    """What to do with a prediction that has already been persisted (same primary key)."""
+
+    DO_NOTHING = "nothing"
+    DO_UPDATE = "update"
+
+
+@dataclasses.dataclass
+class PredictionBatch:
+    """
+    Column-oriented batch of predictions. All arrays have one entry per prediction.
+    """
+
+    site_id: np.ndarray  # str
+    prediction_for_date: np.ndarray  # datetime64[D]
+    date_of_prediction: np.ndarray  # datetime64[D]
+    model_version: np.ndarray  # str
+    energy_production: np.ndarray  # float64, Wh
+
+    def __len__(self) -> int:
+        return len(self.prediction_for_date)
+
+    @classmethod
+    def concatenate(
+        cls, batches: typing.Sequence["PredictionBatch"]
+    ) -> "PredictionBatch":
+        return cls(
+            *(
+                np.concatenate([getattr(batch, field.name) for batch in batches])
+                for field in dataclasses.fields(cls)
+            )
+        )
+
+    def columns(self) -> list[list]:
+        """Each column as a list of Python values, e.g., to bind as DuckDb list parameters."""
+        return [
+            self.site_id.tolist(),
+            self.prediction_for_date.astype("datetime64[D]").tolist(),
+            self.date_of_prediction.astype("datetime64[D]").tolist(),
+            self.model_version.tolist(),
+            self.energy_production.astype(np.float64).tolist(),
+        ]
+
+
+@dataclasses.dataclass
+class WriteResult:
+    inserted: int
+    updated: int
+    skipped: int
+
+
+@DB_WRITE_TIME.timed
+def write_predictions(
+    db_con: duckdb.DuckDBPyConnection,
+    batch: PredictionBatch,
+    on_conflict: OnConflict = OnConflict.DO_NOTHING,
+) -> WriteResult:
+    """
+    Persist a batch of predictions in a single transaction.
+
+    The batch is staged into a temporary table and merged into the predictions table with
+    set-based statements, so predictions that already exist are skipped (or updated) rather
+    than failing the write. If the batch itself contains a prediction more than once, the
+    last one wins.
+
+    DuckDb (as pinned) does not support `INSERT ... ON CONFLICT`, so this is the equivalent
+    UPDATE ... FROM followed by an anti-joined INSERT.
+    """
+    if len(batch) == 0:
+        return WriteResult(0, 0, 0)
+
+    db_con.execute("BEGIN TRANSACTION")
+    try:
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                CREATE OR REPLACE TEMP TABLE {STAGED_PREDICTIONS_TBL} (
+                    i                   INTEGER NOT NULL,
+                    site_id             VARCHAR NOT NULL,
+                    prediction_for_date DATE NOT NULL,
+                    date_of_prediction  DATE NOT NULL,
+                    model_version       VARCHAR NOT NULL,
+                    energy_production   DOUBLE NOT NULL
+                );
+            """
+            )
+        )
+        # One statement for the whole batch: each column is bound as a list and unnested
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                INSERT INTO {STAGED_PREDICTIONS_TBL}
+                SELECT
+                    unnest(?::INTEGER[]),
+                    unnest(?::VARCHAR[]),
+                    unnest(?::DATE[]),
+                    unnest(?::DATE[]),
+                    unnest(?::VARCHAR[]),
+                    unnest(?::DOUBLE[]);
+            """
+            ),
+            [list(range(len(batch))), *batch.columns()],
+        )
+        # Keep only the last occurrence of each prediction within the batch
+        db_con.execute(
+            textwrap.dedent(
+                f"""\
+                DELETE FROM {STAGED_PREDICTIONS_TBL} WHERE i NOT IN (
+                    SELECT max(i)
+                    FROM {STAGED_PREDICTIONS_TBL}
+                    GROUP BY site_id, prediction_for_date, date_of_prediction, model_version
+                );
+            """
+            )
+        )
+
+        updated = 0
+        if on_conflict == OnConflict.DO_UPDATE:
+            updated = _count(
+                db_con.execute(
+                    textwrap.dedent(
+                        f"""\
+                        UPDATE {PREDICTIONS_TBL}
+                        SET energy_production = staged.energy_production
+                        FROM {STAGED_PREDICTIONS_TBL} AS staged
+                        WHERE
+                            {PREDICTIONS_TBL}.site_id = staged.site_id
+                            AND {PREDICTIONS_TBL}.prediction_for_date = staged.prediction_for_date
+                            AND {PREDICTIONS_TBL}.date_of_prediction = staged.date_of_prediction
+                            AND {PREDICTIONS_TBL}.model_version = staged.model_version;
+                    """
+                    )
+                )
+            )
+
+        inserted = _count(
+            db_con.execute(
+                textwrap.dedent(
+                    f"""\
+                    INSERT INTO {PREDICTIONS_TBL} (
+                        site_id,
+                        prediction_for_date,
+                        date_of_prediction,
+                        model_version,
+                        energy_production
+                    )
+                    SELECT
+                        staged.site_id,
+                        staged.prediction_for_date,
+                        staged.date_of_prediction,
+                        staged.model_version,
+                        staged.energy_production
+                    FROM
+                        {STAGED_PREDICTIONS_TBL} AS staged
+                    WHERE NOT EXISTS (
+                        SELECT 1
+                        FROM {PREDICTIONS_TBL} AS existing
+                        WHERE
+                            existing.site_id = staged.site_id
+                            AND existing.prediction_for_date = staged.prediction_for_date
+                            AND existing.date_of_prediction = staged.date_of_prediction
+                            AND existing.model_version = staged.model_version
+                    )
+                    -- Inserted in key order, so that each block's zone map covers few sites and dates
+                    ORDER BY
+                        staged.site_id,
+                        staged.prediction_for_date,
+                        staged.date_of_prediction,
+                        staged.model_version;
+                """
+                )
+            )
+        )
+        db_con.execute(f"DROP TABLE {STAGED_PREDICTIONS_TBL}")
+        db_con.execute("COMMIT")
+    except Exception:
+        db_con.execute("ROLLBACK")
+        raise
+
+    return WriteResult(inserted, updated, len(batch) - inserted - updated)
+
+
+def _count(result: duckdb.DuckDBPyConnection) -> int:
+    rows = result.fetchall()
+    return int(rows[0][0]) if rows else 0
@@ -0,0 +1,274 @@
+"""
+In-process runner for a DAG of pipeline steps.
+
+Each `Step` declares the resources it reads (`inputs`) and writes (`outputs`); these are just
+names (e.g., a table, a file, "date"). A step runs after every step that outputs one of its
+inputs, and after any earlier-declared step that outputs the same resource (so that two steps
+never write the same thing at the same time). Steps that don't depend on each other run
+concurrently, in threads, each on its own cursor of one shared DuckDb connection.
+
+A step is skipped when nothing upstream of it ran and the fingerprint of its inputs (see
+`Pipeline.fingerprints`) is the same as when it last succeeded. Every input must either have a
+fingerprint or be output by another step. A step that fails blocks the steps downstream of it;
+the others carry on.
+
+The outcome and timing of every step is recorded in `PIPELINE_RUNS_TBL`, which is also where the
+fingerprints of earlier runs are read from.
+"""
+import concurrent.futures
+import dataclasses
+import datetime
+import hashlib
+import textwrap
+import time
+import traceback
+import typing
+
+import duckdb
+
+from .persistence import PIPELINE_RUNS_TBL
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+BLOCKED = "blocked"
+
+Fingerprint: typing.TypeAlias = typing.Callable[[duckdb.DuckDBPyConnection], str]
+
+
+@dataclasses.dataclass(frozen=True)
+class Step:
+    name: str
+    run: typing.Callable[[duckdb.DuckDBPyConnection], object]
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+
+
+@dataclasses.dataclass
+class StepRun:
+    step: str
+    status: str
+    fingerprint: str | None
+    started_at: datetime.datetime
+    duration: float  # seconds
+
+
+class Pipeline:
+    steps: dict[str, Step]
+    fingerprints: dict[str, Fingerprint]
+    # Names of the steps each step runs after
+    upstream: dict[str, set[str]]
+
+    def __init__(
+        self,
+        steps: typing.Sequence[Step],
+        fingerprints: dict[str, Fingerprint],
+    ) -> None:
+        self.steps = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Duplicate step {step.name}")
+            self.steps[step.name] = step
+        self.fingerprints = fingerprints
+        self.upstream = _upstream(steps, fingerprints)
+        _check_acyclic(self.upstream)
+
+    def run(
+        self, db_con: duckdb.DuckDBPyConnection, force: bool = False
+    ) -> list[StepRun]:
+        """
+        Run (or skip) every step, as many at a time as the dependencies allow; `force` runs
+        every step. Returns each step's outcome, in the order they finished.
+        """
+        run_started_at = datetime.datetime.now()
+        last_fingerprints = {} if force else _last_fingerprints(db_con)
+
+        runs: dict[str, StepRun] = {}
+        pending = dict(self.steps)
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(self.steps) or 1
+        ) as executor:
+            running: dict[concurrent.futures.Future[StepRun], str] = {}
+            while pending or running:
+                for name in list(pending):
+                    upstream = [
+                        runs.get(dependency) for dependency in self.upstream[name]
+                    ]
+                    if any(run is None for run in upstream):
+                        continue
+                    del pending[name]
+                    statuses = {typing.cast(StepRun, run).status for run in upstream}
+                    if statuses & {FAILED, BLOCKED}:
+                        runs[name] = StepRun(
+                            name, BLOCKED, None, datetime.datetime.now(), 0.0
+                        )
+                        print(f"[{name}] blocked")
+                        continue
+                    future = executor.submit(
+                        self._run_step,
+                        db_con,
+                        self.steps[name],
+                        upstream_ran=SUCCEEDED in statuses,
+                        last_fingerprint=last_fingerprints.get(name),
+                    )
+                    running[future] = name
+                if not running:
+                    continue
+
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    runs[running.pop(future)] = future.result()
+
+        _record(db_con, run_started_at, list(runs.values()))
+        return list(runs.values())
+
+    def _run_step(
+        self,
+        db_con: duckdb.DuckDBPyConnection,
+        step: Step,
+        upstream_ran: bool,
+        last_fingerprint: str | None,
+    ) -> StepRun:
+        started_at = datetime.datetime.now()
+        start = time.perf_counter()
+        cursor = db_con.cursor()
+        fingerprint = None
+        try:
+            # Fingerprinting reads the step's inputs, so it can fail like the step itself
+            try:
+                fingerprint = self._fingerprint(cursor, step)
+                if (
+                    not upstream_ran
+                    and fingerprint is not None
+                    and fingerprint == last_fingerprint
+                ):
+                    print(f"[{step.name}] skipped; inputs unchanged")
+                    return StepRun(
+                        step.name,
+                        SKIPPED,
+                        fingerprint,
+                        started_at,
+                        time.perf_counter() - start,
+                    )
+
+                print(f"[{step.name}] running")
+                step.run(cursor)
+            except Exception:
+                print(f"[{step.name}] failed:\n{traceback.format_exc()}")
+                status = FAILED
+            else:
+                status = SUCCEEDED
+            duration = time.perf_counter() - start
+            print(f"[{step.name}] {status} in {duration:.2f}s")
+            return StepRun(step.name, status, fingerprint, started_at, duration)
+        finally:
+            cursor.close()
+
+    def _fingerprint(self, db_con: duckdb.DuckDBPyConnection, step: Step) -> str | None:
+        """Hash of the step's fingerprinted inputs; None if it has no inputs (always runs)."""
+        if not step.inputs:
+            return None
+        digest = hashlib.sha256()
+        for resource in sorted(step.inputs):
+            if resource in self.fingerprints:
+                digest.update(
+                    f"{resource}\0{self.fingerprints[resource](db_con)}\0".encode(
+                        "utf-8"
+                    )
+                )
+        return digest.hexdigest()
+
+
+def print_timings(runs: typing.Sequence[StepRun], wall_clock: float) -> None:
+    width = max((len(run.step) for run in runs), default=0)
+    for run in sorted(runs, key=lambda run: run.started_at):
+        print(f"\t{run.step:<{width}}  {run.status:<9}  {run.duration:8.2f}s")
+    print(
+        f"\tWall clock {wall_clock:.2f}s; sum of steps {sum(run.duration for run in runs):.2f}s"
+    )
+
+
+def _upstream(
+    steps: typing.Sequence[Step], fingerprints: dict[str, Fingerprint]
+) -> dict[str, set[str]]:
+    producers: dict[str, list[str]] = {}
+    for step in steps:
+        for resource in step.outputs:
+            producers.setdefault(resource, []).append(step.name)
+
+    upstream: dict[str, set[str]] = {step.name: set() for step in steps}
+    for step in steps:
+        for resource in step.inputs:
+            if resource not in producers and resource not in fingerprints:
+                raise ValueError(
+                    f"Input {resource} of step {step.name} is neither output by a step nor fingerprinted"
+                )
+            upstream[step.name].update(producers.get(resource, ()))
+        for resource in step.outputs:
+            writers = producers[resource]
+            upstream[step.name].update(writers[: writers.index(step.name)])
+        upstream[step.name].discard(step.name)
+    return upstream
+
+
+def _check_acyclic(upstream: dict[str, set[str]]) -> None:
+    done: set[str] = set()
+    visiting: set[str] = set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"Steps depend on each other through {name}")
+        visiting.add(name)
+        for dependency in upstream[name]:
+            visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in upstream:
+        visit(name)
+
+
+def _last_fingerprints(db_con: duckdb.DuckDBPyConnection) -> dict[str, str]:
+    """Fingerprint of each step's inputs when it last succeeded (or was skipped)."""
+    rows = db_con.execute(
+        textwrap.dedent(
+            f"""\
+            SELECT step, arg_max(fingerprint, started_at)
+            FROM {PIPELINE_RUNS_TBL}
+            WHERE status IN ('{SUCCEEDED}', '{SKIPPED}') AND fingerprint IS NOT NULL
+            GROUP BY step;
+        """
+        )
+    ).fetchall()
+    return {step: fingerprint for step, fingerprint in rows}
+
+
+def _record(
+    db_con: duckdb.DuckDBPyConnection,
+    run_started_at: datetime.datetime,
+    runs: list[StepRun],
+) -> None:
+    db_con.execute("BEGIN TRANSACTION")
+    try:
+        db_con.executemany(
+            f"INSERT INTO {PIPELINE_RUNS_TBL} VALUES (?, ?, ?, ?, ?, ?);",
+            [
+                [
+                    run_started_at,
+                    run.step,
+                    run.status,
+                    run.fingerprint,
+                    run.started_at,
+                    run.duration,
+                ]
+                for run in runs
+            ],
+        )
+        db_con.execute("COMMIT")
+    except Exception:
+        db_con.execute("ROLLBACK")
+        raise
@@ -0,0 +1,201 @@
+"""
+Headless, batched figure rendering.
+
+A figure is described by a `FigureSpec`: the name of a renderer (see `RENDERERS`), its input
+arrays and options, and where to save it. `render_all` renders many figures in a process pool,
+with the non-interactive Agg backend, and skips any figure whose inputs are unchanged since it
+was last rendered (a hash of the inputs is kept next to each figure, in `<figure>.sha256`).
+
+matplotlib is only imported if something needs rendering.
+"""
+import concurrent.futures
+import dataclasses
+import hashlib
+import json
+import os
+import pathlib
+import typing
+
+import numpy as np
+
+if typing.TYPE_CHECKING:
+    from matplotlib.figure import Figure
+
+# Bump when a renderer's output changes, to re-render figures whose inputs haven't
+RENDERER_VERSION = 1
+FIGURE_SIZE = (20, 10)  # inches
+HASH_SUFFIX = ".sha256"
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class FigureSpec:
+    renderer: str  # key of `RENDERERS`
+    outfile: pathlib.Path
+    data: dict[str, np.ndarray]
+    options: dict[str, typing.Any] = dataclasses.field(default_factory=dict)
+
+    def digest(self) -> str:
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                [RENDERER_VERSION, self.renderer, self.options],
+                sort_keys=True,
+                default=str,
+            ).encode("utf-8")
+        )
+        for name in sorted(self.data):
+            array = np.ascontiguousarray(self.data[name])
+            digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode("utf-8"))
+            if array.dtype == object:
+                digest.update(json.dumps(array.tolist(), default=str).encode("utf-8"))
+            else:
+                digest.update(array.tobytes())
+        return digest.hexdigest()
+
+    @property
+    def hash_file(self) -> pathlib.Path:
+        return self.outfile.with_name(self.outfile.name + HASH_SUFFIX)
+
+    def is_up_to_date(self, digest: str) -> bool:
+        return (
+            self.outfile.exists()
+            and self.hash_file.exists()
+            and self.hash_file.read_text().strip() == digest
+        )
+
+
+@dataclasses.dataclass
+class RenderResult:
+    rendered: list[pathlib.Path]
+    skipped: list[pathlib.Path]
+
+
+def render_all(
+    specs: typing.Sequence[FigureSpec], max_workers: int | None = None
+) -> RenderResult:
+    stale: list[tuple[FigureSpec, str]] = []
+    skipped: list[pathlib.Path] = []
+    for spec in specs:
+        digest = spec.digest()
+        if spec.is_up_to_date(digest):
+            skipped.append(spec.outfile)
+        else:
+            stale.append((spec, digest))
+
+    if len(stale) <= 1:
+        # Not worth starting worker processes
+        for spec, digest in stale:
+            render(spec, digest)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_use_headless_backend
+        ) as executor:
+            futures = [executor.submit(render, spec, digest) for spec, digest in stale]
+            for future in futures:
+                future.result()
+
+    return RenderResult([spec.outfile for spec, _ in stale], skipped)
+
+
+def render(spec: FigureSpec, digest: str | None = None) -> None:
+    _use_headless_backend()
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=FIGURE_SIZE)
+    try:
+        RENDERERS[spec.renderer](fig, spec.data, spec.options)
+        spec.outfile.parent.mkdir(parents=True, exist_ok=True)
+        partial = spec.outfile.with_name(f".{spec.outfile.name}.partial")
+        fig.savefig(partial, format=spec.outfile.suffix.lstrip(".") or "png")
+        os.replace(partial, spec.outfile)
+    finally:
+        plt.close(fig)
+    spec.hash_file.write_text(spec.digest() if digest is None else digest)
+
+
+def _use_headless_backend() -> None:
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+## Renderers
+Renderer: typing.TypeAlias = typing.Callable[
+    ["Figure", dict[str, np.ndarray], dict[str, typing.Any]], None
+]
+
+
+def predictions_vs_actual(
+    fig: "Figure", data: dict[str, np.ndarray], options: dict[str, typing.Any]
+) -> None:
+    """
+    Predicted energy production, one series per (forecast distance, model version), and actual.
+    Data: as `accuracy.PredictionsWithActuals`.
+    """
+    from matplotlib.ticker import MultipleLocator
+
+    ax = fig.subplots()
+    dates = data["prediction_for_date"]
+    series = sorted(
+        set(zip(data["forecast_distance"].tolist(), data["model_version"].tolist()))
+    )
+    for forecast_distance, model_version in series:
+        mask = (data["forecast_distance"] == forecast_distance) & (
+            data["model_version"] == model_version
+        )
+        ax.scatter(
+            dates[mask],
+            data["energy_production"][mask],
+            label=f"{forecast_distance} day prediction (model v{model_version})",
+        )
+
+    actual_dates, first = np.unique(dates, return_index=True)
+    ax.scatter(
+        actual_dates,
+        data["actual_energy_production"][first],
+        c="#000000",
+        marker="*",
+        label="Actual",
+    )
+
+    fig.autofmt_xdate()
+    ax.xaxis.set_major_locator(MultipleLocator(1))
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Wh")
+    if "title" in options:
+        ax.set_title(options["title"])
+    ax.legend(loc="upper left")
+
+
+def training_dimension(
+    fig: "Figure", data: dict[str, np.ndarray], options: dict[str, typing.Any]
+) -> None:
+    """
+    Energy production and one training data dimension, by date.
+    Data: `date`, `energy_production`, `dimension`; options: `dimension` (its name).
+    """
+    import matplotlib.dates as mdates
+
+    dimension = options["dimension"]
+    ax = fig.subplots(2, 1)
+    for axis, values, style, ylabel in (
+        (ax[0], data["energy_production"], "bo", "Energy production"),
+        (ax[1], data["dimension"], "go", dimension),
+    ):
+        axis.plot(data["date"], values, style)
+        axis.set(
+            xlabel="Date",
+            ylabel=ylabel,
+            title=f"{ylabel.capitalize()} by date",
+        )
+        axis.xaxis.set_major_locator(mdates.MonthLocator(interval=4))
+        axis.xaxis.set_major_formatter(mdates.DateFormatter("%b %Y"))
+        axis.grid(True)
+
+    fig.autofmt_xdate()
+
+
+RENDERERS: dict[str, Renderer] = {
+    "predictions_vs_actual": predictions_vs_actual,
+    "training_dimension": training_dimension,
+}
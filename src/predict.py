@@ -1,16 +1,23 @@
 import dataclasses
 import datetime
+import functools
 import typing
 
-from .external_data import (
-    DailyForecast,
-    HourlyForecast,
-    WeatherPrediction,
+import numpy as np
+
+from .external_data import DailyForecast
+from .feature_store import (
+    RESPONSE_VARIABLE,
+    FeatureLayout,
+    compile_feature_layout,
+    forecast_values,
+    materialize,
 )
-from .model import (
-    OBSERVATION_NAME_AND_HOUR_SEPARATOR,
-    Model,
+from .metrics import (
+    ESTIMATOR_TIME,
+    FEATURE_BUILD_TIME,
 )
+from .model import Model
 
 
 @dataclasses.dataclass
@@ -19,63 +26,142 @@ class SolarProductionPrediction:
     energy_production_Wh: float
 
 
+@dataclasses.dataclass
+class BatchPrediction:
+    """
+    Row `i` of each array corresponds to `dates[i]` (i.e., the i-th forecast passed to `predict_batch`).
+    `energy_production_Wh` is NaN wherever `sufficient` is False.
+    """
+
+    dates: list[datetime.date]
+    energy_production_Wh: np.ndarray
+    sufficient: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def predictions(self) -> typing.Iterator[SolarProductionPrediction]:
+        """Yield only the rows for which a prediction could be made."""
+        for i in np.flatnonzero(self.sufficient):
+            yield SolarProductionPrediction(
+                self.dates[i], float(self.energy_production_Wh[i])
+            )
+
+
 class InsufficientHourlyForecastError(Exception):
     pass
 
 
-def get_forecast_for_hour(daily_forecast: DailyForecast, hour: int) -> HourlyForecast:
-    forecast: typing.Iterator[HourlyForecast] = filter(
-        lambda f: f.forecast_hour.hour == hour, daily_forecast.hourly
+def feature_layout(model: Model) -> FeatureLayout:
+    return compile_feature_layout(tuple(model.fieldnames))
+
+
+@FEATURE_BUILD_TIME.timed
+def build_feature_matrix(
+    daily_forecasts: typing.Sequence[DailyForecast], layout: FeatureLayout
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Fill a (len(daily_forecasts), layout.n_features) matrix, one row per forecast day
+    (see `feature_store.materialize`). Features missing from a forecast are left as NaN;
+    the returned mask is True for complete rows.
+    """
+    rows, hour, variable, value = forecast_values(daily_forecasts)
+    months = np.array(
+        [daily_forecast.date.month for daily_forecast in daily_forecasts],
+        dtype=np.int64,
     )
-    try:
-        return next(forecast)
-    except StopIteration:
-        raise InsufficientHourlyForecastError(
-            f"Can't find forecast for hour {hour}"
-        ) from None
+    X = materialize(rows, months, hour, variable, value, layout)
+    sufficient = ~np.isnan(X).any(axis=1)
+    return X, sufficient
+
+
+def predict_batch(
+    daily_forecasts: typing.Sequence[DailyForecast], model: Model
+) -> BatchPrediction:
+    """
+    Predict solar production for many forecast days (e.g., a full 7-day forecast, or the forecasts
+    for many sites concatenated together) with a single call to the model.
+    Days for which the forecast is missing a required feature are reported through `sufficient`.
+    """
+    X, sufficient = build_feature_matrix(daily_forecasts, feature_layout(model))
+    return _predict_rows(daily_forecasts, X, sufficient, model)
 
 
-def get_weather_prediction(
-    forecast: HourlyForecast, weather_prediction_variable: str
-) -> int | float:
-    prediction: typing.Iterator[WeatherPrediction] = filter(
-        lambda p: p.type == weather_prediction_variable, forecast.predictions
+def union_feature_layout(models: typing.Sequence[Model]) -> FeatureLayout:
+    """Layout covering the features of every model; features shared between models appear once."""
+    fieldnames = dict.fromkeys(
+        fieldname for model in models for fieldname in model.fieldnames
+    )
+    return compile_feature_layout(tuple(fieldnames))
+
+
+@functools.lru_cache(maxsize=None)
+def _feature_columns(
+    union_features: tuple[str, ...], model_features: tuple[str, ...]
+) -> np.ndarray:
+    column_of = {feature: column for column, feature in enumerate(union_features)}
+    return np.array([column_of[feature] for feature in model_features], dtype=np.intp)
+
+
+def predict_models(
+    daily_forecasts: typing.Sequence[DailyForecast], models: typing.Sequence[Model]
+) -> dict[str, BatchPrediction]:
+    """
+    Predict with several models (e.g., every registered version) from the same forecast.
+    The feature matrix is built once, over the union of the models' features, and each model
+    is scored on its own columns of it. Keyed by model version.
+    """
+    union_layout = union_feature_layout(models)
+    X_union, _ = build_feature_matrix(daily_forecasts, union_layout)
+
+    predictions: dict[str, BatchPrediction] = {}
+    for model in models:
+        columns = _feature_columns(
+            union_layout.features, feature_layout(model).features
+        )
+        X = X_union[:, columns]
+        sufficient = ~np.isnan(X).any(axis=1)
+        predictions[model.version] = _predict_rows(
+            daily_forecasts, X, sufficient, model
+        )
+    return predictions
+
+
+def _predict_rows(
+    daily_forecasts: typing.Sequence[DailyForecast],
+    X: np.ndarray,
+    sufficient: np.ndarray,
+    model: Model,
+) -> BatchPrediction:
+    energy_production = np.full(len(daily_forecasts), np.nan, dtype=np.float64)
+    if sufficient.any():
+        with ESTIMATOR_TIME.time():
+            energy_production[sufficient] = model.predict(X[sufficient])
+
+    return BatchPrediction(
+        [daily_forecast.date for daily_forecast in daily_forecasts],
+        energy_production,
+        sufficient,
     )
-    try:
-        return next(prediction).value
-    except StopIteration:
-        raise InsufficientHourlyForecastError(
-            f"Can't find {weather_prediction_variable} prediction for hour {forecast.forecast_hour.hour}"
-        ) from None
 
 
 def predict(daily_forecast: DailyForecast, model: Model) -> SolarProductionPrediction:
     """
     Forecast is expected to be hourly forecast for one day.
     It may contain fewer than 24 forecast hours.
+
+    Prefer `predict_batch` when predicting for more than one day.
     """
+    layout = feature_layout(model)
+    X, sufficient = build_feature_matrix([daily_forecast], layout)
+    if not sufficient[0]:
+        missing = [layout.features[i] for i in np.flatnonzero(np.isnan(X[0]))]
+        raise InsufficientHourlyForecastError(
+            f"Missing forecast for {', '.join(missing)}"
+        )
 
-    feature_vector: list[int | float] = []
-    for field in model.fieldnames:
-        if field == "energy_production_Wh":
-            # This is the 'response variable'
-            continue
-        match field.split(OBSERVATION_NAME_AND_HOUR_SEPARATOR):
-            case ["date"]:
-                feature_vector.append(daily_forecast.date.month)
-            case ["pm25_daily_avg"]:
-                # TODO
-                pass
-            case [weather_prediction_variable, hour]:
-                weather_forecast = get_forecast_for_hour(daily_forecast, int(hour))
-                predicted_value = get_weather_prediction(
-                    weather_forecast, weather_prediction_variable
-                )
-                feature_vector.append(predicted_value)
-            case _:
-                raise ValueError()
-
-    solar_prediction = model.estimator.predict([feature_vector])
+    with ESTIMATOR_TIME.time():
+        solar_prediction = model.predict(X)
     return SolarProductionPrediction(
         date=daily_forecast.date, energy_production_Wh=solar_prediction[0]
     )
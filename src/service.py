@@ -0,0 +1,333 @@
+"""
+Long-running prediction service.
+
+Models are loaded once, at startup. Forecasts for every site are fetched in the background every
+`refresh_interval` seconds (NOAA updates point forecasts about hourly, see `FORECAST_CACHE_TTL`),
+concurrently (see `NoaaApi.get_forecast_columns_async`), and each refresh scores every model on
+every site's forecast days in a single batch (see `predict_models`). A transient error fetching a
+site's forecast is retried a bounded number of times, backing off exponentially with waits capped
+at a fraction of `refresh_interval`, so a site that keeps failing neither holds up the others nor
+runs into the next refresh. Response bodies are encoded at refresh time, so a request is a dict lookup:
+it never touches a model, NOAA, or the database.
+
+A site whose forecast can't be refreshed keeps serving its last predictions until they are older
+than `max_age`; requests for it then fail with 503 until a refresh succeeds.
+
+Endpoints:
+```
+GET /predict?site=<site_id>&date=<YYYY-MM-DD>   predictions of every model for one day
+GET /predict?site=<site_id>                     ... for every forecast day
+GET /health                                     age of each site's forecast
+GET /metrics                                    timings and counters (see `src.metrics`), if enabled
+```
+`site` defaults to `DEFAULT_SITE_ID`.
+
+See `src.bin.serve` to run.
+"""
+import asyncio
+import dataclasses
+import datetime
+import http
+import http.server
+import json
+import math
+import threading
+import time
+import typing
+import urllib.parse
+
+import tenacity
+
+from . import metrics
+from .external_data import (
+    ColumnarForecast,
+    NoaaApi,
+)
+from .external_data.noaa import FORECAST_CACHE_TTL
+from .model import Model
+from .predict import predict_models
+from .sites import DEFAULT_SITE_ID, Site
+
+DEFAULT_REFRESH_INTERVAL = FORECAST_CACHE_TTL  # seconds
+DEFAULT_MAX_AGE = 6 * 60 * 60  # seconds
+# Wait before the first retry of a site's forecast; doubles for each further retry
+FIRST_RETRY_WAIT = 2.0  # seconds
+
+
+class UnknownSiteError(Exception):
+    pass
+
+
+class StaleForecastError(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class SiteForecast:
+    """
+    Predictions made from one forecast for one site. `bodies` holds the encoded response for each
+    forecast day, and, under None, for all of them.
+    """
+
+    site_id: str
+    fetched_at: float  # seconds since the epoch
+    bodies: dict[datetime.date | None, bytes]
+
+    def age(self, now: float) -> float:
+        return now - self.fetched_at
+
+
+class PredictionService:
+    """
+    Serves predictions from the last successful refresh of each site's forecast.
+    `_forecasts` is only ever replaced as a whole (by the refresh thread), so requests read it
+    without locking. Refreshes run one at a time, each on the service's own event loop.
+    """
+
+    _noaa_api: NoaaApi
+    _models: list[Model]
+    _sites: dict[str, Site]
+    _refresh_interval: float
+    _max_age: float
+    _forecasts: dict[str, SiteForecast]
+    _loop: asyncio.AbstractEventLoop
+    _stop: threading.Event
+    _thread: threading.Thread | None
+
+    def __init__(
+        self,
+        noaa_api: NoaaApi,
+        models: typing.Sequence[Model],
+        sites: typing.Sequence[Site],
+        refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+        max_age: float = DEFAULT_MAX_AGE,
+    ) -> None:
+        self._noaa_api = noaa_api
+        self._models = list(models)
+        self._sites = {site.site_id: site for site in sites}
+        self._refresh_interval = refresh_interval
+        self._max_age = max_age
+        self._forecasts = {}
+        self._loop = asyncio.new_event_loop()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def model_versions(self) -> list[str]:
+        return [model.version for model in self._models]
+
+    def start(self) -> None:
+        """Refresh once (so the service starts warm), then keep refreshing in the background."""
+        self.refresh()
+        self._thread = threading.Thread(
+            target=self._refresh_periodically, name="forecast-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._loop.close()
+
+    def refresh(self) -> None:
+        """Fetch every site's forecast and predict from it. Sites that fail keep their last forecast."""
+        date_of_prediction = datetime.date.today()
+        fetched_at = time.time()
+        sites = list(self._sites.values())
+        fetched = self._loop.run_until_complete(self._fetch_forecasts(sites))
+
+        site_days: list[str] = []
+        daily_forecasts = []
+        for site, forecast in zip(sites, fetched):
+            if isinstance(forecast, BaseException):
+                print(
+                    f"Can't refresh forecast for site {site.site_id} because: {forecast}"
+                )
+                continue
+            site_forecasts = forecast.daily()
+            site_days.extend([site.site_id] * len(site_forecasts))
+            daily_forecasts.extend(site_forecasts)
+        if not daily_forecasts:
+            return
+
+        predictions = predict_models(daily_forecasts, self._models)
+
+        by_site: dict[str, dict[datetime.date, dict[str, float]]] = {}
+        for i, (site_id, daily_forecast) in enumerate(zip(site_days, daily_forecasts)):
+            by_model = by_site.setdefault(site_id, {}).setdefault(
+                daily_forecast.date, {}
+            )
+            for model_version, batch in predictions.items():
+                energy_production = float(batch.energy_production_Wh[i])
+                if not math.isnan(energy_production):
+                    by_model[model_version] = energy_production
+
+        forecasts = dict(self._forecasts)
+        for site_id, by_date in by_site.items():
+            forecasts[site_id] = _site_forecast(
+                site_id, fetched_at, date_of_prediction, by_date
+            )
+        self._forecasts = forecasts
+        print(
+            f"Refreshed forecasts for {len(by_site)} of {len(self._sites)} sites ({len(daily_forecasts)} days)"
+        )
+
+    def lookup(self, site_id: str, date: datetime.date | None) -> bytes:
+        """
+        Encoded predictions for `date` (or every forecast day, if None). Raises `UnknownSiteError`,
+        `StaleForecastError`, or `KeyError` if `date` isn't in the forecast.
+        """
+        if site_id not in self._sites:
+            raise UnknownSiteError(f"Unknown site {site_id}")
+        forecast = self._forecasts.get(site_id)
+        if forecast is None:
+            raise StaleForecastError(f"No forecast for site {site_id} yet")
+        age = forecast.age(time.time())
+        if age > self._max_age:
+            raise StaleForecastError(
+                f"Forecast for site {site_id} is {age:.0f} seconds old"
+            )
+        try:
+            return forecast.bodies[date]
+        except KeyError:
+            raise KeyError(f"No forecast for site {site_id} on {date}") from None
+
+    def health(self) -> dict[str, typing.Any]:
+        now = time.time()
+        sites = {}
+        for site_id in self._sites:
+            forecast = self._forecasts.get(site_id)
+            sites[site_id] = (
+                {
+                    "forecast_fetched_at": _isoformat(forecast.fetched_at),
+                    "age_seconds": round(forecast.age(now)),
+                    "stale": forecast.age(now) > self._max_age,
+                }
+                if forecast is not None
+                else {"forecast_fetched_at": None, "age_seconds": None, "stale": True}
+            )
+        return {"models": self.model_versions, "sites": sites}
+
+    async def _fetch_forecasts(
+        self, sites: list[Site]
+    ) -> list[ColumnarForecast | BaseException]:
+        # With 3 attempts per site there are 2 waits, each at most a quarter of the interval
+        retry_wait = tenacity.wait_exponential(
+            multiplier=FIRST_RETRY_WAIT, max=self._refresh_interval / 4
+        )
+        return await asyncio.gather(
+            *(
+                self._noaa_api.get_forecast_columns_async(site.latlong, retry_wait)
+                for site in sites
+            ),
+            return_exceptions=True,
+        )
+
+    def _refresh_periodically(self) -> None:
+        while not self._stop.wait(self._refresh_interval):
+            try:
+                self.refresh()
+            except Exception as exc:
+                print(f"Forecast refresh failed: {exc}")
+
+
+class PredictionServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+    service: PredictionService
+
+    def __init__(
+        self, server_address: tuple[str, int], service: PredictionService
+    ) -> None:
+        super().__init__(server_address, PredictionRequestHandler)
+        self.service = service
+
+
+class PredictionRequestHandler(http.server.BaseHTTPRequestHandler):
+    # Keep connections open between requests (e.g., from a dashboard polling the service)
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/predict":
+            self._predict(urllib.parse.parse_qs(url.query))
+        elif url.path == "/health":
+            service = typing.cast(PredictionServer, self.server).service
+            self._send(http.HTTPStatus.OK, json.dumps(service.health()).encode("utf-8"))
+        elif url.path == "/metrics" and metrics.enabled():
+            self._send(
+                http.HTTPStatus.OK,
+                metrics.prometheus_text().encode("utf-8"),
+                "text/plain; version=0.0.4",
+            )
+        else:
+            self._send_error(http.HTTPStatus.NOT_FOUND, f"No such endpoint {url.path}")
+
+    def _predict(self, query: dict[str, list[str]]) -> None:
+        site_id = query.get("site", [DEFAULT_SITE_ID])[0]
+        date = None
+        if "date" in query:
+            try:
+                date = datetime.date.fromisoformat(query["date"][0])
+            except ValueError:
+                self._send_error(
+                    http.HTTPStatus.BAD_REQUEST,
+                    f"date must be YYYY-MM-DD, got {query['date'][0]}",
+                )
+                return
+
+        service = typing.cast(PredictionServer, self.server).service
+        try:
+            body = service.lookup(site_id, date)
+        except UnknownSiteError as exc:
+            self._send_error(http.HTTPStatus.NOT_FOUND, str(exc))
+        except StaleForecastError as exc:
+            self._send_error(http.HTTPStatus.SERVICE_UNAVAILABLE, str(exc))
+        except KeyError as exc:
+            self._send_error(http.HTTPStatus.NOT_FOUND, exc.args[0])
+        else:
+            self._send(http.HTTPStatus.OK, body)
+
+    def _send_error(self, status: http.HTTPStatus, message: str) -> None:
+        self._send(status, json.dumps({"error": message}).encode("utf-8"))
+
+    def _send(
+        self,
+        status: http.HTTPStatus,
+        body: bytes,
+        content_type: str = "application/json",
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _site_forecast(
+    site_id: str,
+    fetched_at: float,
+    date_of_prediction: datetime.date,
+    by_date: dict[datetime.date, dict[str, float]],
+) -> SiteForecast:
+    days = [
+        {"date": date.isoformat(), "energy_production_Wh": by_model}
+        for date, by_model in by_date.items()
+    ]
+    common = {
+        "site_id": site_id,
+        "date_of_prediction": date_of_prediction.isoformat(),
+        "forecast_fetched_at": _isoformat(fetched_at),
+    }
+    bodies: dict[datetime.date | None, bytes] = {
+        date: json.dumps({**common, **day}).encode("utf-8")
+        for date, day in zip(by_date, days)
+    }
+    bodies[None] = json.dumps({**common, "predictions": days}).encode("utf-8")
+    return SiteForecast(site_id, fetched_at, bodies)
+
+
+def _isoformat(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(
+        timestamp, tz=datetime.timezone.utc
+    ).isoformat(timespec="seconds")
@@ -0,0 +1,49 @@
+"""
+Installations to make predictions for.
+
+A site list is a CSV file with a header row and one row per site, e.g.:
+```
+site_id,lat,lon
+home,47.543737,-122.367417
+```
+"""
+import csv
+import dataclasses
+import pathlib
+
+# Site used when no site list is given (i.e., the location configured in `.env`)
+DEFAULT_SITE_ID = "default"
+
+FIELDNAME_SITE_ID = "site_id"
+FIELDNAME_LAT = "lat"
+FIELDNAME_LON = "lon"
+
+
+@dataclasses.dataclass(frozen=True)
+class Site:
+    site_id: str
+    lat: float
+    lon: float
+
+    @property
+    def latlong(self) -> tuple[float, float]:
+        return (self.lat, self.lon)
+
+
+def load_sites(site_list: pathlib.Path) -> list[Site]:
+    sites: list[Site] = []
+    with open(site_list, mode="r", newline="") as fd:
+        reader = csv.DictReader(fd)
+        for row in reader:
+            sites.append(
+                Site(
+                    row[FIELDNAME_SITE_ID].strip(),
+                    float(row[FIELDNAME_LAT]),
+                    float(row[FIELDNAME_LON]),
+                )
+            )
+
+    site_ids = [site.site_id for site in sites]
+    if len(set(site_ids)) != len(site_ids):
+        raise ValueError(f"Duplicate site_id in {site_list}")
+    return sites
@@ -0,0 +1,83 @@
+"""
+`AsyncHttpClient` against an HTTP server on localhost.
+"""
+import asyncio
+import http
+import http.server
+import json
+import threading
+import typing
+import urllib.error
+
+import pytest
+
+from src.external_data.async_http_client import (
+    AsyncHttpClient,
+)
+
+BODY = json.dumps({"ok": True}).encode()
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path == "/unavailable":
+            self.send_response(http.HTTPStatus.SERVICE_UNAVAILABLE)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> typing.Iterator[_Server]:
+    server = _Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_requests_waiting_to_retry_dont_hold_the_hosts_connection(
+    server: _Server,
+) -> None:
+    client = AsyncHttpClient(max_connections_per_host=1)
+    finished: list[str] = []
+
+    async def get(path: str) -> None:
+        try:
+            await client.get_json(server.url(path), retry_wait=lambda _exc: 0.5)
+        except urllib.error.HTTPError:
+            pass
+        finished.append(path)
+
+    async def main() -> None:
+        retried = asyncio.create_task(get("/unavailable"))
+        # Let the first request take the connection and fail, then start backing off
+        await asyncio.sleep(0.2)
+        await get("/ok")
+        await retried
+
+    try:
+        asyncio.run(main())
+    finally:
+        client.close()
+
+    assert finished == ["/ok", "/unavailable"]
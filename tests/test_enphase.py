@@ -0,0 +1,52 @@
+"""
+`Enphase` against canned API responses.
+"""
+import datetime
+import typing
+
+from src.env import Env
+from src.external_data.enphase import Enphase
+from src.external_data.http_client import (
+    HttpClient,
+)
+
+ENV = Env(
+    {Env.ENV_VAR_ENPHASE_API_KEY: "key", Env.ENV_VAR_ENPHASE_SYSTEM_ID: "1"},
+    {"ENPHASE_ACCESS_TOKEN": "access", "ENPHASE_REFRESH_TOKEN": "refresh"},
+)
+
+
+class _CannedHttpClient(HttpClient):
+    response: typing.Any
+
+    def __init__(self, response: typing.Any) -> None:
+        super().__init__()
+        self.response = response
+
+    def get_json(self, url: str, *args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+        return self.response
+
+
+def test_production_is_dated_from_the_returned_start_date() -> None:
+    # The system only became active on the 3rd, so the response starts then
+    enphase = Enphase(
+        _CannedHttpClient({"start_date": "2023-01-03", "production": [30, 40]}), ENV
+    )
+
+    assert enphase.energy_produced_between(
+        datetime.date(2023, 1, 1), datetime.date(2023, 1, 4)
+    ) == [(datetime.date(2023, 1, 3), 30), (datetime.date(2023, 1, 4), 40)]
+
+
+def test_production_outside_the_requested_dates_is_omitted() -> None:
+    enphase = Enphase(
+        _CannedHttpClient(
+            {"start_date": "2023-01-01", "production": [10, 20, 30, 40, 50]}
+        ),
+        ENV,
+    )
+
+    assert enphase.energy_produced_between(
+        datetime.date(2023, 1, 2), datetime.date(2023, 1, 3)
+    ) == [(datetime.date(2023, 1, 2), 20), (datetime.date(2023, 1, 3), 30)]
+    assert enphase.energy_produced_on_date(datetime.date(2023, 1, 4)) == 40
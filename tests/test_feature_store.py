@@ -0,0 +1,94 @@
+import datetime
+import os
+import pathlib
+
+import numpy as np
+import pytest
+
+from src.external_data.visual_crossing import (
+    OBSERVATIONS_SETTLED_AFTER,
+)
+from src.feature_store import (
+    FeatureStore,
+    HourlyFeatures,
+    Source,
+    month_end,
+)
+from src.model.data.constants import WEATHER_DIMS
+
+MONTH = datetime.date(2023, 1, 1)
+
+
+@pytest.mark.parametrize(
+    "written_after_month_end, complete",
+    [
+        (datetime.timedelta(days=1), False),
+        (OBSERVATIONS_SETTLED_AFTER, False),
+        (OBSERVATIONS_SETTLED_AFTER + datetime.timedelta(days=1), True),
+    ],
+)
+def test_months_are_complete_once_observations_settled(
+    tmp_path: pathlib.Path, written_after_month_end: datetime.timedelta, complete: bool
+) -> None:
+    store = FeatureStore(tmp_path)
+    assert not store.is_complete(Source.OBSERVED, "site", MONTH)
+
+    partition = store.partition_path(Source.OBSERVED, "site", MONTH)
+    partition.parent.mkdir(parents=True)
+    partition.touch()
+    written = datetime.datetime.combine(
+        month_end(MONTH) + written_after_month_end, datetime.time(12)
+    ).timestamp()
+    os.utime(partition, (written, written))
+
+    assert store.is_complete(Source.OBSERVED, "site", MONTH) == complete
+
+
+def observations(days: int, start: str = "2023-01-30") -> HourlyFeatures:
+    timestamps = np.datetime64(f"{start}T00") + np.arange(days * 24).astype(
+        "timedelta64[h]"
+    )
+    rng = np.random.default_rng(0)
+    columns = {name: rng.normal(size=len(timestamps)) for name in WEATHER_DIMS}
+    # A missing value, which isn't stored
+    columns["temp"][3] = np.nan
+    return HourlyFeatures.from_observations(timestamps, columns)
+
+
+def test_written_values_are_read_back(tmp_path: pathlib.Path) -> None:
+    store = FeatureStore(tmp_path)
+    features = observations(5)
+    assert store.write(Source.OBSERVED, "site", features) == len(features)
+    # Spans January and February
+    assert (
+        len(store.partitions(Source.OBSERVED, "site", MONTH, MONTH.replace(month=2)))
+        == 2
+    )
+
+    read = store.read(
+        Source.OBSERVED, "site", datetime.date(2023, 1, 1), datetime.date(2023, 2, 28)
+    )
+    assert len(read) == len(features) == 5 * 24 * len(WEATHER_DIMS) - 1
+    order = np.lexsort([features.variable.astype(str), features.hour, features.date])
+    for column in ("date_of_prediction", "date", "hour", "variable"):
+        np.testing.assert_array_equal(
+            getattr(read, column), getattr(features, column)[order]
+        )
+    np.testing.assert_array_equal(read.value, features.value[order])
+
+
+def test_written_values_replace_stored_ones(tmp_path: pathlib.Path) -> None:
+    store = FeatureStore(tmp_path)
+    store.write(Source.OBSERVED, "site", observations(2))
+    revised = observations(1)
+    revised.value[:] = 0.0
+    store.write(Source.OBSERVED, "site", revised)
+
+    read = store.read(
+        Source.OBSERVED, "site", datetime.date(2023, 1, 30), datetime.date(2023, 1, 31)
+    )
+    assert len(read) == 2 * 24 * len(WEATHER_DIMS) - 1
+    np.testing.assert_array_equal(
+        read.value[read.date == np.datetime64("2023-01-30")], 0.0
+    )
+    assert (read.value[read.date == np.datetime64("2023-01-31")] != 0.0).all()
@@ -0,0 +1,121 @@
+import datetime
+
+import duckdb
+import numpy as np
+import pytest
+
+from src.external_data.noaa import (
+    ColumnarForecast,
+)
+from src.feature_store import (
+    HourlyFeatures,
+    compile_feature_layout,
+    feature_matrix,
+)
+from src.model.data.create_training_set import (
+    weather_feature_columns,
+)
+from src.persistence import (
+    ForecastFeatureBatch,
+    PredictionBatch,
+    migrate,
+    replay_features,
+    write_forecast_features,
+    write_predictions,
+)
+
+# Not the default site, so that nothing archived for it is replayed
+SITE_ID = "test-site"
+DATE_OF_PREDICTION = datetime.date(2030, 1, 1)
+FIELDNAMES = ["date", *weather_feature_columns(), "energy_production_Wh"]
+
+
+@pytest.fixture
+def db_con() -> duckdb.DuckDBPyConnection:
+    db_con = duckdb.connect()
+    migrate(db_con)
+    return db_con
+
+
+def forecast(days: int) -> ColumnarForecast:
+    start = datetime.datetime.combine(
+        DATE_OF_PREDICTION + datetime.timedelta(days=1), datetime.time()
+    )
+    forecast = ColumnarForecast.from_datetimes(
+        [start + datetime.timedelta(hours=hour) for hour in range(days * 24)]
+    )
+    rng = np.random.default_rng(0)
+    for column in forecast.columns.values():
+        column[:] = rng.uniform(0, 100, size=len(column))
+    # The second day is missing a value, so it can't be predicted from
+    forecast.columns["temp"][24 + 12] = np.nan
+    return forecast
+
+
+def test_written_features_are_replayed(db_con: duckdb.DuckDBPyConnection) -> None:
+    daily_forecasts = forecast(3).daily()
+    batch = ForecastFeatureBatch.from_daily_forecasts(
+        daily_forecasts, DATE_OF_PREDICTION, SITE_ID
+    )
+    assert write_forecast_features(db_con, batch) == len(batch)
+    # Already persisted
+    assert write_forecast_features(db_con, batch) == 0
+
+    dates = np.array([day.date for day in daily_forecasts], dtype="datetime64[D]")
+    write_predictions(
+        db_con,
+        PredictionBatch(
+            site_id=np.full(3, SITE_ID, dtype=object),
+            prediction_for_date=dates,
+            date_of_prediction=np.full(3, DATE_OF_PREDICTION, dtype="datetime64[D]"),
+            model_version=np.full(3, "test", dtype=object),
+            energy_production=np.array([1.0, 2.0, 3.0]),
+        ),
+    )
+    db_con.execute(
+        "UPDATE predictions SET actual_energy_production = energy_production * 10 WHERE site_id = ?",
+        [SITE_ID],
+    )
+
+    replayed = replay_features(
+        db_con,
+        FIELDNAMES,
+        daily_forecasts[0].date,
+        daily_forecasts[-1].date,
+        days_ahead=None,
+        site_id=SITE_ID,
+    )
+    expected = feature_matrix(
+        HourlyFeatures.from_daily_forecasts(daily_forecasts, DATE_OF_PREDICTION),
+        compile_feature_layout(tuple(FIELDNAMES)),
+    )
+    np.testing.assert_array_equal(replayed.prediction_for_date, dates)
+    np.testing.assert_array_equal(
+        replayed.date_of_prediction, np.full(3, DATE_OF_PREDICTION, "datetime64[D]")
+    )
+    np.testing.assert_array_equal(replayed.X, expected.X)
+    np.testing.assert_array_equal(replayed.sufficient, [True, False, True])
+    np.testing.assert_array_equal(replayed.actual_energy_production, [10.0, 20.0, 30.0])
+
+
+def test_replay_by_days_ahead(db_con: duckdb.DuckDBPyConnection) -> None:
+    daily_forecasts = forecast(3).daily()
+    write_forecast_features(
+        db_con,
+        ForecastFeatureBatch.from_daily_forecasts(
+            daily_forecasts, DATE_OF_PREDICTION, SITE_ID
+        ),
+    )
+
+    replayed = replay_features(
+        db_con,
+        FIELDNAMES,
+        daily_forecasts[0].date,
+        daily_forecasts[-1].date,
+        days_ahead=2,
+        site_id=SITE_ID,
+    )
+    np.testing.assert_array_equal(
+        replayed.prediction_for_date, [np.datetime64(daily_forecasts[1].date, "D")]
+    )
+    assert np.isnan(replayed.actual_energy_production).all()
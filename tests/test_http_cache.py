@@ -0,0 +1,275 @@
+"""
+`HttpClient` with a `ResponseCache`, against an HTTP server on localhost.
+"""
+import http
+import http.server
+import json
+import pathlib
+import threading
+import time
+import typing
+
+import pytest
+
+from src.external_data.http_cache import (
+    ResponseCache,
+)
+from src.external_data.http_client import (
+    HttpClient,
+)
+from src.external_data.rate_limit import (
+    SlidingWindowLimiter,
+)
+
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 18 Jan 2023 00:00:00 GMT"
+
+BODIES = {
+    "/etag": json.dumps({"validated_by": "etag", "padding": "x" * 100}).encode(),
+    "/last-modified": json.dumps({"validated_by": "last-modified"}).encode(),
+    "/unvalidated": json.dumps({"validated_by": None}).encode(),
+}
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    # (path, status) of every request served
+    served: list[tuple[str, int]]
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.served = []
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def statuses(self, path: str) -> list[int]:
+        return [status for served, status in self.served if served == path]
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        server = typing.cast(_Server, self.server)
+        body = BODIES[self.path]
+        headers = {}
+        if self.path == "/etag":
+            headers["ETag"] = ETAG
+        elif self.path == "/last-modified":
+            headers["Last-Modified"] = LAST_MODIFIED
+
+        not_modified = (
+            "ETag" in headers and self.headers.get("If-None-Match") == ETAG
+        ) or (
+            "Last-Modified" in headers
+            and self.headers.get("If-Modified-Since") == LAST_MODIFIED
+        )
+        status = http.HTTPStatus.NOT_MODIFIED if not_modified else http.HTTPStatus.OK
+        server.served.append((self.path, status))
+
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server() -> typing.Iterator[_Server]:
+    server = _Server()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path: pathlib.Path) -> ResponseCache:
+    return ResponseCache(tmp_path / "http")
+
+
+def test_fresh_responses_are_served_from_the_cache(
+    server: _Server, cache: ResponseCache
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url("/unvalidated")
+
+    first = client.get_json(url, cache_ttl=60)
+    second = client.get_json(url, cache_ttl=60)
+
+    assert first == second == json.loads(BODIES["/unvalidated"])
+    assert server.statuses("/unvalidated") == [http.HTTPStatus.OK]
+
+
+def test_cache_hits_are_not_rate_limited(server: _Server, cache: ResponseCache) -> None:
+    # One request an hour: a second request sent would block for the rest of the test run
+    client = HttpClient(cache=cache, rate_limiter=SlidingWindowLimiter.per_hour(1))
+    url = server.url("/unvalidated")
+
+    for _ in range(3):
+        client.get_json(url, cache_ttl=60)
+
+    assert server.statuses("/unvalidated") == [http.HTTPStatus.OK]
+
+
+def test_expired_responses_are_fetched_again(
+    server: _Server, cache: ResponseCache
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url("/unvalidated")
+
+    client.get_json(url, cache_ttl=0.1)
+    client.get_json(url, cache_ttl=0.1)
+    assert server.statuses("/unvalidated") == [http.HTTPStatus.OK]
+
+    time.sleep(0.2)
+    assert client.get_json(url, cache_ttl=0.1) == json.loads(BODIES["/unvalidated"])
+    assert server.statuses("/unvalidated") == [http.HTTPStatus.OK] * 2
+
+
+def test_responses_are_not_cached_without_a_ttl(
+    server: _Server, cache: ResponseCache
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url("/unvalidated")
+
+    client.get_json(url)
+    client.get_json(url)
+
+    assert server.statuses("/unvalidated") == [http.HTTPStatus.OK] * 2
+    assert cache.get(ResponseCache.key("GET", url)) is None
+
+
+@pytest.mark.parametrize("path", ["/etag", "/last-modified"])
+def test_stale_responses_are_revalidated(
+    server: _Server, cache: ResponseCache, path: str
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url(path)
+    key = ResponseCache.key("GET", url)
+
+    client.get_json(url, cache_ttl=0)
+    stale = typing.cast(tuple, cache.get(key))[0]
+
+    # Stale, so a conditional request is sent; the server answers 304 Not Modified
+    assert client.get_json(url, cache_ttl=60) == json.loads(BODIES[path])
+    assert server.statuses(path) == [
+        http.HTTPStatus.OK,
+        http.HTTPStatus.NOT_MODIFIED,
+    ]
+    revalidated = typing.cast(tuple, cache.get(key))[0]
+    assert revalidated.stored_at > stale.stored_at
+    assert revalidated.ttl == 60
+
+    # Fresh again, so served from the cache without a request
+    client.get_json(url, cache_ttl=60)
+    assert len(server.statuses(path)) == 2
+
+
+def test_streamed_responses_are_revalidated(
+    server: _Server, cache: ResponseCache
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url("/etag")
+
+    client.get_streaming(url, lambda body: body.read(), cache_ttl=0)
+    body = client.get_streaming(url, lambda body: body.read(), cache_ttl=0)
+
+    assert body == BODIES["/etag"]
+    assert server.statuses("/etag") == [
+        http.HTTPStatus.OK,
+        http.HTTPStatus.NOT_MODIFIED,
+    ]
+
+
+def test_partially_read_streamed_responses_are_cached_whole(
+    server: _Server, cache: ResponseCache
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url("/etag")
+
+    assert client.get_streaming(url, lambda body: body.read(5), cache_ttl=60) == (
+        BODIES["/etag"][:5]
+    )
+    assert client.get_streaming(url, lambda body: body.read(), cache_ttl=60) == (
+        BODIES["/etag"]
+    )
+    assert server.statuses("/etag") == [http.HTTPStatus.OK]
+
+
+def test_streamed_responses_are_not_cached_if_consume_fails(
+    server: _Server, cache: ResponseCache
+) -> None:
+    client = HttpClient(cache=cache)
+    url = server.url("/etag")
+
+    def consume(body: typing.BinaryIO) -> bytes:
+        body.read(5)
+        raise RuntimeError("can't parse")
+
+    with pytest.raises(RuntimeError):
+        client.get_streaming(url, consume, cache_ttl=60)
+
+    assert cache.get(ResponseCache.key("GET", url)) is None
+    assert not list(cache.directory.glob(".blob-*"))
+
+
+def test_least_recently_used_entries_are_evicted_first(
+    tmp_path: pathlib.Path,
+) -> None:
+    cache = ResponseCache(tmp_path / "http", max_bytes=25)
+    cache.store("a", b"a" * 10, ttl=60)
+    cache.store("b", b"b" * 10, ttl=60)
+    time.sleep(0.01)
+    assert cache.get("a") is not None
+
+    cache.store("c", b"c" * 10, ttl=60)
+
+    assert cache.get("b") is None
+    assert typing.cast(tuple, cache.get("a"))[1] == b"a" * 10
+    assert typing.cast(tuple, cache.get("c"))[1] == b"c" * 10
+    blobs = list((cache.directory / "blobs").glob("*/*"))
+    assert len(blobs) == 2
+
+
+def test_identical_bodies_are_stored_once(tmp_path: pathlib.Path) -> None:
+    cache = ResponseCache(tmp_path / "http", max_bytes=15)
+    cache.store("a", b"x" * 10, ttl=60)
+    cache.store("b", b"x" * 10, ttl=60)
+
+    # One 10-byte blob, so within `max_bytes` and nothing is evicted
+    assert cache.get("a") is not None
+    assert cache.get("b") is not None
+    assert len(list((cache.directory / "blobs").glob("*/*"))) == 1
+
+
+def test_instances_on_the_same_directory_can_write_concurrently(
+    tmp_path: pathlib.Path,
+) -> None:
+    caches = [ResponseCache(tmp_path / "http"), ResponseCache(tmp_path / "http")]
+    n_keys = 50
+
+    def store(i: int) -> None:
+        for j in range(n_keys):
+            caches[i].store(f"{i}-{j}", f"{i}-{j}".encode(), ttl=60)
+
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(len(caches))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i in range(len(caches)):
+        for j in range(n_keys):
+            entry = caches[1 - i].get(f"{i}-{j}")
+            assert entry is not None
+            assert entry[1] == f"{i}-{j}".encode()
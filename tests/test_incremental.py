@@ -0,0 +1,56 @@
+import datetime
+import pathlib
+
+import numpy as np
+
+from src.model.incremental import (
+    SufficientStatistics,
+)
+
+FIELDNAMES = ["date", "temp_10", "energy_production_Wh"]
+
+
+def rows(days: list[int], seed: int = 0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    dates = np.datetime64("2023-01-01") + np.array(days)
+    X = rng.normal(size=(len(days), 2))
+    y = X @ np.array([2.0, -1.0]) + 5.0 + rng.normal(scale=0.1, size=len(days))
+    return dates, X, y
+
+
+def test_late_rows_are_folded_in_once() -> None:
+    statistics = SufficientStatistics.empty(FIELDNAMES)
+    first = rows([0, 1, 3, 4])
+    assert statistics.update(*first) == 4
+    assert statistics.trained_through == datetime.date(2023, 1, 5)
+
+    # Day 2's actual arrived late; days 3 and 4 are already folded in
+    late = rows([2, 3, 4, 5], seed=1)
+    assert statistics.update(*late) == 2
+    assert statistics.update(*late) == 0
+    assert statistics.n == 6
+
+    everything = [np.concatenate([first[i], late[i][[0, 3]]]) for i in range(3)]
+    expected = SufficientStatistics.empty(FIELDNAMES)
+    expected.update(*everything)
+    np.testing.assert_allclose(statistics.AtA, expected.AtA)
+    np.testing.assert_allclose(statistics.Aty, expected.Aty)
+
+    _, X, y = everything
+    A = np.column_stack([np.ones(len(y)), X])
+    beta, *_ = np.linalg.lstsq(A, y, rcond=None)
+    coefficients = statistics.solve()
+    np.testing.assert_allclose(coefficients.intercept_, beta[0])
+    np.testing.assert_allclose(coefficients.coef_, beta[1:])
+
+
+def test_save_and_load(tmp_path: pathlib.Path) -> None:
+    statistics = SufficientStatistics.empty(FIELDNAMES)
+    statistics.update(*rows([0, 2]))
+    statistics.save(tmp_path / "statistics.npz")
+
+    loaded = SufficientStatistics.load(tmp_path / "statistics.npz")
+    assert loaded.fieldnames == FIELDNAMES
+    assert loaded.n == 2
+    np.testing.assert_array_equal(loaded.folded_dates, statistics.folded_dates)
+    assert loaded.update(*rows([1, 2])) == 1
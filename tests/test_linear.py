@@ -0,0 +1,134 @@
+import pathlib
+import typing
+
+import numpy as np
+import pytest
+from sklearn.linear_model import (
+    GammaRegressor,
+    Lasso,
+    LinearRegression,
+    PoissonRegressor,
+    Ridge,
+    TweedieRegressor,
+)
+
+from src.model.linear import (
+    LinearCoefficients,
+    is_linear,
+)
+from src.model.model_base import Model
+from src.model.registry import (
+    COEFFICIENTS_FILE,
+    save_model,
+)
+
+N_FEATURES = 4
+
+
+@pytest.fixture
+def data() -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, N_FEATURES))
+    y = X @ rng.normal(size=N_FEATURES) + 3.0 + rng.normal(scale=0.1, size=200)
+    return X, y
+
+
+def model(estimator: typing.Any) -> Model:
+    fieldnames = [f"feature_{i}" for i in range(N_FEATURES)]
+    return Model(estimator, fieldnames, 0, 0.2, "test")
+
+
+@pytest.mark.parametrize(
+    "estimator", [LinearRegression(), Ridge(alpha=1.0), Lasso(alpha=0.01)]
+)
+def test_predict_matches_estimator(
+    data: tuple[np.ndarray, np.ndarray], estimator: typing.Any
+) -> None:
+    X, y = data
+    estimator.fit(X, y)
+
+    np.testing.assert_allclose(model(estimator).predict(X), estimator.predict(X))
+    # A single sample, and a list rather than an array
+    np.testing.assert_allclose(
+        model(estimator).predict(X[:1].tolist()),
+        estimator.predict(X[:1]),
+    )
+
+
+def test_saved_coefficients_predict_like_estimator(
+    data: tuple[np.ndarray, np.ndarray], tmp_path: pathlib.Path
+) -> None:
+    X, y = data
+    estimator = LinearRegression().fit(X, y)
+    path = tmp_path / "coefficients.npy"
+    LinearCoefficients.from_estimator(estimator).save(path)
+
+    for mmap in (True, False):
+        loaded = model(LinearCoefficients.load(path, mmap=mmap))
+        np.testing.assert_allclose(loaded.predict(X), estimator.predict(X))
+
+
+@pytest.mark.parametrize(
+    "X",
+    [
+        pytest.param(np.zeros((3, N_FEATURES - 1)), id="too few features"),
+        pytest.param(np.zeros((3, N_FEATURES + 1)), id="too many features"),
+        pytest.param(np.zeros(N_FEATURES), id="1D"),
+        pytest.param(np.zeros((0, N_FEATURES)), id="empty"),
+        pytest.param(np.full((3, N_FEATURES), np.nan), id="NaN"),
+        pytest.param(np.full((3, N_FEATURES), np.inf), id="inf"),
+        pytest.param([["a"] * N_FEATURES], id="not numeric"),
+    ],
+)
+def test_invalid_features_are_rejected_like_sklearn(
+    data: tuple[np.ndarray, np.ndarray], X: typing.Any
+) -> None:
+    estimator = LinearRegression().fit(*data)
+
+    with pytest.raises(ValueError):
+        estimator.predict(X)
+    with pytest.raises(ValueError):
+        model(estimator).predict(X)
+
+
+def test_multi_output_estimators_are_not_supported(
+    data: tuple[np.ndarray, np.ndarray]
+) -> None:
+    X, y = data
+    estimator = LinearRegression().fit(X, np.column_stack([y, y]))
+
+    with pytest.raises(ValueError):
+        LinearCoefficients.from_estimator(estimator)
+
+
+@pytest.mark.parametrize(
+    "estimator",
+    [PoissonRegressor(), GammaRegressor(), TweedieRegressor(power=1.5)],
+)
+def test_generalized_linear_models_predict_through_estimator(
+    data: tuple[np.ndarray, np.ndarray],
+    estimator: typing.Any,
+    tmp_path: pathlib.Path,
+) -> None:
+    X, y = data
+    # GLMs with a log link need a positive response
+    estimator.fit(X, np.exp(y / 10))
+    assert not is_linear(estimator)
+
+    predicted = model(estimator).predict(X)
+    np.testing.assert_allclose(predicted, estimator.predict(X))
+    # Not what evaluating the linear predictor directly gives
+    assert not np.allclose(predicted, X @ estimator.coef_ + estimator.intercept_)
+
+    save_model(model(estimator), tmp_path)
+    assert not (tmp_path / COEFFICIENTS_FILE).exists()
+
+
+def test_multi_output_linear_models_predict_through_estimator(
+    data: tuple[np.ndarray, np.ndarray]
+) -> None:
+    X, y = data
+    estimator = LinearRegression().fit(X, np.column_stack([y, 2 * y]))
+    assert not is_linear(estimator)
+
+    np.testing.assert_allclose(model(estimator).predict(X), estimator.predict(X))
@@ -0,0 +1,102 @@
+"""
+`migrate` on in-memory databases: fresh, unversioned (from before migrations were versioned),
+and already up to date.
+"""
+import dataclasses
+import datetime
+
+import duckdb
+import pytest
+
+from src.persistence import (
+    MigrationError,
+    migrate,
+    schema_version,
+)
+from src.persistence.ddl import (
+    CREATE_PREDICTIONS_TABLE,
+    SWAP_ACCURACY_FOR_ACTUAL_WATTAGE,
+)
+from src.persistence.migrations import (
+    MIGRATIONS,
+    applied_migrations,
+    has_column,
+    has_table,
+)
+
+
+@pytest.fixture
+def db_con() -> duckdb.DuckDBPyConnection:
+    return duckdb.connect()
+
+
+def test_fresh_database_gets_every_migration(
+    db_con: duckdb.DuckDBPyConnection,
+) -> None:
+    applied = migrate(db_con)
+
+    assert applied == list(MIGRATIONS)
+    assert schema_version(db_con) == len(MIGRATIONS)
+    assert applied_migrations(db_con) == {
+        migration.version: migration.checksum for migration in MIGRATIONS
+    }
+    assert has_column(db_con, "predictions", "site_id")
+    assert has_column(db_con, "forecast_features", "site_id")
+    assert has_table(db_con, "pipeline_runs")
+
+
+def test_baseline_database_is_adopted_and_upgraded(
+    db_con: duckdb.DuckDBPyConnection,
+) -> None:
+    # The schema `src.persistence.ddl.run` set up before migrations were versioned
+    db_con.execute(CREATE_PREDICTIONS_TABLE)
+    db_con.execute(SWAP_ACCURACY_FOR_ACTUAL_WATTAGE)
+    db_con.execute(
+        "INSERT INTO predictions VALUES (?, ?, ?, ?, ?);",
+        [datetime.date(2023, 1, 2), datetime.date(2023, 1, 1), "2022-12-30", 1.5, 2.5],
+    )
+
+    applied = migrate(db_con)
+
+    # The two statements the database already has are recorded, not run again
+    assert [migration.version for migration in applied] == [3, 4, 5, 6]
+    assert set(applied_migrations(db_con) or {}) == {1, 2, 3, 4, 5, 6}
+    assert db_con.execute(
+        "SELECT site_id, energy_production, actual_energy_production FROM predictions;"
+    ).fetchall() == [("default", 1.5, 2.5)]
+
+
+def test_migrating_twice_applies_nothing_the_second_time(
+    db_con: duckdb.DuckDBPyConnection,
+) -> None:
+    migrate(db_con)
+    applied_at = db_con.execute(
+        "SELECT version, applied_at FROM schema_migrations ORDER BY version;"
+    ).fetchall()
+
+    assert migrate(db_con) == []
+    assert (
+        db_con.execute(
+            "SELECT version, applied_at FROM schema_migrations ORDER BY version;"
+        ).fetchall()
+        == applied_at
+    )
+
+
+def test_changed_migration_is_an_error(db_con: duckdb.DuckDBPyConnection) -> None:
+    migrate(db_con)
+    changed = dataclasses.replace(
+        MIGRATIONS[0], sql=MIGRATIONS[0].sql.replace("TBD", "To be determined")
+    )
+
+    with pytest.raises(MigrationError, match="has changed"):
+        migrate(db_con, (changed, *MIGRATIONS[1:]))
+
+
+def test_database_newer_than_the_code_is_an_error(
+    db_con: duckdb.DuckDBPyConnection,
+) -> None:
+    migrate(db_con)
+
+    with pytest.raises(MigrationError, match="newer than this code"):
+        migrate(db_con, MIGRATIONS[:-1])
@@ -0,0 +1,126 @@
+"""
+`parse_dwml`, against a tree-based parse of the same document.
+"""
+import datetime
+import io
+
+from lxml import etree
+import numpy as np
+
+from src.external_data.noaa import (
+    DIMS,
+    parse_dwml,
+)
+
+# Trimmed-down digital DWML: the hourly time layout comes first, followed by a 12-hourly one
+# that only the probability of precipitation uses. The hourly temperature is missing (nil)
+# for the third hour, and the forecast crosses midnight.
+DWML = b"""\
+<?xml version="1.0" encoding="UTF-8"?>
+<dwml version="1.0" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+  <head><product><title>NOAA's National Weather Service Forecast Data</title></product></head>
+  <data>
+    <location><location-key>point1</location-key><point latitude="39.74" longitude="-104.99"/></location>
+    <time-layout time-coordinate="local" summarization="none">
+      <layout-key>k-p1h-n4-1</layout-key>
+      <start-valid-time>2023-01-18T22:00:00-07:00</start-valid-time>
+      <end-valid-time>2023-01-18T23:00:00-07:00</end-valid-time>
+      <start-valid-time>2023-01-18T23:00:00-07:00</start-valid-time>
+      <end-valid-time>2023-01-19T00:00:00-07:00</end-valid-time>
+      <start-valid-time>2023-01-19T00:00:00-07:00</start-valid-time>
+      <end-valid-time>2023-01-19T01:00:00-07:00</end-valid-time>
+      <start-valid-time>2023-01-19T01:00:00-07:00</start-valid-time>
+      <end-valid-time>2023-01-19T02:00:00-07:00</end-valid-time>
+    </time-layout>
+    <time-layout time-coordinate="local" summarization="12hourly">
+      <layout-key>k-p12h-n2-2</layout-key>
+      <start-valid-time>2023-01-18T18:00:00-07:00</start-valid-time>
+      <end-valid-time>2023-01-19T06:00:00-07:00</end-valid-time>
+      <start-valid-time>2023-01-19T06:00:00-07:00</start-valid-time>
+      <end-valid-time>2023-01-19T18:00:00-07:00</end-valid-time>
+    </time-layout>
+    <parameters applicable-location="point1">
+      <temperature type="dew point" units="Fahrenheit" time-layout="k-p1h-n4-1">
+        <value>10</value><value>11</value><value>12</value><value>13</value>
+      </temperature>
+      <temperature type="hourly" units="Fahrenheit" time-layout="k-p1h-n4-1">
+        <value>30</value><value>29</value><value xsi:nil="true"/><value>27</value>
+      </temperature>
+      <probability-of-precipitation type="floating" units="percent" time-layout="k-p12h-n2-2">
+        <value>10</value><value>20</value>
+      </probability-of-precipitation>
+      <cloud-amount type="total" units="percent" time-layout="k-p1h-n4-1">
+        <value>0</value><value>25</value><value>50</value><value>75</value>
+      </cloud-amount>
+      <humidity type="relative" units="percent" time-layout="k-p1h-n4-1">
+        <value>60</value><value>61</value><value>62</value><value>63</value>
+      </humidity>
+    </parameters>
+  </data>
+</dwml>
+"""
+
+
+def tree_parse(
+    document: bytes,
+) -> tuple[list[datetime.datetime], dict[str, np.ndarray]]:
+    """
+    The forecast hours and columns, read from the whole document tree as `NoaaApi` used to.
+    Unlike that parse, which skipped missing values (shifting the values after them onto the
+    wrong hours), missing values are kept in place as NaN.
+    """
+    root = etree.fromstring(document)
+    time_layout = root.find("./data/time-layout")
+    forecast_hours = [
+        datetime.datetime.fromisoformat(element.text)
+        for element in time_layout.iter("start-valid-time")
+    ]
+
+    parameters = root.find("./data/parameters")
+    columns: dict[str, np.ndarray] = {}
+    for name, el_tag, el_type, formatter in DIMS:
+        xpath_expression = f"//{el_tag}"
+        if el_type is not None:
+            xpath_expression = f'{xpath_expression}[@type="{el_type}"]'
+        parameter = parameters.xpath(xpath_expression)[0]
+        columns[name] = np.array(
+            [
+                np.nan if value.text is None else formatter(value.text)
+                for value in parameter.iter("value")
+            ],
+            dtype=np.float64,
+        )
+    return forecast_hours, columns
+
+
+def test_parse_dwml_matches_a_tree_based_parse() -> None:
+    forecast = parse_dwml(io.BytesIO(DWML))
+    forecast_hours, columns = tree_parse(DWML)
+
+    assert [timestamp.item() for timestamp in forecast.timestamps] == [
+        forecast_hour.replace(tzinfo=None) for forecast_hour in forecast_hours
+    ]
+    assert forecast.utc_offsets.tolist() == [-7 * 60] * len(forecast_hours)
+    assert forecast.columns.keys() == columns.keys()
+    for name, column in columns.items():
+        np.testing.assert_array_equal(forecast.columns[name], column)
+
+
+def test_parse_dwml_keeps_missing_values_in_place() -> None:
+    forecast = parse_dwml(io.BytesIO(DWML))
+
+    np.testing.assert_array_equal(forecast.columns["temp"], [30, 29, np.nan, 27])
+    hourly = [daily.hourly for daily in forecast.daily()]
+    assert [len(hours) for hours in hourly] == [2, 2]
+    # The hour with the missing temperature has only the other predictions
+    assert [prediction.type for prediction in hourly[1][0].predictions] == [
+        "cloudcover",
+        "humidity",
+    ]
+
+
+def test_parse_dwml_groups_hours_by_local_date() -> None:
+    forecast = parse_dwml(io.BytesIO(DWML))
+
+    assert forecast.dates() == [datetime.date(2023, 1, 18), datetime.date(2023, 1, 19)]
+    assert [daily.date for daily in forecast.daily()] == forecast.dates()
@@ -0,0 +1,73 @@
+"""
+`Pipeline` on an in-memory database.
+"""
+import duckdb
+import pytest
+
+from src.persistence import (
+    PIPELINE_RUNS_TBL,
+    migrate,
+)
+from src.pipeline import (
+    BLOCKED,
+    FAILED,
+    SKIPPED,
+    SUCCEEDED,
+    Pipeline,
+    Step,
+)
+
+
+@pytest.fixture
+def db_con() -> duckdb.DuckDBPyConnection:
+    db_con = duckdb.connect()
+    migrate(db_con)
+    return db_con
+
+
+def recorded(db_con: duckdb.DuckDBPyConnection) -> dict[str, str]:
+    rows = db_con.execute(f"SELECT step, status FROM {PIPELINE_RUNS_TBL};").fetchall()
+    return {step: status for step, status in rows}
+
+
+def test_unchanged_inputs_are_skipped(db_con: duckdb.DuckDBPyConnection) -> None:
+    ran: list[str] = []
+    pipeline = Pipeline(
+        [Step("fetch", lambda _: ran.append("fetch"), inputs=("source",))],
+        {"source": lambda _: "v1"},
+    )
+
+    first = pipeline.run(db_con)
+    second = pipeline.run(db_con)
+
+    assert [run.status for run in first] == [SUCCEEDED]
+    assert [run.status for run in second] == [SKIPPED]
+    assert ran == ["fetch"]
+
+
+def test_failing_fingerprint_fails_the_step(db_con: duckdb.DuckDBPyConnection) -> None:
+    def unreachable(_: duckdb.DuckDBPyConnection) -> str:
+        raise ConnectionError("source unavailable")
+
+    ran: list[str] = []
+    pipeline = Pipeline(
+        [
+            Step("fetch", lambda _: ran.append("fetch"), ("source",), ("raw",)),
+            Step("transform", lambda _: ran.append("transform"), ("raw",)),
+            Step("independent", lambda _: ran.append("independent")),
+        ],
+        {"source": unreachable},
+    )
+
+    runs = {run.step: run for run in pipeline.run(db_con)}
+
+    assert runs["fetch"].status == FAILED
+    assert runs["fetch"].fingerprint is None
+    assert runs["transform"].status == BLOCKED
+    assert runs["independent"].status == SUCCEEDED
+    assert ran == ["independent"]
+    assert recorded(db_con) == {
+        "fetch": FAILED,
+        "transform": BLOCKED,
+        "independent": SUCCEEDED,
+    }
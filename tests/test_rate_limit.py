@@ -0,0 +1,37 @@
+import concurrent.futures
+import time
+
+import pytest
+
+from src.external_data.rate_limit import (
+    SlidingWindowLimiter,
+)
+
+
+def test_at_most_max_requests_are_sent_in_any_window() -> None:
+    limiter = SlidingWindowLimiter(max_requests=3, window=0.3)
+
+    start = time.monotonic()
+
+    def send(_: int) -> float:
+        limiter.acquire()
+        return time.monotonic() - start
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        sent_at = sorted(executor.map(send, range(7)))
+
+    # Nothing is allowed in advance: the first 3 go at once, then the window has to slide
+    assert sent_at[2] < 0.1
+    for earlier, later in zip(sent_at, sent_at[3:]):
+        assert later - earlier >= 0.3 - 0.01
+    assert sent_at[-1] >= 0.6 - 0.01
+
+
+def test_per_hour() -> None:
+    limiter = SlidingWindowLimiter.per_hour(60)
+    assert (limiter.max_requests, limiter.window) == (60, 60 * 60)
+
+
+def test_max_requests_must_be_positive() -> None:
+    with pytest.raises(ValueError):
+        SlidingWindowLimiter(max_requests=0, window=1)
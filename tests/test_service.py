@@ -0,0 +1,103 @@
+"""
+`PredictionService.refresh` against an HTTP server on localhost standing in for NOAA.
+"""
+import collections
+import http
+import http.server
+import threading
+import time
+import typing
+
+import pytest
+
+from src.external_data import (
+    AsyncHttpClient,
+    NoaaApi,
+)
+import src.external_data.noaa
+from src.service import PredictionService
+from src.sites import Site
+
+SLOW_SECONDS = 1.0
+# Sites' latitudes stand in for their forecasts' paths on the local server
+PATHS = {1.0: "/unavailable", 2.0: "/slow", 3.0: "/ok"}
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        typing.cast(_Server, self.server).requests[self.path] += 1
+        status = http.HTTPStatus.OK
+        if self.path == "/unavailable":
+            status = http.HTTPStatus.SERVICE_UNAVAILABLE
+        elif self.path == "/slow":
+            time.sleep(SLOW_SECONDS)
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: typing.Any) -> None:
+        pass
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    requests: collections.Counter[str]
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.requests = collections.Counter()
+
+
+class _NoForecastDays:
+    def daily(self) -> list:
+        return []
+
+
+class _LocalNoaaApi(NoaaApi):
+    """Forecasts for a site are fetched from `PATHS[latitude]` on the local server."""
+
+    def __init__(self, server: _Server, async_http_client: AsyncHttpClient) -> None:
+        super().__init__(async_http_client=async_http_client)
+        self._port = server.server_address[1]
+
+    def _forecast_url(self, latlong: tuple[float, float] | None) -> str:
+        latitude, _ = typing.cast(tuple, latlong)
+        return f"http://127.0.0.1:{self._port}{PATHS[latitude]}"
+
+
+@pytest.fixture
+def server() -> typing.Iterator[_Server]:
+    server = _Server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_refresh_fetches_sites_concurrently_and_gives_up_on_failing_ones(
+    server: _Server, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(
+        src.external_data.noaa, "parse_dwml", lambda body: _NoForecastDays()
+    )
+    sites = [Site(path.lstrip("/"), latitude, 0.0) for latitude, path in PATHS.items()]
+    async_http_client = AsyncHttpClient()
+    # Retry waits are capped at a quarter of the refresh interval (1s), so the unavailable site
+    # is given up on after 3 attempts, about 2s
+    service = PredictionService(
+        _LocalNoaaApi(server, async_http_client), [], sites, refresh_interval=4.0
+    )
+    try:
+        started = time.perf_counter()
+        service.refresh()
+        elapsed = time.perf_counter() - started
+    finally:
+        service.stop()
+        async_http_client.close()
+
+    assert server.requests == {"/unavailable": 3, "/slow": 1, "/ok": 1}
+    # The slow site is fetched while the unavailable one is retried, rather than after
+    assert elapsed < 2.0 + SLOW_SECONDS / 2